@@ -5,12 +5,17 @@ from sqlalchemy import pool
 
 from alembic import context
 
+from db.engine import get_database_url
 from db.models import Base
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
 config = context.config
 
+# DSN берется из config/parameters.yaml (database_url), как и в Database;
+# без него используется SQLite-файл db/database.db
+config.set_main_option("sqlalchemy.url", get_database_url().replace("%", "%%"))
+
 # Interpret the config file for Python logging.
 # This line sets up loggers basically.
 if config.config_file_name is not None:
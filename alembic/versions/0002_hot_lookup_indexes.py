@@ -0,0 +1,51 @@
+"""hot lookup indexes
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-17 13:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0002"
+down_revision: Union[str, None] = "0001"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Database для SQLite создает эти индексы сам, поэтому if_not_exists
+    op.create_index(
+        "ix_project_chats_project_id_chat_id",
+        "project_chats",
+        ["project_id", "chat_id"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_project_chats_chat_id", "project_chats", ["chat_id"], if_not_exists=True
+    )
+    op.create_index("ix_projects_user_id", "projects", ["user_id"], if_not_exists=True)
+    op.create_index(
+        "ix_payment_history_user_id",
+        "payment_history",
+        ["user_id"],
+        if_not_exists=True,
+    )
+    op.create_index(
+        "ix_user_tariffs_is_active_end_date",
+        "user_tariffs",
+        ["is_active", "end_date"],
+        if_not_exists=True,
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_user_tariffs_is_active_end_date", table_name="user_tariffs")
+    op.drop_index("ix_payment_history_user_id", table_name="payment_history")
+    op.drop_index("ix_projects_user_id", table_name="projects")
+    op.drop_index("ix_project_chats_chat_id", table_name="project_chats")
+    op.drop_index("ix_project_chats_project_id_chat_id", table_name="project_chats")
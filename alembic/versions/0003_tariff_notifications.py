@@ -0,0 +1,49 @@
+"""tariff notifications ledger
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-17 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "tariff_notifications",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("notification_type", sa.String(), nullable=False),
+        sa.Column("period_end", sa.DateTime(), nullable=False),
+        sa.Column(
+            "sent_at", sa.DateTime(), server_default=sa.func.now(), nullable=False
+        ),
+        sa.ForeignKeyConstraint(["user_id"], ["users.user_id"]),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "user_id",
+            "notification_type",
+            "period_end",
+            name="uq_tariff_notifications_user_type_period",
+        ),
+    )
+    op.create_index(
+        "ix_tariff_notifications_period_end", "tariff_notifications", ["period_end"]
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_tariff_notifications_period_end", table_name="tariff_notifications"
+    )
+    op.drop_table("tariff_notifications")
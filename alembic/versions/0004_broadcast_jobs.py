@@ -0,0 +1,61 @@
+"""broadcast jobs
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "broadcast_jobs",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("admin_id", sa.BigInteger(), nullable=False),
+        sa.Column("kind", sa.String(), nullable=False),
+        sa.Column("payload", sa.Text(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.Column("total", sa.Integer(), nullable=False),
+        sa.Column("status_chat_id", sa.BigInteger(), nullable=True),
+        sa.Column("status_message_id", sa.Integer(), nullable=True),
+        sa.Column(
+            "created_at", sa.DateTime(), server_default=sa.func.now(), nullable=False
+        ),
+        sa.Column("finished_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_broadcast_jobs_status", "broadcast_jobs", ["status"])
+    op.create_table(
+        "broadcast_recipients",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("job_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.BigInteger(), nullable=False),
+        sa.Column("status", sa.String(), nullable=False),
+        sa.ForeignKeyConstraint(["job_id"], ["broadcast_jobs.id"]),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(
+        "ix_broadcast_recipients_job_id_status",
+        "broadcast_recipients",
+        ["job_id", "status"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_broadcast_recipients_job_id_status", table_name="broadcast_recipients"
+    )
+    op.drop_table("broadcast_recipients")
+    op.drop_index("ix_broadcast_jobs_status", table_name="broadcast_jobs")
+    op.drop_table("broadcast_jobs")
@@ -0,0 +1,36 @@
+"""project digest
+
+Revision ID: 0006
+Revises: 0005
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0006"
+down_revision: Union[str, None] = "0005"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "projects",
+        sa.Column(
+            "digest_enabled", sa.Boolean(), server_default=sa.false(), nullable=False
+        ),
+    )
+    op.add_column(
+        "projects",
+        sa.Column("digest_window", sa.Integer(), server_default="60", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("projects", "digest_window")
+    op.drop_column("projects", "digest_enabled")
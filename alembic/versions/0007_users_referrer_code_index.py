@@ -0,0 +1,28 @@
+"""users referrer_code index
+
+Revision ID: 0007
+Revises: 0006
+Create Date: 2026-10-17 19:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = "0007"
+down_revision: Union[str, None] = "0006"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # Database для SQLite создает этот индекс сам, поэтому if_not_exists
+    op.create_index(
+        "ix_users_referrer_code", "users", ["referrer_code"], if_not_exists=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_users_referrer_code", table_name="users")
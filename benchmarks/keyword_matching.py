@@ -0,0 +1,104 @@
+"""
+Бенчмарк проверки ключевых слов: поиск в цикле событий против пула потоков
+и пула процессов.
+
+Запуск из корня проекта:
+    python -m benchmarks.keyword_matching
+
+Для каждой длины текста выводится время поиска прямо в цикле событий и
+время полного round-trip через ThreadPoolExecutor (как было раньше в
+MessageProcessor) и через ProcessPoolExecutor. Точка перехода - длина
+текста, начиная с которой поиск в цикле событий блокирует его дольше, чем
+занимает передача задачи в пул процессов. Ниже этой длины MatchExecutor
+выполняет поиск inline.
+"""
+
+import asyncio
+import multiprocessing
+import random
+import string
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from client.keyword_matcher import find_keywords, get_matcher
+
+TEXT_LENGTHS = [100, 1_000, 2_000, 4_096, 20_000, 100_000, 500_000]
+PATTERN_COUNTS = [10, 1_000, 10_000]
+REPEATS = 50
+
+
+def _random_word(rng: random.Random) -> str:
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(4, 9)))
+
+
+def _make_text(rng: random.Random, length: int) -> str:
+    words = []
+    size = 0
+    while size < length:
+        word = _random_word(rng)
+        words.append(word)
+        size += len(word) + 1
+    return " ".join(words)[:length]
+
+
+def _old_matches(text: str, keyword_list: list) -> bool:
+    """Проверка, которая выполнялась в ThreadPoolExecutor до MatchExecutor"""
+    text_lower = text.lower()
+    return any(keyword in text_lower for keyword in keyword_list)
+
+
+async def _measure(loop, executor, func, *args) -> float:
+    start = time.perf_counter()
+    for _ in range(REPEATS):
+        if executor is None:
+            func(*args)
+        else:
+            await loop.run_in_executor(executor, func, *args)
+    return (time.perf_counter() - start) / REPEATS * 1_000_000
+
+
+async def main() -> None:
+    rng = random.Random(42)
+    loop = asyncio.get_running_loop()
+    threads = ThreadPoolExecutor(max_workers=20)
+    processes = ProcessPoolExecutor(
+        max_workers=2, mp_context=multiprocessing.get_context("spawn")
+    )
+
+    print(
+        f"{'паттернов':>10} {'длина':>8} {'inline, мкс':>12} "
+        f"{'потоки, мкс':>12} {'процессы, мкс':>14}"
+    )
+    for pattern_count in PATTERN_COUNTS:
+        keyword_list = sorted({_random_word(rng) for _ in range(pattern_count)})
+        keywords = ",".join(keyword_list)
+        get_matcher(keywords)
+        # Прогреваем пул процессов и кэш автоматов в дочерних процессах
+        for _ in range(4):
+            await loop.run_in_executor(processes, find_keywords, "warmup", keywords)
+
+        overhead = await _measure(loop, processes, find_keywords, "x", keywords)
+        crossover = None
+        for length in TEXT_LENGTHS:
+            text = _make_text(rng, length)
+            matcher = get_matcher(keywords)
+            inline = await _measure(loop, None, matcher.find_all, text)
+            threaded = await _measure(loop, threads, _old_matches, text, keyword_list)
+            offloaded = await _measure(loop, processes, find_keywords, text, keywords)
+            if crossover is None and inline > overhead:
+                crossover = length
+            print(
+                f"{pattern_count:>10} {length:>8} {inline:>12.1f} "
+                f"{threaded:>12.1f} {offloaded:>14.1f}"
+            )
+        print(
+            f"{pattern_count:>10} накладные расходы пула процессов: {overhead:.1f} мкс, "
+            f"точка перехода: {crossover or 'не достигнута'}\n"
+        )
+
+    threads.shutdown()
+    processes.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
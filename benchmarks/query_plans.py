@@ -0,0 +1,117 @@
+"""
+Проверка планов запросов для горячих выборок Database.
+
+Запуск из корня проекта:
+    python -m benchmarks.query_plans
+
+Создает временную SQLite-базу через Database, вызывает методы, которые
+бот и мониторинг выполняют постоянно, и перехватывает SQL, который они
+на самом деле отправляют (before_cursor_execute). Для каждого SELECT,
+UPDATE и DELETE выполняется EXPLAIN QUERY PLAN; скрипт завершается с
+кодом 1, если хотя бы один из них выполняется полным просмотром таблицы
+(SCAN). Поэтому изменение фильтра в методе Database, из-за которого
+запрос перестает использовать индекс, будет замечено.
+"""
+
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+from typing import Callable, Dict, List, Tuple
+
+from sqlalchemy import event
+
+from db.database import Database
+from db.models import Base
+
+NOW = datetime.now()
+
+# Горячие методы Database и аргументы, с которыми они вызываются
+HOT_METHODS: Dict[str, Callable[[Database], object]] = {
+    "get_project_chats": lambda db: db.get_project_chats(1, active_only=True),
+    "add_chat_to_project": lambda db: db.add_chat_to_project(1, "chat"),
+    "add_chats_to_project": lambda db: db.add_chats_to_project(
+        1, [{"chat_id": "other_chat", "title": "Чат"}]
+    ),
+    "get_user_projects": lambda db: db.get_user_projects(1),
+    "get_user_tariff": lambda db: db.get_user_tariff(1),
+    "expire_user_tariffs": lambda db: db.expire_user_tariffs(NOW),
+    "get_user_tariffs_expiring_between": lambda db: db.get_user_tariffs_expiring_between(
+        NOW, NOW + timedelta(days=1)
+    ),
+    "get_sent_tariff_notifications": lambda db: db.get_sent_tariff_notifications(
+        [(1, "day", NOW)]
+    ),
+    "get_link_statistics": lambda db: db.get_link_statistics("code"),
+    "get_all_active_user_tariffs": lambda db: db.get_all_active_user_tariffs(),
+}
+
+# Запросы, план которых проверяется (вставки индексов не используют)
+CHECKED_STATEMENTS = ("SELECT", "UPDATE", "DELETE")
+
+
+def table_scans(plan: List[str]) -> List[str]:
+    """
+    Шаги плана с полным просмотром таблиц модели.
+
+    SCAN CONSTANT ROW (список значений IN) и просмотр уже отфильтрованного
+    подзапроса (SCAN anon_1) таблицу целиком не читают.
+    """
+    tables = Base.metadata.tables
+    return [
+        step
+        for step in plan
+        if step.startswith("SCAN ") and step.split()[1] in tables
+    ]
+
+
+def capture_statements(
+    db: Database, method: Callable[[Database], object]
+) -> List[Tuple[str, tuple]]:
+    """Вызывает метод и возвращает отправленные им запросы с параметрами"""
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().upper().startswith(CHECKED_STATEMENTS):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        method(db)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", before_cursor_execute)
+    return statements
+
+
+def explain(db: Database, statement: str, parameters: tuple) -> List[str]:
+    """Возвращает строки плана запроса SQLite"""
+    with db.engine.connect() as connection:
+        rows = connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)
+        return [row[-1] for row in rows]
+
+
+def main() -> int:
+    failed = []
+    with tempfile.TemporaryDirectory() as directory:
+        db = Database(db_url=f"sqlite:///{os.path.join(directory, 'plans.db')}")
+        try:
+            for name, method in HOT_METHODS.items():
+                for statement, parameters in capture_statements(db, method):
+                    plan = explain(db, statement, parameters)
+                    scans = table_scans(plan)
+                    status = "SCAN" if scans else "ok"
+                    print(f"[{status:>4}] {name}: {'; '.join(plan)}")
+                    if scans:
+                        failed.append(name)
+        finally:
+            db.engine.dispose()
+
+    if failed:
+        failed = list(dict.fromkeys(failed))
+        print(f"\nПолный просмотр таблицы в {len(failed)} методах: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
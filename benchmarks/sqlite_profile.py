@@ -0,0 +1,93 @@
+"""
+Бенчмарк параллельной записи в SQLite из двух процессов.
+
+Запуск из корня проекта:
+    python -m benchmarks.sqlite_profile [--operations 500] [--users 20]
+
+Два процесса (как бот и payment_webhook) одновременно выполняют
+update_balance и make_payment для общих пользователей. Замер выполняется
+без профиля и с профилем SQLITE_PRAGMAS (WAL, busy_timeout, mmap, кэш,
+synchronous=NORMAL). Для каждого режима выводится пропускная способность,
+число ошибок "database is locked" и сверка итоговых балансов.
+"""
+
+import argparse
+import multiprocessing
+import os
+import tempfile
+import time
+
+from db.database import Database
+from db.models import PaymentHistory, User
+
+PROCESSES = 2
+
+
+def _worker(db_url: str, tuning: bool, user_ids: list, operations: int, queue):
+    db = Database(db_url=db_url, sqlite_tuning=tuning)
+    done = 0
+    errors = 0
+    start = time.perf_counter()
+    for index in range(operations):
+        user_id = user_ids[index % len(user_ids)]
+        try:
+            db.update_balance(user_id, 1)
+            db.make_payment(user_id, 1)
+            done += 1
+        except Exception:
+            errors += 1
+    queue.put((done, errors, time.perf_counter() - start))
+    db.engine.dispose()
+
+
+def run(tuning: bool, operations: int, users: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db_url = f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}"
+        db = Database(db_url=db_url, sqlite_tuning=tuning)
+        user_ids = list(range(1, users + 1))
+        for user_id in user_ids:
+            db.get_or_create_or_update_user(user_id, f"user{user_id}", "Bench")
+
+        context = multiprocessing.get_context("spawn")
+        queue = context.Queue()
+        workers = [
+            context.Process(
+                target=_worker, args=(db_url, tuning, user_ids, operations, queue)
+            )
+            for _ in range(PROCESSES)
+        ]
+        start = time.perf_counter()
+        for worker in workers:
+            worker.start()
+        results = [queue.get() for _ in workers]
+        for worker in workers:
+            worker.join()
+        elapsed = time.perf_counter() - start
+
+        done = sum(result[0] for result in results)
+        errors = sum(result[1] for result in results)
+        with db.get_session() as session:
+            balances = sum(user.balance for user in session.query(User).all())
+            payments = session.query(PaymentHistory).count()
+        db.engine.dispose()
+
+    mode = "профиль SQLITE_PRAGMAS" if tuning else "без профиля"
+    print(
+        f"{mode:>22}: {done / elapsed:8.1f} пар операций/с, "
+        f"ошибок: {errors}, баланс: {balances}, платежей: {payments} "
+        f"(ожидалось {done})"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--operations", type=int, default=500)
+    parser.add_argument("--users", type=int, default=20)
+    args = parser.parse_args()
+
+    for tuning in (False, True):
+        run(tuning, args.operations, args.users)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Бенчмарк Database.get_user_tariff_info для пользователя с большим числом проектов.
+
+Запуск из корня проекта:
+    python -m benchmarks.tariff_info [--projects 50] [--chats 5] [--repeats 200]
+
+Сравнивает прежнюю реализацию (отдельный COUNT чатов для каждого проекта)
+с текущей (один запрос с подзапросами) по времени и числу SQL-запросов.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+from datetime import datetime
+
+from sqlalchemy import event
+
+from db.database import Database
+from db.models import Project, ProjectChat, TariffPlan, UserTariff
+
+USER_ID = 1
+
+
+def old_get_user_tariff_info(db: Database, user_id: int) -> dict:
+    """Реализация get_user_tariff_info до объединения запросов"""
+    with db.get_session() as session:
+        user_tariff = (
+            session.query(UserTariff)
+            .filter(UserTariff.user_id == user_id, UserTariff.is_active == True)
+            .first()
+        )
+        tariff_plan = (
+            session.query(TariffPlan)
+            .filter(TariffPlan.id == user_tariff.tariff_plan_id)
+            .first()
+        )
+        projects_count = (
+            session.query(Project).filter(Project.user_id == user_id).count()
+        )
+        chats_count = 0
+        for project in session.query(Project).filter(Project.user_id == user_id).all():
+            chats_count += (
+                session.query(ProjectChat)
+                .filter(ProjectChat.project_id == project.id)
+                .count()
+            )
+        return {
+            "has_tariff": True,
+            "tariff_name": tariff_plan.name,
+            "max_projects": tariff_plan.max_projects,
+            "max_chats_per_project": tariff_plan.max_chats_per_project,
+            "current_projects": projects_count,
+            "current_chats": chats_count,
+            "end_date": user_tariff.end_date.strftime("%d.%m.%Y"),
+            "days_left": (user_tariff.end_date - datetime.now()).days,
+        }
+
+
+def measure(db: Database, func, repeats: int) -> tuple:
+    """Возвращает (мс на вызов, SQL-запросов на вызов, результат)"""
+    statements = []
+
+    def count_statement(*args):
+        statements.append(1)
+
+    event.listen(db.engine, "before_cursor_execute", count_statement)
+    start = time.perf_counter()
+    for _ in range(repeats):
+        result = func()
+    elapsed = (time.perf_counter() - start) / repeats * 1000
+    event.remove(db.engine, "before_cursor_execute", count_statement)
+    return elapsed, len(statements) / repeats, result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--projects", type=int, default=50)
+    parser.add_argument("--chats", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        db = Database(db_url=f"sqlite:///{os.path.join(tmp_dir, 'bench.db')}")
+        db.get_or_create_or_update_user(USER_ID, "bench", "Bench")
+        tariff = db.create_tariff_plan("Bench", 0, args.projects, args.chats)
+        db.assign_tariff_to_user(USER_ID, tariff.id)
+        for index in range(args.projects):
+            project = db.create_project(USER_ID, f"Проект {index}")
+            for chat_index in range(args.chats):
+                db.add_chat_to_project(project.id, f"chat_{index}_{chat_index}")
+
+        old = measure(
+            db, lambda: old_get_user_tariff_info(db, USER_ID), args.repeats
+        )
+        new = measure(db, lambda: db.get_user_tariff_info(USER_ID), args.repeats)
+        db.engine.dispose()
+
+    assert old[2] == new[2], (old[2], new[2])
+    print(f"Проектов: {args.projects}, чатов в проекте: {args.chats}")
+    print(f"  прежняя реализация: {old[0]:7.2f} мс, {old[1]:.0f} запросов")
+    print(f"  один запрос:        {new[0]:7.2f} мс, {new[1]:.0f} запросов")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,9 @@
 from aiogram import Router, F, types
 from aiogram.filters import Command
-from db.database import Database
+from db.provider import database
 
 router = Router(name="admin_menu")
-db = Database()
+db = database
 
 
 async def admin_menu_base(message: types.Message, user_id: int):
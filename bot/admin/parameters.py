@@ -3,13 +3,13 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 import logging
 
-from db.database import Database
+from db.provider import database
 from config.parameters_manager import ParametersManager
 
 logger = logging.getLogger(__name__)
 
 router = Router(name="admin_parameters")
-db = Database()
+db = database
 
 
 class AdminParameterStates(StatesGroup):
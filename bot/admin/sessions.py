@@ -9,7 +9,7 @@ import json
 from pathlib import Path
 import logging
 
-from db.database import Database
+from db.provider import database
 from client.session_manager import (
     SessionManager,
     HistorySessionManager,
@@ -20,7 +20,7 @@ from bot.utils.pagination import Paginator
 logger = logging.getLogger(__name__)
 
 router = Router(name="admin_sessions")
-db = Database()
+db = database
 
 
 class AdminSessionStates(StatesGroup):
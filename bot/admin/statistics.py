@@ -4,14 +4,14 @@ import os
 import time
 import logging
 
-from db.database import Database
+from db.provider import database
 from bot.utils.pagination import Paginator
 from .users import AdminUserStates
 
 logger = logging.getLogger(__name__)
 
 router = Router(name="admin_statistics")
-db = Database()
+db = database
 
 
 @router.callback_query(F.data == "viewcodes")
@@ -74,7 +74,8 @@ async def handle_codes_page(callback: types.CallbackQuery):
         return
 
     page = int(callback.data.split("_")[-1])
-    codes = db.get_all_referral_links_statistics()
+    # При листании страниц используем недавно полученную статистику
+    codes = db.get_all_referral_links_statistics(use_cache=True)
 
     def code_callback(code: dict) -> tuple[str, str]:
         return (
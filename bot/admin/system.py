@@ -3,13 +3,13 @@ from aiogram.fsm.context import FSMContext
 import os
 import logging
 
-from db.database import Database
+from db.provider import database
 from bot.utils.funcs import notify_admins, format_user_mention
 
 logger = logging.getLogger(__name__)
 
 router = Router(name="admin_system")
-db = Database()
+db = database
 
 
 @router.callback_query(F.data == "reboot_server")
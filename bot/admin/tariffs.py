@@ -3,12 +3,12 @@ from aiogram.fsm.context import FSMContext
 from aiogram.types import Message, CallbackQuery, InlineKeyboardButton
 from aiogram.utils.keyboard import InlineKeyboardBuilder
 
-from db.database import Database
+from db.provider import database
 from bot.utils.states import AdminStates
 from bot.utils.pagination import Paginator
 
 router = Router()
-db = Database()
+db = database
 
 # Константы для пагинации
 TARIFFS_PER_PAGE = 3
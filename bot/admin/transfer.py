@@ -3,13 +3,13 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 import logging
 
-from db.database import Database
+from db.provider import database
 from bot.utils.pagination import Paginator
 
 logger = logging.getLogger(__name__)
 
 router = Router(name="admin_transfer")
-db = Database()
+db = database
 
 
 class AdminTransferStates(StatesGroup):
@@ -18,6 +18,39 @@ class AdminTransferStates(StatesGroup):
     waiting_for_confirmation = State()
 
 
+def _users_paginator(
+    callback_prefix: str,
+    select_prefix: str,
+    return_callback: str,
+    exclude_user_id: int = None,
+) -> Paginator:
+    """Пагинатор пользователей с числом проектов, загружающий только текущую страницу"""
+
+    def user_callback(row) -> tuple[str, str]:
+        user, projects_count = row
+        return (
+            f"{'👑 ' if user.is_admin else ''}ID: {user.user_id} | "
+            f"{user.username or user.full_name or 'Без имени'} "
+            f"(проектов: {projects_count})",
+            f"{select_prefix}_{user.user_id}",
+        )
+
+    return Paginator(
+        items=None,
+        items_per_page=8,
+        callback_prefix=callback_prefix,
+        item_callback=user_callback,
+        return_callback=return_callback,
+        fetch_page=lambda after_id, before_id, limit: db.get_users_page(
+            limit,
+            after_id=after_id,
+            before_id=before_id,
+            exclude_user_id=exclude_user_id,
+        ),
+        item_key=lambda row: row[0].id,
+    )
+
+
 @router.callback_query(F.data == "transfer_tasks")
 async def start_transfer(callback: types.CallbackQuery, state: FSMContext):
     if not db.get_user(callback.from_user.id).is_admin:
@@ -29,24 +62,7 @@ async def start_transfer(callback: types.CallbackQuery, state: FSMContext):
     logger.info(f"Администратор {callback.from_user.id} начал процесс переноса задач")
 
     # Показываем список пользователей для выбора источника
-    users = db.get_all_users()
-
-    def user_callback(user) -> tuple[str, str]:
-        projects_count = len(db.get_user_projects(user.user_id))
-        return (
-            f"{'👑 ' if user.is_admin else ''}ID: {user.user_id} | "
-            f"{user.username or user.full_name or 'Без имени'} "
-            f"(проектов: {projects_count})",
-            f"select_source_{user.user_id}",
-        )
-
-    paginator = Paginator(
-        items=users,
-        items_per_page=8,
-        callback_prefix="source_users",
-        item_callback=user_callback,
-        return_callback="back_to_admin",
-    )
+    paginator = _users_paginator("source_users", "select_source", "back_to_admin")
 
     await callback.message.edit_text(
         "🔄 Перенос задач\n\n"
@@ -60,30 +76,13 @@ async def handle_source_users_page(callback: types.CallbackQuery):
     if not db.get_user(callback.from_user.id).is_admin:
         return
 
-    page = int(callback.data.split("_")[-1])
-    users = db.get_all_users()
-
-    def user_callback(user) -> tuple[str, str]:
-        projects_count = len(db.get_user_projects(user.user_id))
-        return (
-            f"{'👑 ' if user.is_admin else ''}ID: {user.user_id} | "
-            f"{user.username or user.full_name or 'Без имени'} "
-            f"(проектов: {projects_count})",
-            f"select_source_{user.user_id}",
-        )
-
-    paginator = Paginator(
-        items=users,
-        items_per_page=8,
-        callback_prefix="source_users",
-        item_callback=user_callback,
-        return_callback="back_to_admin",
-    )
+    page, cursor = Paginator.parse_page_callback(callback.data)
+    paginator = _users_paginator("source_users", "select_source", "back_to_admin")
 
     await callback.message.edit_text(
         "🔄 Перенос задач\n\n"
         "Выберите пользователя-источника (от кого копировать задачи):",
-        reply_markup=paginator.get_page_keyboard(page),
+        reply_markup=paginator.get_page_keyboard(page, cursor),
     )
 
 
@@ -120,26 +119,9 @@ async def select_source_user(callback: types.CallbackQuery, state: FSMContext):
         )
         return
 
-    # Показываем список пользователей для выбора получателя
-    users = db.get_all_users()
-    # Исключаем пользователя-источника из списка
-    users = [u for u in users if u.user_id != source_user_id]
-
-    def user_callback(user) -> tuple[str, str]:
-        projects_count = len(db.get_user_projects(user.user_id))
-        return (
-            f"{'👑 ' if user.is_admin else ''}ID: {user.user_id} | "
-            f"{user.username or user.full_name or 'Без имени'} "
-            f"(проектов: {projects_count})",
-            f"select_target_{user.user_id}",
-        )
-
-    paginator = Paginator(
-        items=users,
-        items_per_page=8,
-        callback_prefix="target_users",
-        item_callback=user_callback,
-        return_callback="transfer_tasks",
+    # Показываем список пользователей для выбора получателя (без источника)
+    paginator = _users_paginator(
+        "target_users", "select_target", "transfer_tasks", source_user_id
     )
 
     await callback.message.edit_text(
@@ -161,26 +143,10 @@ async def handle_target_users_page(callback: types.CallbackQuery, state: FSMCont
     source_user = db.get_user(source_user_id)
     user_projects = db.get_user_projects(source_user_id)
 
-    page = int(callback.data.split("_")[-1])
-    users = db.get_all_users()
+    page, cursor = Paginator.parse_page_callback(callback.data)
     # Исключаем пользователя-источника из списка
-    users = [u for u in users if u.user_id != source_user_id]
-
-    def user_callback(user) -> tuple[str, str]:
-        projects_count = len(db.get_user_projects(user.user_id))
-        return (
-            f"{'👑 ' if user.is_admin else ''}ID: {user.user_id} | "
-            f"{user.username or user.full_name or 'Без имени'} "
-            f"(проектов: {projects_count})",
-            f"select_target_{user.user_id}",
-        )
-
-    paginator = Paginator(
-        items=users,
-        items_per_page=8,
-        callback_prefix="target_users",
-        item_callback=user_callback,
-        return_callback="transfer_tasks",
+    paginator = _users_paginator(
+        "target_users", "select_target", "transfer_tasks", source_user_id
     )
 
     await callback.message.edit_text(
@@ -188,7 +154,7 @@ async def handle_target_users_page(callback: types.CallbackQuery, state: FSMCont
         f"Выбран источник: {source_user.username or source_user.full_name or source_user_id}\n"
         f"Проектов для переноса: {len(user_projects)}\n\n"
         f"Выберите пользователя-получателя (кому копировать задачи):",
-        reply_markup=paginator.get_page_keyboard(page),
+        reply_markup=paginator.get_page_keyboard(page, cursor),
     )
 
 
@@ -3,14 +3,14 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 import logging
 
-from db.database import Database
+from db.provider import database
 from bot.utils.pagination import Paginator
 from bot.utils.funcs import add_balance_with_notification, format_user_mention
 
 logger = logging.getLogger(__name__)
 
 router = Router(name="admin_users")
-db = Database()
+db = database
 
 
 class AdminUserStates(StatesGroup):
@@ -237,6 +237,33 @@ async def show_users_statistics(callback: types.CallbackQuery):
     await callback.message.edit_text(text, reply_markup=keyboard)
 
 
+def _users_paginator(admins_only: bool, with_balance: bool) -> Paginator:
+    """Пагинатор списка пользователей, загружающий из БД только текущую страницу"""
+
+    def user_callback(row) -> tuple[str, str]:
+        user, _ = row
+        return (
+            f"{'👑 ' if user.is_admin else ''}{user.username or user.full_name or user.user_id} ({user.balance}₽)",
+            f"user_profile_{user.user_id}",
+        )
+
+    return Paginator(
+        items=None,
+        items_per_page=10,
+        callback_prefix="users",
+        item_callback=user_callback,
+        return_callback="view_users_stats",
+        fetch_page=lambda after_id, before_id, limit: db.get_users_page(
+            limit,
+            after_id=after_id,
+            before_id=before_id,
+            admins_only=admins_only,
+            with_balance=with_balance,
+        ),
+        item_key=lambda row: row[0].id,
+    )
+
+
 @router.callback_query(
     F.data.startswith(("view_admins_list", "view_users_with_balance", "view_all_users"))
 )
@@ -244,30 +271,17 @@ async def show_users_list(callback: types.CallbackQuery):
     if not db.get_user(callback.from_user.id).is_admin:
         return
 
-    users = db.get_all_users()
+    admins_only = callback.data == "view_admins_list"
+    with_balance = callback.data == "view_users_with_balance"
 
-    if callback.data == "view_admins_list":
-        users = [u for u in users if u.is_admin]
+    if admins_only:
         title = "👑 Список администраторов"
-    elif callback.data == "view_users_with_balance":
-        users = [u for u in users if u.balance > 0]
+    elif with_balance:
         title = "💰 Пользователи с балансом"
     else:
         title = "📋 Все пользователи"
 
-    def user_callback(user) -> tuple[str, str]:
-        return (
-            f"{'👑 ' if user.is_admin else ''}{user.username or user.full_name or user.user_id} ({user.balance}₽)",
-            f"user_profile_{user.user_id}",
-        )
-
-    paginator = Paginator(
-        items=users,
-        items_per_page=10,
-        callback_prefix="users",
-        item_callback=user_callback,
-        return_callback="view_users_stats",
-    )
+    paginator = _users_paginator(admins_only, with_balance)
 
     await callback.message.edit_text(title, reply_markup=paginator.get_page_keyboard(0))
 
@@ -277,38 +291,25 @@ async def handle_users_page(callback: types.CallbackQuery):
     if not db.get_user(callback.from_user.id).is_admin:
         return
 
-    page = int(callback.data.split("_")[-1])
+    page, cursor = Paginator.parse_page_callback(callback.data)
 
     # Определяем, какой список пользователей нужно показать
     # Получаем последний callback_data из истории сообщения
     message_text = callback.message.text
-    users = db.get_all_users()
+    admins_only = message_text.startswith("👑")  # Список администраторов
+    with_balance = message_text.startswith("💰")  # Пользователи с балансом
 
-    if message_text.startswith("👑"):  # Список администраторов
-        users = [u for u in users if u.is_admin]
+    if admins_only:
         title = "👑 Список администраторов"
-    elif message_text.startswith("💰"):  # Пользователи с балансом
-        users = [u for u in users if u.balance > 0]
+    elif with_balance:
         title = "💰 Пользователи с балансом"
     else:  # Все пользователи
         title = "📋 Все пользователи"
 
-    def user_callback(user) -> tuple[str, str]:
-        return (
-            f"{'👑 ' if user.is_admin else ''}{user.username or user.full_name or user.user_id} ({user.balance}₽)",
-            f"user_profile_{user.user_id}",
-        )
-
-    paginator = Paginator(
-        items=users,
-        items_per_page=10,
-        callback_prefix="users",
-        item_callback=user_callback,
-        return_callback="view_users_stats",
-    )
+    paginator = _users_paginator(admins_only, with_balance)
 
     await callback.message.edit_text(
-        title, reply_markup=paginator.get_page_keyboard(page)
+        title, reply_markup=paginator.get_page_keyboard(page, cursor)
     )
 
 
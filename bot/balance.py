@@ -5,11 +5,11 @@ from aiogram.fsm.context import FSMContext
 from aiogram.fsm.state import State, StatesGroup
 from bot.payment_systems import PaymentSystems
 from config.parameters_manager import ParametersManager
-from db.database import Database
+from db.provider import database
 
 
 router = Router(name="balance")
-db = Database()
+db = database
 payment_systems = PaymentSystems()
 
 
@@ -4,11 +4,11 @@ from aiogram import Router, F, types, Bot
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from config.parameters_manager import ParametersManager
-from db.database import Database
+from db.provider import database
 from bot.keyboards import start_keyboard
 
 router = Router(name="check_channels")
-db = Database()
+db = database
 
 
 async def check_subscription(bot: Bot, user_id: int) -> bool:
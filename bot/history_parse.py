@@ -7,7 +7,7 @@ from aiogram import F, Router, types
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 
-from db.database import Database
+from db.provider import database
 from client.history_parser import HistoryParser
 from bot.projects_keyboards import (
     parse_history_keyboard,
@@ -18,7 +18,7 @@ from bot.utils.states import HistoryParseStates
 from config.parameters_manager import ParametersManager
 
 router = Router(name="history_parse")
-db = Database()
+db = database
 history_parser = HistoryParser()
 
 # Создание директории для результатов
@@ -321,9 +321,9 @@ class PaymentSystems:
         """
         try:
             from bot.utils.funcs import add_balance_with_notification, error_notify
-            from db.database import Database
+            from db.provider import get_database
 
-            db = Database()
+            db = get_database()
 
             # Логирование информации о платеже
             self.logger.info(f"Успешный платеж: {payment.telegram_payment_charge_id}")
@@ -381,11 +381,11 @@ class PaymentSystems:
         """
         try:
             from bot.utils.funcs import add_balance_with_notification, error_notify
-            from db.database import Database
+            from db.provider import get_database
             from aiogram import Bot
             from aiogram.client.default import DefaultBotProperties
 
-            db = Database()
+            db = get_database()
             bot = Bot(
                 token=ParametersManager.get_parameter("bot_token"),
                 default=DefaultBotProperties(parse_mode="HTML"),
@@ -2,7 +2,7 @@ from typing import Optional
 from aiogram import F, Router, types
 from aiogram.fsm.context import FSMContext
 
-from db.database import Database
+from db.provider import database
 from client.monitoring_setup import MonitoringSystem
 from bot.projects_keyboards import (
     chats_list_keyboard,
@@ -15,7 +15,7 @@ from bot.utils.states import ChatStates
 from bot.utils.tariff_checker import TariffChecker
 
 router = Router(name="project_chats")
-db = Database()
+db = database
 
 
 # Просмотр списка чатов проекта
@@ -440,21 +440,10 @@ async def add_multiple_chats_keywords(message: types.Message, state: FSMContext)
         await state.clear()
         return
 
-    # Добавляем чаты в проект
-    added_chats = []
-    failed_chats = []
-
-    for chat_info in chats_data:
-        chat = db.add_chat_to_project(
-            project_id=project_id,
-            chat_id=chat_info["chat_id"],
-            chat_title=chat_info["title"],
-            keywords=keywords,
-        )
-        if chat:
-            added_chats.append(chat)
-        else:
-            failed_chats.append(chat_info["chat_id"])
+    # Добавляем чаты в проект одной транзакцией, дубликаты пропускаются
+    added_chats, failed_chats = db.add_chats_to_project(
+        project_id=project_id, chats=chats_data, keywords=keywords
+    )
 
     await state.clear()
 
@@ -468,19 +457,12 @@ async def add_multiple_chats_keywords(message: types.Message, state: FSMContext)
         return
 
     # Если проект активен и система мониторинга доступна,
-    # пытаемся начать мониторинг добавленных чатов
+    # подключаем добавленные чаты параллельно
     activated_chats = 0
     if project.is_active and monitoring_system:
-        for chat in added_chats:
-            # Пытаемся вступить в чат
-            join_success = await monitoring_system.join_chat(chat.id)
-            if join_success:
-                # Запускаем мониторинг
-                monitor_success = await monitoring_system.add_chat_to_monitoring(
-                    project_id, chat.id
-                )
-                if monitor_success:
-                    activated_chats += 1
+        activated_chats = await monitoring_system.add_chats_to_monitoring(
+            project_id, [chat.id for chat in added_chats]
+        )
     
     if len(added_chats) == 1:
         added_russian = "чат"
@@ -499,7 +481,7 @@ async def add_multiple_chats_keywords(message: types.Message, state: FSMContext)
     # Формируем текст результата
     result_text = f"✅ Успешно добавлено {len(added_chats)} {added_russian}"
     if failed_chats:
-        result_text += f"\n❌ <b>Не удалось добавить:</b> {len(failed_chats)} {failed_russian}"
+        result_text += f"\n⚠️ <b>Уже были в проекте:</b> {len(failed_chats)} {failed_russian}"
 
     if project.is_active and monitoring_system:
         result_text += (
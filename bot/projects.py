@@ -4,19 +4,21 @@ from aiogram import F, Router, types
 from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 
-from db.database import Database
+from db.provider import database
 from bot.projects_keyboards import (
     main_projects_keyboard,
     projects_list_keyboard,
     project_manage_keyboard,
     cancel_keyboard,
     confirm_keyboard,
+    DIGEST_WINDOWS,
+    digest_status_text,
 )
 from bot.utils.states import ProjectStates
 from bot.utils.tariff_checker import TariffChecker
 
 router = Router(name="projects")
-db = Database()
+db = database
 
 
 # Вход в меню проектов
@@ -169,7 +171,8 @@ async def view_project(callback: types.CallbackQuery, state: FSMContext):
         f"📊 <b>Проект: {project.name}</b>\n\n"
         f"Статус: {status}\n"
         f"Описание: {project.description or 'Не указано'}\n"
-        f"Количество чатов: {chats_count}\n\n"
+        f"Количество чатов: {chats_count}\n"
+        f"Дайджест: {digest_status_text(project)}\n\n"
         f"Выберите действие:",
         reply_markup=project_manage_keyboard(project),
         parse_mode="HTML",
@@ -354,7 +357,59 @@ async def toggle_project(callback: types.CallbackQuery, state: FSMContext):
         f"📊 <b>Проект: {updated_project.name}</b>\n\n"
         f"Статус: {status_text}\n"
         f"Описание: {updated_project.description or 'Не указано'}\n"
-        f"Количество чатов: {chats_count}\n\n"
+        f"Количество чатов: {chats_count}\n"
+        f"Дайджест: {digest_status_text(updated_project)}\n\n"
+        f"Выберите действие:",
+        reply_markup=project_manage_keyboard(updated_project),
+        parse_mode="HTML",
+    )
+
+
+# Режим дайджеста
+@router.callback_query(F.data.startswith("toggle_digest|"))
+@router.callback_query(F.data.startswith("digest_window|"))
+async def change_project_digest(callback: types.CallbackQuery, state: FSMContext):
+    """Обработчик для включения дайджеста и смены его окна"""
+    action, project_id = callback.data.split("|")
+    project_id = int(project_id)
+    project = db.get_project(project_id)
+
+    if not project:
+        await callback.message.edit_text(
+            "⚠️ Проект не найден.", reply_markup=main_projects_keyboard()
+        )
+        return
+
+    # Проверяем, принадлежит ли проект пользователю
+    if project.user_id != callback.from_user.id:
+        await callback.answer("У вас нет доступа к этому проекту.", show_alert=True)
+        return
+
+    if action == "toggle_digest":
+        changes = {"digest_enabled": not project.digest_enabled}
+    else:
+        # Следующее окно из списка, после последнего - снова первое
+        next_index = (
+            DIGEST_WINDOWS.index(project.digest_window) + 1
+            if project.digest_window in DIGEST_WINDOWS
+            else 0
+        )
+        changes = {"digest_window": DIGEST_WINDOWS[next_index % len(DIGEST_WINDOWS)]}
+
+    updated_project = db.update_project(project_id, **changes)
+    if not updated_project:
+        await callback.answer("Не удалось изменить настройки проекта.", show_alert=True)
+        return
+
+    chats_count = len(db.get_project_chats(project_id))
+    status_text = "🟢 Активен" if updated_project.is_active else "🔴 Остановлен"
+
+    await callback.message.edit_text(
+        f"📊 <b>Проект: {updated_project.name}</b>\n\n"
+        f"Статус: {status_text}\n"
+        f"Описание: {updated_project.description or 'Не указано'}\n"
+        f"Количество чатов: {chats_count}\n"
+        f"Дайджест: {digest_status_text(updated_project)}\n\n"
         f"Выберите действие:",
         reply_markup=project_manage_keyboard(updated_project),
         parse_mode="HTML",
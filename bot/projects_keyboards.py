@@ -49,14 +49,45 @@ def projects_list_keyboard(projects: List[Project]) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(inline_keyboard=keyboard)
 
 
+# Варианты окна дайджеста (в секундах), переключаются по кругу
+DIGEST_WINDOWS = [30, 60, 300, 900]
+
+
+def format_digest_window(seconds: int) -> str:
+    return f"{seconds // 60} мин" if seconds >= 60 else f"{seconds} сек"
+
+
+def digest_status_text(project: Project) -> str:
+    """Строка режима дайджеста для карточки проекта"""
+    if not project.digest_enabled:
+        return "выключен"
+    return f"каждые {format_digest_window(project.digest_window)}"
+
+
 def project_manage_keyboard(project: Project) -> InlineKeyboardMarkup:
     """Клавиатура для управления конкретным проектом"""
     status_text = "🔴 Остановить" if project.is_active else "🟢 Запустить"
     status_callback = f"toggle_project|{project.id}"
 
+    # Режим дайджеста: уведомления за окно приходят одним сообщением
+    digest_row = [
+        InlineKeyboardButton(
+            text="📨 Дайджест: вкл" if project.digest_enabled else "📨 Дайджест: выкл",
+            callback_data=f"toggle_digest|{project.id}",
+        )
+    ]
+    if project.digest_enabled:
+        digest_row.append(
+            InlineKeyboardButton(
+                text=f"⏱ Окно: {format_digest_window(project.digest_window)}",
+                callback_data=f"digest_window|{project.id}",
+            )
+        )
+
     return InlineKeyboardMarkup(
         inline_keyboard=[
             [InlineKeyboardButton(text=status_text, callback_data=status_callback)],
+            digest_row,
             [
                 InlineKeyboardButton(
                     text="📋 Чаты проекта", callback_data=f"project_chats|{project.id}"
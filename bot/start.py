@@ -5,20 +5,21 @@ from aiogram.filters import Command
 from aiogram.fsm.context import FSMContext
 from bot.utils.funcs import notify_admins
 from config.parameters_manager import ParametersManager
-from db.database import Database
+from db.async_database import AsyncDatabase
 from .check_channels import check_subscription, get_subscription_keyboard
 
 from .keyboards import start_keyboard
 
 router = Router(name="start")
-db = Database()
 
 
 @router.message(Command("start"))
-async def start_command(message: types.Message, state: FSMContext):
+async def start_command(
+    message: types.Message, state: FSMContext, async_db: AsyncDatabase
+):
     args = message.text.split()[1] if len(message.text.split()) > 1 else None
 
-    user, is_new = db.get_or_create_or_update_user(
+    user, is_new = await async_db.get_or_create_or_update_user(
         user_id=message.from_user.id,
         username=message.from_user.username,
         full_name=message.from_user.first_name,
@@ -30,7 +31,7 @@ async def start_command(message: types.Message, state: FSMContext):
 
     if args:
         # Получаем ссылку и увеличиваем счетчик кликов
-        db.get_or_create_referral_link(args)
+        await async_db.get_or_create_referral_link(args)
 
     if is_new:
         # Уведомляем админов о новом пользователе
@@ -43,7 +44,7 @@ async def start_command(message: types.Message, state: FSMContext):
 
         if args:
             # Получаем статистику внутри одной сессии
-            stats = db.get_link_statistics(args)
+            stats = await async_db.get_link_statistics(args)
             if stats:
                 admin_message += (
                     f"\nМетка: {args}, всего кликов: {stats['users_count']}"
@@ -62,7 +63,7 @@ async def start_command(message: types.Message, state: FSMContext):
         )
 
     # Получаем информацию о тарифе пользователя
-    tariff_info = db.get_user_tariff_info(message.from_user.id)
+    tariff_info = await async_db.get_user_tariff_info(message.from_user.id)
 
     # Формируем текст сообщения
     message_text = f"Привет, {message.from_user.first_name}!\n\nВаш баланс: {user.balance} ₽\nВаш ID: <code>{message.from_user.id}</code>"
@@ -102,10 +103,12 @@ async def support_callback(callback: types.CallbackQuery):
 
 
 @router.callback_query(F.data == "back_to_menu")
-async def back_to_menu(callback: types.CallbackQuery, state: FSMContext):
+async def back_to_menu(
+    callback: types.CallbackQuery, state: FSMContext, async_db: AsyncDatabase
+):
     await state.clear()
 
-    user = db.get_user(callback.from_user.id)
+    user = await async_db.get_user(callback.from_user.id)
     keyboard = copy.deepcopy(start_keyboard)
 
     if user.is_admin:
@@ -118,7 +121,7 @@ async def back_to_menu(callback: types.CallbackQuery, state: FSMContext):
         )
 
     # Получаем информацию о тарифе пользователя
-    tariff_info = db.get_user_tariff_info(callback.from_user.id)
+    tariff_info = await async_db.get_user_tariff_info(callback.from_user.id)
 
     # Формируем текст сообщения
     message_text = f"Привет, {callback.from_user.first_name}!\n\nВаш баланс: {user.balance} ₽\nВаш ID: <code>{callback.from_user.id}</code>"
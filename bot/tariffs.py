@@ -13,13 +13,13 @@ import logging
 import os
 from datetime import datetime, timedelta
 
-from db.database import Database
+from db.provider import database
 from bot.payment_systems import PaymentSystems
 from bot.utils.funcs import error_notify
 from config.parameters_manager import ParametersManager
 
 router = Router(name="tariffs")
-db = Database()
+db = database
 payment_systems = PaymentSystems()
 
 # Путь к директории с логотипами тарифов
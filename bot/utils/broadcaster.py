@@ -0,0 +1,268 @@
+import asyncio
+import json
+import logging
+import time
+from collections import defaultdict
+from typing import Dict, List
+
+from aiogram import Bot, types
+from aiogram.exceptions import TelegramForbiddenError
+
+from bot.utils.rate_limiter import delivery_limiter
+from db.activity_buffer import activity_buffer
+from db.database import Database
+from db.models import BroadcastJob
+
+logger = logging.getLogger(__name__)
+
+
+class Broadcaster:
+    """
+    Рассылки администратора.
+
+    Получатели рассылки хранятся в БД (broadcast_recipients) вместе с
+    результатом отправки, поэтому прерванная перезапуском рассылка
+    продолжается с места остановки (resume_unfinished). Сообщения уходят
+    параллельно, частоту ограничивает общий для бота delivery_limiter.
+    """
+
+    def __init__(self, bot: Bot, db: Database):
+        self.bot = bot
+        self.db = db
+        # Одновременных запросов к Bot API
+        self.concurrency = 30
+        # Сколько получателей загружается за раз
+        self.batch_size = 200
+        # Результаты записываются по мере отправки, пачками такого размера,
+        # чтобы после перезапуска не отправить рассылку повторно
+        self.status_flush_size = 20
+        # Как часто обновлять сообщение с прогрессом (в секундах)
+        self.progress_interval = 5
+        self.tasks: Dict[int, asyncio.Task] = {}
+
+    async def start_copy(
+        self, message: types.Message, status_message: types.Message
+    ) -> BroadcastJob:
+        """Запускает рассылку копии сообщения"""
+        payload = {"from_chat_id": message.chat.id, "message_id": message.message_id}
+        return self._start(message.from_user.id, "copy", payload, status_message)
+
+    async def start_media_group(
+        self, admin_id: int, media: List[dict], status_message: types.Message
+    ) -> BroadcastJob:
+        """
+        Запускает рассылку альбома
+
+        Args:
+            media: [{"type": "photo" | "video" | "document", "media": file_id, "caption": ...}]
+        """
+        return self._start(admin_id, "media_group", media, status_message)
+
+    def _start(
+        self, admin_id: int, kind: str, payload, status_message: types.Message
+    ) -> BroadcastJob:
+        job = self.db.create_broadcast_job(
+            admin_id,
+            kind,
+            json.dumps(payload, ensure_ascii=False),
+            status_chat_id=status_message.chat.id,
+            status_message_id=status_message.message_id,
+        )
+        logger.info(f"Создана рассылка {job.id} ({kind}) на {job.total} пользователей")
+        self.tasks[job.id] = asyncio.create_task(self._run(job))
+        return job
+
+    async def resume_unfinished(self) -> int:
+        """Продолжает рассылки, прерванные перезапуском бота"""
+        jobs = self.db.get_unfinished_broadcast_jobs()
+        for job in jobs:
+            if job.id not in self.tasks:
+                logger.info(f"Продолжаем прерванную рассылку {job.id}")
+                self.tasks[job.id] = asyncio.create_task(self._run(job))
+        return len(jobs)
+
+    async def stop(self):
+        """Останавливает рассылки, незавершенные продолжатся при следующем запуске"""
+        for task in self.tasks.values():
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        self.tasks.clear()
+
+    async def _run(self, job: BroadcastJob):
+        """Отправляет рассылку всем получателям, которым она еще не отправлена"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        payload = json.loads(job.payload)
+        # Первый прогресс показываем сразу после первой пачки
+        last_report = 0.0
+        after_id = 0
+
+        try:
+            while True:
+                recipients = self.db.get_pending_broadcast_recipients(
+                    job.id, after_id, self.batch_size
+                )
+                if not recipients:
+                    break
+                after_id = recipients[-1][0]
+
+                # (id получателя, user_id, статус) еще не записанных отправок
+                completed = []
+                try:
+                    await asyncio.gather(
+                        *(
+                            self._deliver_and_record(
+                                job, payload, recipient_id, user_id, semaphore, completed
+                            )
+                            for recipient_id, user_id in recipients
+                        )
+                    )
+                finally:
+                    # В том числе при остановке посреди пачки
+                    self._save_statuses(completed)
+
+                if time.monotonic() - last_report >= self.progress_interval:
+                    await self._report_progress(job)
+                    last_report = time.monotonic()
+
+            self.db.finish_broadcast_job(job.id)
+            await self._report_finished(job)
+        except asyncio.CancelledError:
+            logger.info(f"Рассылка {job.id} приостановлена")
+            raise
+        except Exception as e:
+            logger.error(f"Ошибка при выполнении рассылки {job.id}: {e}")
+        finally:
+            self.tasks.pop(job.id, None)
+
+    async def _deliver_and_record(
+        self,
+        job: BroadcastJob,
+        payload,
+        recipient_id: int,
+        user_id: int,
+        semaphore: asyncio.Semaphore,
+        completed: list,
+    ):
+        status = await self._deliver(job, payload, user_id, semaphore)
+        completed.append((recipient_id, user_id, status))
+        if len(completed) >= self.status_flush_size:
+            self._save_statuses(completed)
+
+    def _save_statuses(self, completed: list) -> None:
+        """Записывает накопленные результаты отправки и очищает список"""
+        if not completed:
+            return
+        # Записываем по статусам, а не по одному
+        by_status = defaultdict(list)
+        for recipient_id, user_id, status in completed:
+            by_status[status].append(recipient_id)
+            # Активность пользователей пишется в БД пачками
+            if status in ("sent", "blocked"):
+                activity_buffer.mark(user_id, status == "sent")
+        for status, recipient_ids in by_status.items():
+            self.db.set_broadcast_recipients_status(recipient_ids, status)
+        completed.clear()
+
+    async def _deliver(
+        self, job: BroadcastJob, payload, user_id: int, semaphore: asyncio.Semaphore
+    ) -> str:
+        """Отправляет рассылку одному пользователю и возвращает статус получателя"""
+        async with semaphore:
+            try:
+                # RetryAfter пережидается внутри, пауза действует на все отправки бота
+                # Альбом расходует лимит по числу файлов
+                cost = len(payload) if job.kind == "media_group" else 1
+                await delivery_limiter.send(
+                    user_id, lambda: self._send(job, payload, user_id), cost
+                )
+                logger.debug(f"Рассылка {job.id} отправлена пользователю {user_id}")
+                return "sent"
+            except TelegramForbiddenError:
+                logger.info(f"Пользователь {user_id} заблокировал бота")
+                return "blocked"
+            except Exception as e:
+                logger.error(
+                    f"Ошибка отправки рассылки {job.id} пользователю {user_id}: {e}"
+                )
+                return "failed"
+
+    async def _send(self, job: BroadcastJob, payload, user_id: int):
+        if job.kind == "copy":
+            await self.bot.copy_message(
+                chat_id=user_id,
+                from_chat_id=payload["from_chat_id"],
+                message_id=payload["message_id"],
+            )
+        else:
+            await self.bot.send_media_group(
+                chat_id=user_id, media=self._build_media_group(payload)
+            )
+
+    @staticmethod
+    def _build_media_group(media: List[dict]) -> list:
+        media_types = {
+            "photo": types.InputMediaPhoto,
+            "video": types.InputMediaVideo,
+            "document": types.InputMediaDocument,
+        }
+        return [
+            media_types[item["type"]](media=item["media"], caption=item.get("caption"))
+            for item in media
+        ]
+
+    def _progress_text(self, job: BroadcastJob, progress: dict) -> str:
+        done = sum(count for status, count in progress.items() if status != "pending")
+        return (
+            f"⏳ Рассылка: {done} из {job.total}\n"
+            f"• Успешно отправлено: {progress.get('sent', 0)}\n"
+            f"• Заблокировали бота: {progress.get('blocked', 0)}\n"
+            f"• Другие ошибки: {progress.get('failed', 0)}"
+        )
+
+    async def _report_progress(self, job: BroadcastJob):
+        """Обновляет сообщение администратору с прогрессом рассылки"""
+        if not job.status_chat_id or not job.status_message_id:
+            return
+        progress = self.db.get_broadcast_progress(job.id)
+        try:
+            # Тот же лимит, что и у рассылки: чат администратора - один из чатов бота
+            await delivery_limiter.send(
+                job.status_chat_id,
+                lambda: self.bot.edit_message_text(
+                    self._progress_text(job, progress),
+                    chat_id=job.status_chat_id,
+                    message_id=job.status_message_id,
+                ),
+            )
+        except Exception as e:
+            logger.debug(f"Не удалось обновить прогресс рассылки {job.id}: {e}")
+
+    async def _report_finished(self, job: BroadcastJob):
+        """Отправляет администратору итог рассылки"""
+        progress = self.db.get_broadcast_progress(job.id)
+        logger.info(
+            f"Рассылка {job.id} завершена. Успешно: {progress.get('sent', 0)}, "
+            f"заблокировано: {progress.get('blocked', 0)}, других ошибок: {progress.get('failed', 0)}"
+        )
+        title = "альбома " if job.kind == "media_group" else ""
+        chat_id = job.status_chat_id or job.admin_id
+        text = (
+            f"✅ Рассылка {title}завершена\n"
+            f"📊 Статистика:\n"
+            f"• Всего пользователей: {job.total}\n"
+            f"• Успешно отправлено: {progress.get('sent', 0)}\n"
+            f"• Заблокировали бота: {progress.get('blocked', 0)}\n"
+            f"• Другие ошибки: {progress.get('failed', 0)}"
+        )
+        keyboard = types.InlineKeyboardMarkup(
+            inline_keyboard=[
+                [types.InlineKeyboardButton(text="◀️ Назад", callback_data="back_to_admin")]
+            ]
+        )
+        try:
+            await delivery_limiter.send(
+                chat_id,
+                lambda: self.bot.send_message(chat_id, text, reply_markup=keyboard),
+            )
+        except Exception as e:
+            logger.error(f"Ошибка при отправке итогов рассылки {job.id}: {e}")
@@ -3,9 +3,10 @@ from aiogram import Bot
 
 import logging
 
-from db.database import Database
+from bot.utils.rate_limiter import delivery_limiter
+from db.provider import database
 
-db = Database()
+db = database
 
 
 async def notify_admins(bot: Bot, message: str):
@@ -13,7 +14,9 @@ async def notify_admins(bot: Bot, message: str):
     admins = db.get_admins()
     for admin in admins:
         try:
-            await bot.send_message(admin.user_id, message)
+            await delivery_limiter.send(
+                admin.user_id, lambda: bot.send_message(admin.user_id, message)
+            )
         except Exception as e:
             logging.error(f"Ошибка при отправке сообщения админу {admin.user_id}: {e}")
 
@@ -0,0 +1,51 @@
+from typing import Any, Awaitable, Callable, Dict
+
+from aiogram import BaseMiddleware
+from aiogram.types import TelegramObject
+
+from db.activity_buffer import activity_buffer
+from db.provider import get_async_database, get_database
+
+
+class DatabaseMiddleware(BaseMiddleware):
+    """
+    Передает в обработчики общий экземпляр БД процесса.
+
+    Обработчик получает его, объявив аргумент db (Database)
+    или async_db (AsyncDatabase).
+
+    Пока так сделано только в bot/start.py: остальные модули бота
+    по-прежнему берут БД из модульной ссылки db = database (db.provider).
+    Это тот же экземпляр процесса, поэтому новые обработчики лучше писать
+    с аргументами, а старые переводить по мере правок.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        data["db"] = get_database()
+        data["async_db"] = get_async_database()
+        return await handler(event, data)
+
+
+class ActivityMiddleware(BaseMiddleware):
+    """
+    Отмечает активными пользователей, приславших боту обновление.
+
+    Заблокировавший бота пользователь не может ему писать, поэтому любое
+    обновление от него означает, что бот снова разблокирован.
+    """
+
+    async def __call__(
+        self,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
+        data: Dict[str, Any],
+    ) -> Any:
+        user = data.get("event_from_user")
+        if user and activity_buffer.is_blocked(user.id):
+            activity_buffer.mark(user.id, True)
+        return await handler(event, data)
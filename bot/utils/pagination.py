@@ -1,68 +1,120 @@
-from typing import List, TypeVar, Callable
+from typing import List, Optional, TypeVar, Callable
 from aiogram.types import InlineKeyboardMarkup, InlineKeyboardButton
 
 T = TypeVar('T')
 
+# Функция загрузки страницы: (after_id, before_id, limit) -> элементы по возрастанию ключа
+PageFetcher = Callable[[Optional[int], Optional[int], int], List[T]]
+
 class Paginator:
     """
     Универсальный класс для создания пагинации
+
+    Работает в двух режимах:
+    - items: весь список передается сразу и режется на страницы;
+    - fetch_page: из БД загружается только нужная страница по ключу
+      (keyset), ключ соседней страницы передается в callback_data кнопок.
     """
     def __init__(
         self,
-        items: List[T],
+        items: Optional[List[T]],
         items_per_page: int,
         callback_prefix: str,
         item_callback: Callable[[T], tuple[str, str]],
         return_callback: str,
+        fetch_page: Optional[PageFetcher] = None,
+        item_key: Optional[Callable[[T], int]] = None,
     ):
         """
         Args:
-            items: Список элементов для пагинации
+            items: Список элементов для пагинации (None в режиме fetch_page)
             items_per_page: Количество элементов на странице
             callback_prefix: Префикс для callback_data
             item_callback: Функция, возвращающая (текст, callback_data) для каждого элемента
+            fetch_page: Функция загрузки страницы (after_id, before_id, limit)
+            item_key: Функция, возвращающая ключ (id) элемента для fetch_page
         """
         self.items = items
         self.items_per_page = items_per_page
         self.callback_prefix = callback_prefix
         self.item_callback = item_callback
-        self.total_pages = (len(items) + items_per_page - 1) // items_per_page
+        self.fetch_page = fetch_page
+        self.item_key = item_key
+        self.total_pages = (
+            (len(items) + items_per_page - 1) // items_per_page if items is not None else None
+        )
         self.return_callback = return_callback
 
-    def get_page_keyboard(self, page: int) -> InlineKeyboardMarkup:
+    @staticmethod
+    def parse_page_callback(data: str) -> tuple[int, Optional[str]]:
+        """Разбирает callback_data кнопки страницы: (номер страницы, ключ или None)"""
+        parts = data.rsplit("_page_", 1)[-1].split("_")
+        return int(parts[0]), parts[1] if len(parts) > 1 else None
+
+    def _load_page(self, page: int, cursor: Optional[str]) -> tuple[List[T], bool]:
+        """Загружает страницу через fetch_page и определяет, есть ли следующая"""
+        limit = self.items_per_page
+        if cursor and cursor.startswith("b"):
+            # Назад: следующая страница точно есть - мы пришли с нее
+            items = self.fetch_page(None, int(cursor[1:]), limit)
+            return items, True
+
+        after_id = int(cursor[1:]) if cursor and page > 0 else None
+        # Берем на один элемент больше, чтобы узнать о наличии следующей страницы
+        items = self.fetch_page(after_id, None, limit + 1)
+        return items[:limit], len(items) > limit
+
+    def get_page_keyboard(self, page: int, cursor: Optional[str] = None) -> InlineKeyboardMarkup:
         """Создает клавиатуру для указанной страницы"""
         keyboard = []
-        
-        # Добавляем элементы текущей страницы
-        start_idx = page * self.items_per_page
-        end_idx = min(start_idx + self.items_per_page, len(self.items))
-        
-        for item in self.items[start_idx:end_idx]:
+
+        if self.fetch_page:
+            page_items, has_next = self._load_page(page, cursor)
+        else:
+            # Добавляем элементы текущей страницы
+            start_idx = page * self.items_per_page
+            end_idx = min(start_idx + self.items_per_page, len(self.items))
+            page_items = self.items[start_idx:end_idx]
+            has_next = page < self.total_pages - 1
+
+        for item in page_items:
             text, callback = self.item_callback(item)
             keyboard.append([InlineKeyboardButton(text=text, callback_data=callback)])
 
+        # Ключи соседних страниц для режима fetch_page
+        prev_suffix = next_suffix = ""
+        if self.fetch_page and page_items:
+            prev_suffix = f"_b{self.item_key(page_items[0])}"
+            next_suffix = f"_a{self.item_key(page_items[-1])}"
+
         # Добавляем навигационные кнопки
         nav_buttons = []
-        
+
         if page > 0:
             nav_buttons.append(
                 InlineKeyboardButton(
-                    text="◀️", callback_data=f"{self.callback_prefix}_page_{page-1}"
+                    text="◀️",
+                    callback_data=f"{self.callback_prefix}_page_{page-1}{prev_suffix}",
                 )
             )
-            
-        if self.total_pages > 1:
+
+        if self.fetch_page and (page > 0 or has_next):
+            nav_buttons.append(
+                InlineKeyboardButton(text=f"{page + 1}", callback_data="ignore")
+            )
+        elif self.total_pages and self.total_pages > 1:
             nav_buttons.append(
                 InlineKeyboardButton(
                     text=f"{page + 1}/{self.total_pages}",
                     callback_data="ignore"
                 )
             )
-            
-        if page < self.total_pages - 1:
+
+        if has_next:
             nav_buttons.append(
                 InlineKeyboardButton(
-                    text="▶️", callback_data=f"{self.callback_prefix}_page_{page+1}"
+                    text="▶️",
+                    callback_data=f"{self.callback_prefix}_page_{page+1}{next_suffix}",
                 )
             )
 
@@ -72,4 +124,4 @@ class Paginator:
         # Добавляем кнопку "Назад"
         keyboard.append([InlineKeyboardButton(text="◀️ Назад", callback_data=self.return_callback)])
 
-        return InlineKeyboardMarkup(inline_keyboard=keyboard)
\ No newline at end of file
+        return InlineKeyboardMarkup(inline_keyboard=keyboard)
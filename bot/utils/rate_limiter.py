@@ -0,0 +1,169 @@
+import asyncio
+import logging
+import time
+from typing import Awaitable, Callable, Dict, Optional, TypeVar
+
+from aiogram.exceptions import TelegramRetryAfter
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты отправки: в среднем rate операций в секунду,
+    кратковременно - до capacity подряд.
+
+    pause() останавливает выдачу на время, указанное Telegram в RetryAfter.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+        # Создается при первом acquire, внутри работающего цикла событий
+        self._lock: Optional[asyncio.Lock] = None
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """
+        Ждет, пока можно будет выполнить операцию стоимостью tokens
+
+        Операция дороже capacity ждет полного ведра и уводит его в минус,
+        так что следующие операции ждут, пока долг восстановится.
+        """
+        needed = min(tokens, self.capacity)
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self.paused_until:
+                    await asyncio.sleep(self.paused_until - now)
+                    continue
+
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= needed:
+                    self.tokens -= tokens
+                    return
+                await asyncio.sleep((needed - self.tokens) / self.rate)
+
+    def is_waiting(self) -> bool:
+        return self._lock is not None and self._lock.locked()
+
+    def pause(self, seconds: float) -> None:
+        """Приостанавливает выдачу на seconds секунд"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        # После паузы начинаем с пустого ведра, без накопленного всплеска
+        self.tokens = 0
+        self.updated = self.paused_until
+
+
+class DeliveryLimiter:
+    """
+    Общий ограничитель отправки сообщений ботом.
+
+    Telegram допускает около 30 сообщений в секунду всего и около одного
+    в секунду в один чат. Перед отправкой берется токен из ведра чата, затем
+    из общего ведра. На TelegramRetryAfter отправка в этот чат
+    приостанавливается ровно на retry_after секунд, после чего сообщение
+    отправляется повторно, но не больше max_retries раз: дальше ошибка
+    передается вызывающему. Все отправки бота приостанавливаются, только если
+    за flood_window секунд RetryAfter пришел из flood_chats разных чатов -
+    это уже общий лимит бота, а не лимит одного чата.
+    """
+
+    def __init__(
+        self,
+        global_rate: float = 30,
+        per_chat_rate: float = 1,
+        max_idle_chats: int = 10_000,
+        max_retries: int = 3,
+        flood_chats: int = 3,
+        flood_window: float = 10,
+    ):
+        self.global_bucket = TokenBucket(global_rate)
+        self.per_chat_rate = per_chat_rate
+        self.chat_buckets: Dict[int, TokenBucket] = {}
+        # Ведра чатов, из которых давно не отправляли, удаляются
+        self.max_idle_chats = max_idle_chats
+        self.max_retries = max_retries
+        self.flood_chats = flood_chats
+        self.flood_window = flood_window
+        # Время последнего RetryAfter по чатам {chat_id: time.monotonic()}
+        self.recent_floods: Dict[int, float] = {}
+
+    def _chat_bucket(self, chat_id: int) -> TokenBucket:
+        bucket = self.chat_buckets.get(chat_id)
+        if bucket is None:
+            if len(self.chat_buckets) >= self.max_idle_chats:
+                self._prune()
+            bucket = TokenBucket(self.per_chat_rate)
+            self.chat_buckets[chat_id] = bucket
+        return bucket
+
+    def _prune(self) -> None:
+        """Удаляет ведра, которые уже полностью восстановились"""
+        now = time.monotonic()
+        for chat_id, bucket in list(self.chat_buckets.items()):
+            refill_time = bucket.capacity / bucket.rate
+            if now - bucket.updated > refill_time and not bucket.is_waiting():
+                del self.chat_buckets[chat_id]
+
+    async def acquire(self, chat_id: int, cost: int = 1) -> None:
+        """
+        Ждет, пока в чат chat_id можно будет отправить cost сообщений
+
+        Альбом из N файлов - это N сообщений для лимитов Telegram.
+        """
+        await self._chat_bucket(chat_id).acquire(cost)
+        await self.global_bucket.acquire(cost)
+
+    def retry_after(self, chat_id: int, seconds: float) -> None:
+        """Учитывает ответ Telegram 429 с retry_after"""
+        self._chat_bucket(chat_id).pause(seconds)
+
+        now = time.monotonic()
+        self.recent_floods[chat_id] = now
+        for flood_chat_id, flood_at in list(self.recent_floods.items()):
+            if now - flood_at > self.flood_window:
+                del self.recent_floods[flood_chat_id]
+        if len(self.recent_floods) >= self.flood_chats:
+            logger.warning(
+                f"Flood control в {len(self.recent_floods)} чатах: "
+                f"приостанавливаем все отправки на {seconds} сек."
+            )
+            self.global_bucket.pause(seconds)
+
+    async def send(
+        self, chat_id: int, send: Callable[[], Awaitable[T]], cost: int = 1
+    ) -> T:
+        """
+        Выполняет отправку send() с учетом ограничений, повторяя ее после RetryAfter
+
+        После max_retries повторов TelegramRetryAfter пробрасывается, чтобы
+        один чат под flood control не занимал отправителя бесконечно.
+
+        Пример:
+            await delivery_limiter.send(user_id, lambda: bot.send_message(user_id, text))
+        """
+        for attempt in range(self.max_retries + 1):
+            await self.acquire(chat_id, cost)
+            try:
+                return await send()
+            except TelegramRetryAfter as e:
+                self.retry_after(chat_id, e.retry_after)
+                if attempt == self.max_retries:
+                    raise
+                logger.warning(
+                    f"Flood control при отправке в чат {chat_id}: ждем {e.retry_after} сек."
+                )
+
+
+# Общий ограничитель для всех отправок бота
+delivery_limiter = DeliveryLimiter()
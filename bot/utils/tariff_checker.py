@@ -1,52 +1,88 @@
+import heapq
 import logging
 import asyncio
 from datetime import datetime, timedelta
 from aiogram import Bot
+from aiogram.exceptions import TelegramForbiddenError
 from aiogram.types import InlineKeyboardButton, InlineKeyboardMarkup
 from db.database import Database
-from typing import Optional, List, Dict, Set, Tuple
+from bot.utils.rate_limiter import delivery_limiter
+from db.registry import state_registry
+from typing import NamedTuple, Optional, List, Set, Tuple
 
 logger = logging.getLogger(__name__)
 
 
+class TariffEvent(NamedTuple):
+    """Запланированное событие тарифа (элемент кучи, упорядочен по времени)"""
+
+    when: datetime
+    kind: str
+    user_id: int
+    end_date: datetime
+    # Сколько раз обработка события уже завершалась ошибкой
+    attempts: int = 0
+
+
 class TariffChecker:
     """Класс для проверки сроков действия тарифов пользователей"""
 
+    # Смещение событий относительно окончания тарифа
+    EVENT_OFFSETS = {
+        "day": timedelta(hours=-24),
+        "hour": timedelta(hours=-1),
+        "expired": timedelta(0),
+    }
+    # Насколько можно опоздать с предупреждением (например, после перезапуска)
+    MAX_LATENESS = {
+        "day": timedelta(hours=1),
+        "hour": timedelta(minutes=30),
+    }
+
     def __init__(self, bot: Bot, db: Database):
         self.bot = bot
         self.db = db
         self.running = False
         self.task = None
         self.message_processor = None
-        # Словарь для отслеживания отправленных уведомлений
-        # user_id -> set(notification_types)
-        self.notifications_sent: Dict[int, Set[str]] = {}
-        # Словарь для отслеживания времени истечения тарифов
-        # user_id -> datetime
-        self.tariff_expired_times: Dict[int, datetime] = {}
-        # Интервал между проверками (30 минут)
-        self.check_interval = 30 * 60
-        # Интервал для сброса истории уведомлений (24 часа)
-        self.reset_notifications_interval = 24 * 60 * 60
+        # Очередь событий по времени срабатывания (heapq).
+        # Отправленные уведомления хранятся в БД (tariff_notifications)
+        self.events: List[TariffEvent] = []
+        # Уже запланированные события, чтобы не дублировать их при пересинхронизации
+        self.scheduled: Set[Tuple[int, str, datetime]] = set()
+        # Будит цикл при появлении нового события
+        self.wakeup = asyncio.Event()
+        # Интервал пересинхронизации с БД (тарифы меняет и payment_webhook)
+        self.resync_interval = 60 * 60
+        # Пауза после ошибки перед повторной попыткой (для событий растет вдвое)
+        self.retry_delay = 60
+        self.max_retry_delay = 15 * 60
+        # Через сколько после истечения напоминать о продлении
+        self.post_expired_delay = timedelta(hours=24)
+        # Сколько хранить записи журнала после окончания срока тарифа
+        self.ledger_retention = timedelta(days=7)
 
     async def start(self, message_processor=None):
-        """Запускает периодическую проверку тарифов"""
+        """Запускает планировщик событий тарифов"""
         if self.running:
             logger.warning("Попытка запустить уже запущенную систему проверки тарифов")
             return
 
         self.message_processor = message_processor
         self.running = True
+        # Назначение и продление тарифа сразу добавляют события в очередь
+        state_registry.add_tariff_listener(self.on_tariff_changed)
         self.task = asyncio.create_task(self._check_loop())
         logger.info("Запущена система проверки тарифов")
 
     async def stop(self):
-        """Останавливает периодическую проверку тарифов"""
+        """Останавливает планировщик событий тарифов"""
         if not self.running:
             logger.warning("Попытка остановить не запущенную систему проверки тарифов")
             return
 
         self.running = False
+        state_registry.remove_tariff_listener(self.on_tariff_changed)
         if self.task:
             self.task.cancel()
             try:
@@ -54,111 +90,210 @@ class TariffChecker:
             except asyncio.CancelledError:
                 pass
         logger.info("Система проверки тарифов остановлена")
-        # Очищаем историю уведомлений при остановке
-        self.notifications_sent.clear()
-        self.tariff_expired_times.clear()
+        # Очищаем очередь при остановке, при запуске она восстановится из БД
+        self.events.clear()
+        self.scheduled.clear()
 
-    async def _check_loop(self):
-        """Основной цикл проверки тарифов"""
-        last_reset_time = asyncio.get_event_loop().time()
+    def on_tariff_changed(self, user_id: int, end_date: Optional[datetime]) -> None:
+        """Вызывается реестром при назначении или деактивации тарифа"""
+        if end_date is not None:
+            self.schedule_tariff(user_id, end_date)
 
-        while self.running:
-            try:
-                current_time = asyncio.get_event_loop().time()
+    def schedule_tariff(self, user_id: int, end_date: datetime) -> None:
+        """Добавляет в очередь события для срока тарифа"""
+        now = datetime.now()
+        for kind, offset in self.EVENT_OFFSETS.items():
+            when = end_date + offset
+            lateness = self.MAX_LATENESS.get(kind)
+            if lateness is not None and when + lateness < now:
+                continue
+            self._push(TariffEvent(when, kind, user_id, end_date))
 
-                # Сбрасываем историю уведомлений каждые 24 часа
-                if current_time - last_reset_time >= self.reset_notifications_interval:
-                    self.notifications_sent.clear()
-                    last_reset_time = current_time
-                    logger.info("Очищена история отправленных уведомлений о тарифах")
+    def _push(self, event: TariffEvent) -> None:
+        key = (event.user_id, event.kind, event.end_date)
+        if key in self.scheduled:
+            return
+        self.scheduled.add(key)
+        heapq.heappush(self.events, event)
+        # Будим цикл, если событие раньше текущего ожидания
+        if self.events[0] is event:
+            self.wakeup.set()
 
-                # Проверяем тарифы
-                await self._check_expiring_tariffs()
+    async def _check_loop(self):
+        """Основной цикл: спит до ближайшего события или пересинхронизации"""
+        loop = asyncio.get_running_loop()
+        next_resync = loop.time()
 
-                # Проверка каждые 30 минут
-                await asyncio.sleep(self.check_interval)
+        while self.running:
+            try:
+                self.wakeup.clear()
+
+                if loop.time() >= next_resync:
+                    await self._resync()
+                    next_resync = loop.time() + self.resync_interval
+
+                # Собираем все наступившие события
+                now = datetime.now()
+                due = []
+                while self.events and self.events[0].when <= now:
+                    event = heapq.heappop(self.events)
+                    self.scheduled.discard((event.user_id, event.kind, event.end_date))
+                    due.append(event)
+                if due:
+                    await self._handle_events(due, now)
+
+                delay = next_resync - loop.time()
+                if self.events:
+                    delay = min(
+                        delay, (self.events[0].when - datetime.now()).total_seconds()
+                    )
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=max(delay, 0))
+                except asyncio.TimeoutError:
+                    pass
             except asyncio.CancelledError:
                 break
             except Exception as e:
                 logger.error(f"Ошибка при проверке тарифов: {str(e)}")
-                await asyncio.sleep(
-                    300
-                )  # При ошибке ждем 5 минут перед повторной попыткой
+                await asyncio.sleep(self.retry_delay)
 
-    async def _check_expiring_tariffs(self):
-        """Проверяет срок действия тарифов и отправляет уведомления"""
+    async def _resync(self):
+        """Деактивирует истекшие тарифы и планирует события до следующей пересинхронизации"""
         now = datetime.now()
-        one_day_ahead = now + timedelta(days=1)
-        one_hour_ahead = now + timedelta(hours=1)
-
-        # Получаем все активные тарифы
-        active_tariffs = self.db.get_all_active_user_tariffs()
-        logger.info(f"Проверка {len(active_tariffs)} активных тарифов")
-
-        # Получаем неактивные тарифы для проверки тех, которые истекли 24 часа назад
-        inactive_tariffs = self.db.get_inactive_user_tariffs()
-
-        # Проверяем неактивные тарифы для отправки уведомления через 24 часа после истечения
-        for user_id, expired_time in list(self.tariff_expired_times.items()):
-            # Если прошло 24 часа с момента истечения тарифа
-            if now - expired_time >= timedelta(hours=24):
-                # Проверяем, не отправляли ли мы уже уведомление через 24 часа после истечения
-                if not self._was_notification_sent(user_id, "post_expired"):
-                    await self._send_post_expired_notification(user_id)
-                    self._mark_notification_sent(user_id, "post_expired")
-                # Удаляем из словаря, так как уже отправили
-                del self.tariff_expired_times[user_id]
-
-        for tariff in active_tariffs:
-            # Проверяем, не истёк ли уже тариф
-            if tariff.end_date <= now:
-                # Тариф истёк, деактивируем его
-                self.db.deactivate_user_tariff(tariff.user_id)
-
-                # Запоминаем время истечения тарифа
-                self.tariff_expired_times[tariff.user_id] = now
-
-                # Проверяем, не отправляли ли мы уже уведомление об истечении
-                if not self._was_notification_sent(tariff.user_id, "expired"):
-                    await self._send_expired_notification(tariff.user_id)
-                    self._mark_notification_sent(tariff.user_id, "expired")
+        await self.process_expired_tariffs(now)
+
+        # События "за день" для тарифов, истекающих до следующей пересинхронизации
+        horizon = now + timedelta(seconds=self.resync_interval) + timedelta(hours=24)
+        tariffs = self.db.get_user_tariffs_expiring_between(now, horizon)
+        for tariff in tariffs:
+            self.schedule_tariff(tariff.user_id, tariff.end_date)
+
+        # Напоминания о продлении для тарифов, истекших за последние сутки
+        # (после перезапуска отправленные отсекаются журналом)
+        expired = self.db.get_user_tariffs_expiring_between(
+            now - self.post_expired_delay, now, active=False
+        )
+        for tariff in expired:
+            self._push(
+                TariffEvent(
+                    tariff.end_date + self.post_expired_delay,
+                    "post_expired",
+                    tariff.user_id,
+                    tariff.end_date,
+                )
+            )
+
+        removed = self.db.delete_tariff_notifications_before(now - self.ledger_retention)
+        logger.info(
+            f"Запланированы события для {len(tariffs) + len(expired)} тарифов, "
+            f"в очереди {len(self.events)}, удалено {removed} старых записей журнала"
+        )
+
+    async def _handle_events(self, events: List[TariffEvent], now: datetime):
+        """Выполняет наступившие события, сверяясь с журналом одним запросом"""
+        keys = [
+            (event.user_id, event.kind, event.end_date)
+            for event in events
+            if event.kind != "expired"
+        ]
+        try:
+            if any(event.kind == "expired" for event in events):
+                await self.process_expired_tariffs(now)
+            sent = self.db.get_sent_tariff_notifications(keys)
+        except Exception as e:
+            logger.error(f"Ошибка при обработке событий тарифов: {str(e)}")
+            for event in events:
+                self._retry(event, now)
+            return
+
+        delivered = []
+        for event in events:
+            key = (event.user_id, event.kind, event.end_date)
+            if event.kind == "expired" or key in sent:
                 continue
+            try:
+                if await self._handle_event(event, now):
+                    delivered.append(key)
+            except Exception as e:
+                logger.error(
+                    f"Ошибка при обработке события {event.kind} тарифа пользователя {event.user_id}: {str(e)}"
+                )
+                self._retry(event, now)
+        self.db.mark_tariff_notifications_sent(delivered)
+
+    def _retry(self, event: TariffEvent, now: datetime) -> None:
+        """Возвращает событие в очередь с нарастающей паузой"""
+        delay = min(self.retry_delay * 2**event.attempts, self.max_retry_delay)
+        when = now + timedelta(seconds=delay)
+
+        # Предупреждение, опоздавшее больше допустимого, уже не отправляем
+        lateness = self.MAX_LATENESS.get(event.kind)
+        if (
+            lateness is not None
+            and when > event.end_date + self.EVENT_OFFSETS[event.kind] + lateness
+        ):
+            logger.warning(
+                f"Событие {event.kind} тарифа пользователя {event.user_id} пропущено: "
+                f"не удалось обработать вовремя"
+            )
+            return
+        self._push(event._replace(when=when, attempts=event.attempts + 1))
 
-            # Получаем разницу во времени для более точной проверки
-            time_diff = tariff.end_date - now
-            hours_left = time_diff.total_seconds() / 3600
+    async def _handle_event(self, event: TariffEvent, now: datetime) -> bool:
+        """Отправляет уведомление события, если оно еще актуально"""
+        # Тариф могли продлить или отключить после планирования события
+        user_tariff = self.db.get_user_tariff(event.user_id)
 
-            # Проверяем истекающие через день тарифы (от 23 до 24 часов)
-            if 23 <= hours_left <= 24:
-                if not self._was_notification_sent(tariff.user_id, "day"):
-                    await self._send_expiring_soon_notification(
-                        tariff.user_id, hours_left, "день"
-                    )
-                    self._mark_notification_sent(tariff.user_id, "day")
+        if event.kind == "post_expired":
+            # Напоминаем, только если тариф так и не продлили
+            if user_tariff:
+                return False
+            await self._send_post_expired_notification(event.user_id)
+            return True
 
-            # Проверяем истекающие через час тарифы (от 0.5 до 1 часа)
-            elif 0.5 <= hours_left <= 1:
-                if not self._was_notification_sent(tariff.user_id, "hour"):
-                    await self._send_expiring_soon_notification(
-                        tariff.user_id, hours_left * 60, "час"
-                    )
-                    self._mark_notification_sent(tariff.user_id, "hour")
+        if not user_tariff or user_tariff.end_date != event.end_date:
+            return False
 
-    def _was_notification_sent(self, user_id: int, notification_type: str) -> bool:
-        """Проверяет, было ли отправлено уведомление данного типа пользователю"""
-        return (
-            user_id in self.notifications_sent
-            and notification_type in self.notifications_sent[user_id]
-        )
+        hours_left = (event.end_date - now).total_seconds() / 3600
+        if event.kind == "day":
+            await self._send_expiring_soon_notification(
+                event.user_id, hours_left, "день"
+            )
+        else:
+            await self._send_expiring_soon_notification(
+                event.user_id, hours_left * 60, "час"
+            )
+        return True
 
-    def _mark_notification_sent(self, user_id: int, notification_type: str):
-        """Отмечает, что уведомление данного типа было отправлено пользователю"""
-        if user_id not in self.notifications_sent:
-            self.notifications_sent[user_id] = set()
-        self.notifications_sent[user_id].add(notification_type)
-        logger.debug(
-            f"Отмечено уведомление типа {notification_type} для пользователя {user_id}"
-        )
+    async def process_expired_tariffs(self, now: Optional[datetime] = None) -> int:
+        """
+        Деактивирует истекшие тарифы и отправляет уведомления об истечении
+
+        Returns:
+            int: количество деактивированных тарифов
+        """
+        now = now or datetime.now()
+        expired_tariffs = self.db.expire_user_tariffs(now)
+        if not expired_tariffs:
+            return 0
+        logger.info(f"Деактивировано {len(expired_tariffs)} истекших тарифов")
+
+        keys = [(user_id, "expired", end_date) for user_id, end_date in expired_tariffs]
+        sent = self.db.get_sent_tariff_notifications(keys)
+        for key in keys:
+            user_id, _, end_date = key
+            if key not in sent:
+                await self._send_expired_notification(user_id)
+
+            # Через сутки после окончания срока напоминаем о продлении
+            self._push(
+                TariffEvent(
+                    end_date + self.post_expired_delay, "post_expired", user_id, end_date
+                )
+            )
+        self.db.mark_tariff_notifications_sent([key for key in keys if key not in sent])
+
+        return len(expired_tariffs)
 
     async def _send_expiring_soon_notification(
         self, user_id: int, time_left: float, period: str
@@ -176,30 +311,40 @@ class TariffChecker:
                 ]
             )
 
-            await self.bot.send_message(
+            await delivery_limiter.send(
                 user_id,
-                f"⚠️ <b>Внимание!</b>\n\n"
-                f"Ваш тариф истекает через {period}.\n"
-                f"Не ждите!\n\n"
-                f"🔍  Продли подписку прямо сейчас чтобы получать уведомления о новых лидах (заявках) по вашим ключевым словам.",
-                reply_markup=keyboard,
+                lambda: self.bot.send_message(
+                    user_id,
+                    f"⚠️ <b>Внимание!</b>\n\n"
+                    f"Ваш тариф истекает через {period}.\n"
+                    f"Не ждите!\n\n"
+                    f"🔍  Продли подписку прямо сейчас чтобы получать уведомления о новых лидах (заявках) по вашим ключевым словам.",
+                    reply_markup=keyboard,
+                ),
             )
             logger.info(
                 f"Отправлено уведомление о скором истечении тарифа (через {period}) пользователю {user_id}"
             )
+        except TelegramForbiddenError:
+            logger.info(f"Пользователь {user_id} заблокировал бота")
         except Exception as e:
             logger.error(
                 f"Ошибка при отправке уведомления о истечении тарифа пользователю {user_id}: {str(e)}"
             )
+            # Повторная отправка - в планировщике (_retry)
+            raise
 
     async def _send_expired_notification(self, user_id: int):
         """Отправляет уведомление об истечении тарифа"""
         try:
-            await self.bot.send_message(
+            await delivery_limiter.send(
                 user_id,
-                f"❌ <b>Тариф истёк!</b>\n\n"
-                f"Ваш тариф истёк. Теперь вы не будете получать полные уведомления о ключевых словах. "
-                f"Чтобы возобновить работу, пожалуйста, продлите свой тариф.",
+                lambda: self.bot.send_message(
+                    user_id,
+                    f"❌ <b>Тариф истёк!</b>\n\n"
+                    f"Ваш тариф истёк. Теперь вы не будете получать полные уведомления о ключевых словах. "
+                    f"Чтобы возобновить работу, пожалуйста, продлите свой тариф.",
+                ),
             )
             logger.info(
                 f"Отправлено уведомление об истечении тарифа пользователю {user_id}"
@@ -223,20 +368,27 @@ class TariffChecker:
                 ]
             )
 
-            await self.bot.send_message(
+            await delivery_limiter.send(
                 user_id,
-                "Вы пропускаете сотни заявок в день, и мне очень грустно от этого 😢\n\n"
-                "Десятки заказчиков ежедневно публикуют объявления по апшим ключевым словам 🙌\n\n"
-                "Получите к ним доступ присоединившись к нашему сервису прямо сейчас 🙂",
-                reply_markup=keyboard,
+                lambda: self.bot.send_message(
+                    user_id,
+                    "Вы пропускаете сотни заявок в день, и мне очень грустно от этого 😢\n\n"
+                    "Десятки заказчиков ежедневно публикуют объявления по апшим ключевым словам 🙌\n\n"
+                    "Получите к ним доступ присоединившись к нашему сервису прямо сейчас 🙂",
+                    reply_markup=keyboard,
+                ),
             )
             logger.info(
                 f"Отправлено уведомление через 24 часа после истечения тарифа пользователю {user_id}"
             )
+        except TelegramForbiddenError:
+            logger.info(f"Пользователь {user_id} заблокировал бота")
         except Exception as e:
             logger.error(
                 f"Ошибка при отправке уведомления через 24 часа после истечения тарифа пользователю {user_id}: {str(e)}"
             )
+            # Повторная отправка - в планировщике (_retry)
+            raise
 
     @staticmethod
     def is_tariff_active(user_id: int, db: Database) -> bool:
@@ -0,0 +1,153 @@
+import asyncio
+import html
+import logging
+from html.parser import HTMLParser
+from typing import Dict, List, Tuple
+
+from client.outbox import Outbox
+from db.registry import ProjectState
+
+# Ограничение Telegram на длину текста сообщения
+MAX_MESSAGE_LENGTH = 4096
+
+# Теги, которые Telegram принимает в parse_mode="HTML"
+TELEGRAM_TAGS = {
+    "a", "b", "strong", "i", "em", "u", "ins", "s", "strike", "del",
+    "code", "pre", "span", "tg-spoiler", "tg-emoji", "blockquote",
+}
+
+DigestKey = Tuple[int, int]  # (user_id, project_id)
+
+
+class _TagChecker(HTMLParser):
+    """Проверяет, что в тексте только теги Telegram и все они закрыты"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.stack: List[str] = []
+        self.valid = True
+
+    def handle_starttag(self, tag, attrs):
+        if tag not in TELEGRAM_TAGS:
+            self.valid = False
+        self.stack.append(tag)
+
+    def handle_endtag(self, tag):
+        if not self.stack or self.stack.pop() != tag:
+            self.valid = False
+
+
+def is_valid_html(text: str) -> bool:
+    """Разберет ли Telegram текст как HTML"""
+    checker = _TagChecker()
+    checker.feed(text)
+    checker.close()
+    return checker.valid and not checker.stack
+
+
+class DigestBuffer:
+    """
+    Режим дайджеста для проектов с активными чатами.
+
+    Уведомления проекта, пришедшие в течение digest_window секунд после
+    первого, собираются в одно сообщение (или несколько, если не помещаются
+    в лимит Telegram) и только потом записываются в очередь доставки.
+    До отправки уведомления хранятся в памяти, поэтому при остановке
+    MonitoringSystem накопленное сразу записывается в outbox (stop).
+    """
+
+    def __init__(self, outbox: Outbox, max_length: int = MAX_MESSAGE_LENGTH):
+        self.outbox = outbox
+        self.max_length = max_length
+        self.logger = logging.getLogger(__name__)
+        self.pending: Dict[DigestKey, List[str]] = {}
+        self.titles: Dict[DigestKey, str] = {}
+        # Задачи, ожидающие окончания окна
+        self.tasks: Dict[DigestKey, asyncio.Task] = {}
+
+    def add(self, user_id: int, project: ProjectState, text: str) -> None:
+        """Добавляет уведомление в дайджест проекта"""
+        key = (user_id, project.id)
+        parts = self.pending.setdefault(key, [])
+        # Одинаковые подряд (например, уведомление о кончившемся тарифе) не повторяем
+        if not parts or parts[-1] != text:
+            parts.append(text)
+        self.titles[key] = project.name
+        if key not in self.tasks:
+            self.tasks[key] = asyncio.create_task(
+                self._flush_later(key, project.digest_window)
+            )
+
+    async def stop(self) -> None:
+        """Отправляет в очередь доставки все накопленные дайджесты"""
+        for task in self.tasks.values():
+            task.cancel()
+        await asyncio.gather(*self.tasks.values(), return_exceptions=True)
+        self.tasks.clear()
+        for key in list(self.pending):
+            await self.flush(key)
+
+    def get_status(self) -> dict:
+        return {
+            "digests": len(self.pending),
+            "digest_messages": sum(len(parts) for parts in self.pending.values()),
+        }
+
+    async def _flush_later(self, key: DigestKey, window: int) -> None:
+        await asyncio.sleep(window)
+        self.tasks.pop(key, None)
+        try:
+            await self.flush(key)
+        except Exception as e:
+            self.logger.error(f"Ошибка при отправке дайджеста {key}: {e}")
+
+    async def flush(self, key: DigestKey) -> None:
+        """Записывает дайджест в очередь доставки"""
+        parts = self.pending.pop(key, None)
+        title = self.titles.pop(key, "")
+        if not parts:
+            return
+        user_id = key[0]
+        if len(parts) == 1:
+            # Одно уведомление отправляем как есть, без заголовка
+            await self.outbox.put(user_id, parts[0])
+            return
+        # Уведомление с неразбираемой разметкой (например, "<" в тексте
+        # сообщения) уходит отдельно, чтобы не сломать весь дайджест
+        valid, invalid = [], []
+        for part in parts:
+            (valid if is_valid_html(part) else invalid).append(part)
+        messages = self._pack(title, valid) if len(valid) > 1 else valid
+        for text in messages + invalid:
+            await self.outbox.put(user_id, text)
+        self.logger.info(
+            f"Дайджест проекта {key[1]} из {len(parts)} уведомлений поставлен в очередь для пользователя {user_id}"
+        )
+
+    def _pack(self, title: str, parts: List[str]) -> List[str]:
+        """
+        Раскладывает уведомления по сообщениям не длиннее max_length.
+
+        Уведомления не разрезаются, чтобы не сломать HTML-разметку;
+        слишком длинное уведомление уходит отдельным сообщением.
+        """
+        title = html.escape(title)
+        # Место под заголовок
+        budget = self.max_length - len(title) - 64
+        groups: List[List[str]] = []
+        length = 0
+        for part in parts:
+            if groups and length + len(part) <= budget:
+                groups[-1].append(part)
+                length += len(part)
+            else:
+                groups.append([part])
+                length = len(part)
+
+        messages = []
+        for number, group in enumerate(groups, 1):
+            header = f"📨 <b>Дайджест проекта «{title}»</b>: {len(group)} сообщ."
+            if len(groups) > 1:
+                header += f" ({number}/{len(groups)})"
+            messages.append(header + "\n\n" + "".join(group))
+        return messages
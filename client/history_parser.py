@@ -9,6 +9,7 @@ from telethon import TelegramClient
 from telethon.errors import FloodWaitError, ChatAdminRequiredError, ChannelPrivateError
 
 from client.session_manager import HistorySessionManager
+from client.keyword_matcher import KeywordMatcher, get_matcher
 
 
 class HistoryParser:
@@ -83,25 +84,14 @@ class HistoryParser:
                 yield 100, None
                 return
 
-            # Подготавливаем ключевые слова
-            keyword_list = []
-            if keywords:
-                keyword_list = [
-                    k.strip().lower() for k in keywords.split(",") if k.strip()
-                ]
+            # Подготавливаем автомат ключевых слов (общий кэш с мониторингом)
+            matcher = get_matcher(keywords or "")
 
             # Парсим сообщения пакетами для оптимизации
             messages_data = []
             processed_count = 0
             last_progress = 0
 
-            # Функция для фильтрации сообщений по ключевым словам
-            def filter_by_keywords(message_text, keywords):
-                if not keywords:
-                    return True
-                message_text_lower = message_text.lower()
-                return any(keyword in message_text_lower for keyword in keywords)
-
             # Обрабатываем сообщения пакетами для улучшения производительности
             offset_id = 0
             while True:
@@ -133,7 +123,7 @@ class HistoryParser:
                     # Создаем задачи на обработку сообщений
                     batch_tasks = []
                     for message in messages_batch:
-                        batch_tasks.append(self._process_message(message, keyword_list))
+                        batch_tasks.append(self._process_message(message, matcher))
 
                     # Ожидаем завершения всех задач в пакете
                     batch_results = await asyncio.gather(*batch_tasks)
@@ -190,9 +180,18 @@ class HistoryParser:
             # Освобождаем сессию
             await self.session_manager.release_session(client)
 
-    async def _process_message(self, message, keyword_list):
+    async def _process_message(self, message, matcher: KeywordMatcher):
         """Обрабатывает отдельное сообщение и возвращает его данные, если оно проходит фильтр"""
         try:
+            # Получаем текст сообщения
+            message_text = message.text or message.message or ""
+
+            # Фильтруем по ключевым словам до запроса отправителя.
+            # Поиск по автомату быстрее передачи задачи в пул потоков,
+            # поэтому выполняется прямо в цикле событий
+            if not matcher.matches(message_text):
+                return None
+
             # Получаем отправителя
             sender_name = "Неизвестный отправитель"
             sender_username = None
@@ -209,21 +208,6 @@ class HistoryParser:
                     f"Ошибка при получении информации об отправителе: {str(e)}"
                 )
 
-            # Получаем текст сообщения
-            message_text = message.text or message.message or ""
-
-            # Фильтруем по ключевым словам, если они указаны
-            loop = asyncio.get_event_loop()
-            if keyword_list:
-                matches = await loop.run_in_executor(
-                    self.executor,
-                    lambda: any(
-                        keyword in message_text.lower() for keyword in keyword_list
-                    ),
-                )
-                if not matches:
-                    return None
-
             # Формируем запись о сообщении
             return {
                 "ID сообщения": message.id,
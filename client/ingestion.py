@@ -0,0 +1,125 @@
+import asyncio
+import logging
+from collections import deque
+from typing import Any, Awaitable, Callable, Deque, List, NamedTuple, Optional
+
+# Политики переполнения очереди
+DROP_OLDEST = "drop_oldest"
+SHED_NON_KEYWORD = "shed_non_keyword"
+
+
+class IngestionItem(NamedTuple):
+    """Событие о новом сообщении, ожидающее обработки"""
+
+    event: Any
+    # Есть ли среди подписчиков чаты с ключевыми словами
+    has_keywords: bool
+
+
+class IngestionQueue:
+    """
+    Ограниченная очередь входящих сообщений одной сессии.
+
+    Обработчик Telethon только кладет событие в очередь (put), проверку
+    ключевых слов и рассылку выполняют workers задач. При переполнении очередь не растет, а вытесняет
+    сообщения по политике overflow:
+    - drop_oldest: самое старое сообщение;
+    - shed_non_keyword: сначала самое старое из чатов без ключевых слов
+      (такие чаты пересылают все подряд), затем самое старое вообще.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        handler: Callable[[Any], Awaitable[Any]],
+        maxsize: int = 1000,
+        workers: int = 4,
+        overflow: str = SHED_NON_KEYWORD,
+    ):
+        if overflow not in (DROP_OLDEST, SHED_NON_KEYWORD):
+            raise ValueError(f"Неизвестная политика переполнения: {overflow}")
+        self.name = name
+        self.handler = handler
+        self.maxsize = maxsize
+        self.workers = workers
+        self.overflow = overflow
+        self.logger = logging.getLogger(__name__)
+        self.items: Deque[IngestionItem] = deque()
+        self.tasks: List[asyncio.Task] = []
+        # Создается в start, внутри работающего цикла событий
+        self._ready: Optional[asyncio.Condition] = None
+        # Метрики
+        self.processing = 0
+        self.max_depth = 0
+        self.processed = 0
+        self.dropped = 0
+
+    def start(self) -> None:
+        """Запускает workers очереди"""
+        if self.tasks:
+            return
+        self._ready = asyncio.Condition()
+        for _ in range(self.workers):
+            self.tasks.append(asyncio.create_task(self._worker()))
+
+    async def stop(self) -> None:
+        """Останавливает workers, необработанные сообщения отбрасываются"""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks.clear()
+        if self.items:
+            self.logger.info(
+                f"Очередь сессии {self.name}: отброшено {len(self.items)} необработанных сообщений"
+            )
+            self.items.clear()
+
+    async def put(self, event, has_keywords: bool) -> None:
+        """Добавляет событие в очередь, при переполнении вытесняя другое"""
+        if len(self.items) >= self.maxsize:
+            self._shed()
+        self.items.append(IngestionItem(event, has_keywords))
+        self.max_depth = max(self.max_depth, len(self.items))
+        async with self._ready:
+            self._ready.notify()
+
+    def _shed(self) -> None:
+        """Вытесняет одно сообщение по политике переполнения"""
+        victim = 0
+        if self.overflow == SHED_NON_KEYWORD:
+            victim = next(
+                (i for i, item in enumerate(self.items) if not item.has_keywords), 0
+            )
+        del self.items[victim]
+        self.dropped += 1
+        # Не засоряем лог при потоке сообщений
+        if self.dropped % 100 == 1:
+            self.logger.warning(
+                f"Очередь сессии {self.name} переполнена ({self.maxsize}), "
+                f"отброшено сообщений: {self.dropped}"
+            )
+
+    async def _worker(self) -> None:
+        while True:
+            async with self._ready:
+                await self._ready.wait_for(lambda: self.items)
+                item = self.items.popleft()
+            self.processing += 1
+            try:
+                await self.handler(item.event)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Ошибка при обработке сообщения из очереди: {e}")
+            finally:
+                self.processing -= 1
+                self.processed += 1
+
+    def get_status(self) -> dict:
+        return {
+            "depth": len(self.items),
+            "max_depth": self.max_depth,
+            "processing": self.processing,
+            "processed": self.processed,
+            "dropped": self.dropped,
+        }
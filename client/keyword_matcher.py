@@ -0,0 +1,275 @@
+import asyncio
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import Dict, Hashable, List, NamedTuple, Optional, Tuple
+
+
+class KeywordMatch(NamedTuple):
+    """Найденное вхождение ключевого слова в тексте"""
+
+    position: int
+    keyword: str
+
+
+def parse_keywords(keywords: Optional[str]) -> List[str]:
+    """Разбивает строку ключевых слов (через запятую) на список без повторов"""
+    if not keywords:
+        return []
+
+    keyword_list = []
+    for keyword in keywords.split(","):
+        keyword = keyword.strip().lower()
+        if keyword and keyword not in keyword_list:
+            keyword_list.append(keyword)
+    return keyword_list
+
+
+class KeywordMatcher:
+    """
+    Автомат Ахо–Корасик для поиска ключевых слов.
+
+    Строится один раз для набора ключевых слов и находит все вхождения
+    за один проход по тексту, независимо от количества ключевых слов.
+    """
+
+    def __init__(self, keywords: List[str]):
+        self.keywords = keywords
+        # Порядковый номер ключевого слова в исходном списке
+        self._order = {keyword: index for index, keyword in enumerate(keywords)}
+        # Переходы автомата: state -> {символ: state}
+        self._goto: List[Dict[str, int]] = [{}]
+        # Суффиксные ссылки
+        self._fail: List[int] = [0]
+        # Индексы ключевых слов, заканчивающихся в состоянии
+        self._output: List[Tuple[int, ...]] = [()]
+        self._build()
+
+    def _build(self) -> None:
+        """Строит бор ключевых слов и суффиксные ссылки"""
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._output.append(())
+                state = next_state
+            self._output[state] += (index,)
+
+        # Обход в ширину: суффиксная ссылка узла строится по ссылке родителя
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                fail = self._goto[fail].get(char, 0)
+                self._fail[next_state] = fail
+                self._output[next_state] += self._output[fail]
+
+    def scan(self, text: str):
+        """Проходит по тексту и возвращает пары (позиция конца, индекс ключевого слова в keywords)"""
+        goto = self._goto
+        fail = self._fail
+        output = self._output
+        state = 0
+        for end, char in enumerate(text.lower()):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in output[state]:
+                yield end, index
+
+    def find_all(self, text: str) -> List[KeywordMatch]:
+        """Возвращает все вхождения ключевых слов в порядке их окончания в тексте"""
+        if not text or not self.keywords:
+            return []
+
+        return [
+            KeywordMatch(end - len(self.keywords[index]) + 1, self.keywords[index])
+            for end, index in self.scan(text)
+        ]
+
+    def matches(self, text: str) -> bool:
+        """Проверяет наличие хотя бы одного ключевого слова в тексте"""
+        if not self.keywords:
+            return True
+        if not text:
+            return False
+
+        for _ in self.scan(text):
+            return True
+        return False
+
+    def first_match(self, matches: List[KeywordMatch]) -> Optional[KeywordMatch]:
+        """Возвращает самое раннее вхождение (при равенстве - слово, указанное раньше)"""
+        if not matches:
+            return None
+        return min(
+            matches,
+            key=lambda match: (match.position, self._order[match.keyword]),
+        )
+
+    @staticmethod
+    def matched_keywords(matches: List[KeywordMatch]) -> List[str]:
+        """Возвращает сработавшие ключевые слова в порядке их появления в тексте"""
+        keywords = {}
+        for match in sorted(matches, key=lambda match: match.position):
+            keywords.setdefault(match.keyword, None)
+        return list(keywords)
+
+
+@lru_cache(maxsize=1024)
+def get_matcher(keywords: str) -> KeywordMatcher:
+    """
+    Возвращает скомпилированный автомат для строки ключевых слов.
+
+    Ключ кэша - сама строка, поэтому явная очистка не нужна: бот меняет
+    ключевые слова через update_chat и перезапускает маршрут чата, новая
+    строка дает новый автомат, а старый со временем вытесняется из кэша.
+    Общий индекс чата (SubscriberIndex) при этом сбрасывается
+    в _remove_route/_add_route менеджера сессий.
+    """
+    return KeywordMatcher(parse_keywords(keywords))
+
+
+class SubscriberIndex:
+    """
+    Общий индекс ключевых слов всех подписчиков одного Telegram-чата.
+
+    Каждое ключевое слово хранит список подписчиков, которым оно принадлежит,
+    поэтому один проход по тексту сообщения дает точный набор подписчиков
+    для уведомления вместе с их вхождениями.
+    """
+
+    def __init__(self, subscribers: Dict[Hashable, Optional[str]]):
+        # Подписчики без ключевых слов получают все сообщения
+        self.unfiltered: List[Hashable] = []
+        postings: Dict[str, List[Hashable]] = {}
+
+        # Исходные подписчики, по ним индекс строится заново в пуле процессов
+        self.subscribers: Tuple[Tuple[Hashable, Optional[str]], ...] = tuple(
+            subscribers.items()
+        )
+        for subscriber, keywords in subscribers.items():
+            keyword_list = parse_keywords(keywords)
+            if not keyword_list:
+                self.unfiltered.append(subscriber)
+                continue
+            for keyword in keyword_list:
+                postings.setdefault(keyword, []).append(subscriber)
+
+        self.matcher = KeywordMatcher(list(postings))
+        # Списки подписчиков по индексу ключевого слова в автомате
+        self._postings: List[List[Hashable]] = list(postings.values())
+
+    def match(self, text: str) -> Dict[Hashable, List[KeywordMatch]]:
+        """Возвращает подписчиков, которых касается текст, и их вхождения"""
+        result: Dict[Hashable, List[KeywordMatch]] = {
+            subscriber: [] for subscriber in self.unfiltered
+        }
+        if not text or not self.matcher.keywords:
+            return result
+
+        keywords = self.matcher.keywords
+        for end, index in self.matcher.scan(text):
+            keyword = keywords[index]
+            match = KeywordMatch(end - len(keyword) + 1, keyword)
+            for subscriber in self._postings[index]:
+                result.setdefault(subscriber, []).append(match)
+        return result
+
+
+def find_keywords(text: str, keywords: str) -> List[KeywordMatch]:
+    """Находит вхождения ключевых слов (функция верхнего уровня для пула процессов)"""
+    return get_matcher(keywords).find_all(text)
+
+
+@lru_cache(maxsize=256)
+def _get_subscriber_index(
+    subscribers: Tuple[Tuple[Hashable, Optional[str]], ...]
+) -> SubscriberIndex:
+    return SubscriberIndex(dict(subscribers))
+
+
+def match_subscribers(
+    text: str, subscribers: Tuple[Tuple[Hashable, Optional[str]], ...]
+) -> Dict[Hashable, List[KeywordMatch]]:
+    """Сопоставляет текст с подписчиками чата (функция верхнего уровня для пула процессов)"""
+    return _get_subscriber_index(subscribers).match(text)
+
+
+class MatchExecutor:
+    """
+    Политика выполнения поиска ключевых слов.
+
+    Обычные сообщения проверяются прямо в цикле событий: поиск по автомату
+    занимает микросекунды, и передача задачи в пул потоков стоит дороже
+    самой работы. В пул процессов уходят только тяжелые задачи - длинные
+    тексты или огромные наборы ключевых слов.
+
+    Порог по длине текста взят из benchmarks/keyword_matching.py: начиная
+    примерно с 2000 символов поиск блокирует цикл событий дольше, чем стоит
+    передача задачи в пул процессов (~0.4-0.7 мс). Время прохода по автомату
+    почти не зависит от числа ключевых слов, поэтому порог по ним высокий.
+    """
+
+    def __init__(
+        self,
+        max_inline_text_length: int = 2048,
+        max_inline_patterns: int = 50_000,
+        max_workers: int = 2,
+    ):
+        self.max_inline_text_length = max_inline_text_length
+        self.max_inline_patterns = max_inline_patterns
+        self.max_workers = max_workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+
+    def is_heavy(self, text: str, matcher: KeywordMatcher) -> bool:
+        """Проверяет, стоит ли выносить поиск в отдельный процесс"""
+        return (
+            len(text) >= self.max_inline_text_length
+            or len(matcher.keywords) >= self.max_inline_patterns
+        )
+
+    async def find_all(self, text: str, keywords: str) -> List[KeywordMatch]:
+        """Находит вхождения ключевых слов, выбирая место выполнения по объему работы"""
+        matcher = get_matcher(keywords)
+        if not text or not self.is_heavy(text, matcher):
+            return matcher.find_all(text)
+
+        return await asyncio.get_running_loop().run_in_executor(
+            self._get_pool(), find_keywords, text, keywords
+        )
+
+    async def match_subscribers(
+        self, index: SubscriberIndex, text: str
+    ) -> Dict[Hashable, List[KeywordMatch]]:
+        """Сопоставляет текст с общим индексом чата, выбирая место выполнения"""
+        if not text or not self.is_heavy(text, index.matcher):
+            return index.match(text)
+
+        return await asyncio.get_running_loop().run_in_executor(
+            self._get_pool(), match_subscribers, text, index.subscribers
+        )
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def shutdown(self) -> None:
+        """Останавливает пул процессов, если он был создан"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
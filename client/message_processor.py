@@ -1,40 +1,48 @@
 import logging
-import asyncio
-from typing import Optional, Dict, Tuple
-from concurrent.futures import ThreadPoolExecutor
+from typing import List, Optional, Set, Tuple
 
+from cachetools import TTLCache
 from telethon.tl.types import Message
 
 from aiogram import Bot
+from db.activity_buffer import activity_buffer
 from db.database import Database
-from db.models import Project, ProjectChat
-from bot.utils.tariff_checker import TariffChecker
+from db.provider import get_async_database
+from db.registry import ChatState, ProjectState, state_registry
+from client.keyword_matcher import KeywordMatch, MatchExecutor, get_matcher
+from client.digest import DigestBuffer
+from client.outbox import Outbox
 
 
 class MessageProcessor:
     """Класс для обработки и отправки сообщений пользователям"""
 
+    # Сколько помнить отправленные сообщения для отсева повторов
+    recent_alerts_ttl = 600  # секунд
+    recent_alerts_size = 50_000
+
     def __init__(self, db: Database, bot: Bot):
         self.db = db
         self.bot = bot
         self.logger = logging.getLogger(__name__)
-        # Семафор для ограничения количества одновременных отправок сообщений
-        self.send_semaphore = asyncio.Semaphore(10)
-        # Кэш проектов и чатов для уменьшения обращений к БД
-        self.project_cache = {}
-        self.chat_cache = {}
-        # Кэш для статусов тарифов пользователей
-        self.tariff_status_cache: Dict[int, Tuple[bool, float]] = {}
-        # Время жизни кэша в секундах
-        self.cache_ttl = 60
-        # Время жизни кэша тарифов в секундах (10 минут)
-        self.tariff_cache_ttl = 600
-        # Время последнего обновления кэша
-        self.last_cache_update = 0
-        # Число-количество обрабатываемых одновременно сообщений
-        self.workers = 20
-        # ThreadPoolExecutor для обработки ключевых слов
-        self.executor = ThreadPoolExecutor(max_workers=self.workers)
+        # Очередь доставки: уведомления пишутся в таблицу outbox,
+        # отправляют их workers очереди (запускается в MonitoringSystem)
+        self.outbox = Outbox(bot, get_async_database())
+        # Для проектов в режиме дайджеста уведомления копятся здесь
+        self.digest = DigestBuffer(self.outbox)
+        # Уже отправленные сообщения: (получатель, чат-источник, id сообщения).
+        # Один и тот же чат может быть в нескольких проектах пользователя,
+        # каждый проект обрабатывает сообщение отдельно
+        self.recent_alerts: TTLCache = TTLCache(
+            maxsize=self.recent_alerts_size, ttl=self.recent_alerts_ttl
+        )
+        # Уведомления, которые сейчас форматируются и записываются в очередь
+        self.pending_alerts: Set[Tuple[int, int, int]] = set()
+        # Проекты, чаты и тарифы берутся из реестра state_registry,
+        # который обновляется при каждой записи в БД
+        self.registry = state_registry
+        # Поиск ключевых слов: inline, тяжелые тексты - в пуле процессов
+        self.match_executor = MatchExecutor()
 
     async def process_message(
         self,
@@ -42,16 +50,22 @@ class MessageProcessor:
         project_id: int,
         chat_id: int,
         keywords: Optional[str] = None,
+        matches: Optional[List[KeywordMatch]] = None,
     ) -> bool:
-        """Обрабатывает новое сообщение и отправляет его пользователям при соответствии фильтрам"""
+        """
+        Обрабатывает новое сообщение и отправляет его пользователям при соответствии фильтрам
+
+        Если вхождения ключевых слов уже найдены общим индексом чата (matches),
+        повторная проверка текста не выполняется.
+        """
         try:
             self.logger.debug(
                 f"Начало обработки сообщения для проекта {project_id}, чата {chat_id}"
             )
 
-            # Получаем проект и чат из кэша или БД
-            project = await self._get_project(project_id)
-            chat = await self._get_chat(chat_id)
+            # Получаем проект и чат из реестра
+            project = self.registry.get_project(project_id)
+            chat = self.registry.get_chat(chat_id)
 
             if not project or not project.is_active or not chat or not chat.is_active:
                 self.logger.warning(
@@ -59,144 +73,98 @@ class MessageProcessor:
                 )
                 return False
 
-            # Выполняем проверку ключевых слов в отдельном потоке через ThreadPoolExecutor
+            # Проверяем ключевые слова (обычно прямо в цикле событий, см. MatchExecutor)
             text = message.text or ""
             self.logger.debug(
                 f"Проверка текста сообщения (длина {len(text)}) на соответствие ключевым словам: {keywords}"
             )
 
-            if keywords:
-                matches = await asyncio.get_event_loop().run_in_executor(
-                    self.executor, self._matches_keywords, text, keywords
-                )
+            matcher = get_matcher(keywords) if keywords else None
+            if matches is not None:
+                if not matches and matcher and matcher.keywords:
+                    self.logger.debug("Сообщение не соответствует ключевым словам")
+                    return False
+            elif matcher and matcher.keywords:
+                matches = await self.match_executor.find_all(text, keywords)
                 if not matches:
                     self.logger.debug("Сообщение не соответствует ключевым словам")
                     return False
-            elif not text:
+            if not keywords and not text:
                 self.logger.debug("Пустой текст сообщения, пропускаем")
                 return False
 
-            # Проверяем активность тарифа пользователя через кэш
+            # Проверяем активность тарифа пользователя по реестру
             user_id = project.user_id
-            has_active_tariff = await self._check_tariff_active(user_id)
-
-            # Форматируем сообщение для отправки
-            self.logger.debug("Форматирование сообщения для отправки")
+            if activity_buffer.is_blocked(user_id):
+                self.logger.debug(f"Пользователь {user_id} заблокировал бота, пропускаем")
+                return False
 
-            if has_active_tariff:
-                formatted_message = await self._format_message(message, chat, keywords)
-            else:
-                # Если тариф не активен, заменяем сообщение на уведомление
-                formatted_message = "⚠️ <b>Тут могло быть сообщение, но у вас кончился тариф!</b>\n\nДля получения полных сообщений, пожалуйста, продлите свой тариф."
+            # Повтор того же сообщения из другого проекта пользователя не отправляем.
+            # Проверка и резервирование идут без await между ними, поэтому
+            # параллельные обработчики не пропустят дубль
+            alert_key = (user_id, message.chat_id, message.id)
+            if alert_key in self.recent_alerts or alert_key in self.pending_alerts:
                 self.logger.debug(
-                    f"Заменено сообщение для пользователя {user_id} из-за неактивного тарифа"
+                    f"Сообщение {message.id} из чата {message.chat_id} уже отправлено пользователю {user_id}"
                 )
-
-            # Отправляем сообщение пользователю с использованием семафора
-            self.logger.debug(f"Отправка сообщения пользователю {user_id}")
-
-            async with self.send_semaphore:
-                # Добавляем повторные попытки отправки сообщения при ошибках
-                max_retries = 3
-                retry_delay = 1  # секунда
-
-                for attempt in range(max_retries):
-                    try:
-                        await self.bot.send_message(
-                            user_id,
-                            formatted_message,
-                            parse_mode="HTML",
-                            disable_web_page_preview=True,
-                        )
-                        self.logger.info(
-                            f"Сообщение из чата {chat.chat_title or chat.chat_id} отправлено пользователю {user_id}"
-                        )
-                        return True
-                    except Exception as e:
-                        if attempt < max_retries - 1:
-                            self.logger.warning(
-                                f"Ошибка при отправке сообщения (попытка {attempt+1}/{max_retries}): {str(e)}"
-                            )
-                            await asyncio.sleep(retry_delay)
-                            retry_delay *= 2  # Увеличиваем задержку между попытками
-                        else:
-                            # Последняя попытка не удалась, логируем ошибку
-                            self.logger.error(
-                                f"Не удалось отправить сообщение после {max_retries} попыток: {str(e)}"
-                            )
-                            return False
+                return False
+            self.pending_alerts.add(alert_key)
+            try:
+                await self._enqueue_alert(message, project, chat, keywords, matches)
+            finally:
+                self.pending_alerts.discard(alert_key)
+            # Запоминаем только переданное в очередь доставки или дайджест:
+            # при ошибке повторное обновление того же сообщения не отсеется
+            self.recent_alerts[alert_key] = project_id
+            return True
 
         except Exception as e:
             self.logger.error(f"Ошибка при обработке сообщения: {str(e)}")
             return False
 
-    async def _check_tariff_active(self, user_id: int) -> bool:
-        """Проверяет активность тарифа пользователя с использованием кэша"""
-        current_time = asyncio.get_event_loop().time()
-
-        # Проверяем кэш
-        if user_id in self.tariff_status_cache:
-            status, timestamp = self.tariff_status_cache[user_id]
-            if current_time - timestamp < self.tariff_cache_ttl:
-                return status
-
-        # Если нет в кэше или кэш устарел, проверяем через БД
-        is_active = TariffChecker.is_tariff_active(user_id, self.db)
-
-        # Обновляем кэш
-        self.tariff_status_cache[user_id] = (is_active, current_time)
-
-        return is_active
-
-    async def _get_project(self, project_id: int) -> Optional[Project]:
-        """Получает проект из кэша или БД"""
-        # Проверяем кэш
-        current_time = asyncio.get_event_loop().time()
-        if project_id in self.project_cache:
-            project, timestamp = self.project_cache[project_id]
-            if current_time - timestamp < self.cache_ttl:
-                return project
-
-        # Получаем из БД
-        project = self.db.get_project(project_id)
-        if project:
-            self.project_cache[project_id] = (project, current_time)
-        return project
-
-    async def _get_chat(self, chat_id: int) -> Optional[ProjectChat]:
-        """Получает чат из кэша или БД"""
-        # Проверяем кэш
-        current_time = asyncio.get_event_loop().time()
-        if chat_id in self.chat_cache:
-            chat, timestamp = self.chat_cache[chat_id]
-            if current_time - timestamp < self.cache_ttl:
-                return chat
-
-        # Получаем из БД
-        chat = self.db.get_chat(chat_id)
-        if chat:
-            self.chat_cache[chat_id] = (chat, current_time)
-        return chat
-
-    def _matches_keywords(self, text: str, keywords: Optional[str]) -> bool:
-        """Проверяет, соответствует ли текст сообщения ключевым словам"""
-        if not keywords or not text:
-            # Если ключевые слова не указаны, считаем, что сообщение подходит
-            return True
-
-        # Разбиваем ключевые слова на список (разделитель - запятая)
-        keyword_list = [k.strip().lower() for k in keywords.split(",") if k.strip()]
-        if not keyword_list:
-            return True
+    async def _enqueue_alert(
+        self,
+        message: Message,
+        project: ProjectState,
+        chat: ChatState,
+        keywords: Optional[str],
+        matches: Optional[List[KeywordMatch]],
+    ) -> None:
+        """Форматирует уведомление и передает его в очередь доставки или дайджест"""
+        user_id = project.user_id
+        has_active_tariff = self.registry.is_tariff_active(user_id)
+
+        # Форматируем сообщение для отправки
+        self.logger.debug("Форматирование сообщения для отправки")
+
+        if has_active_tariff:
+            formatted_message = await self._format_message(
+                message, chat, keywords, matches
+            )
+        else:
+            # Если тариф не активен, заменяем сообщение на уведомление
+            formatted_message = "⚠️ <b>Тут могло быть сообщение, но у вас кончился тариф!</b>\n\nДля получения полных сообщений, пожалуйста, продлите свой тариф."
+            self.logger.debug(
+                f"Заменено сообщение для пользователя {user_id} из-за неактивного тарифа"
+            )
 
-        # Приводим текст к нижнему регистру для поиска
-        text_lower = text.lower()
+        if project.digest_enabled:
+            # В очередь доставки попадет после окончания окна дайджеста
+            self.digest.add(user_id, project, formatted_message)
+            return
 
-        # Проверяем наличие хотя бы одного ключевого слова в тексте
-        return any(keyword in text_lower for keyword in keyword_list)
+        # Отправкой занимается очередь доставки, здесь только запись в outbox
+        await self.outbox.put(user_id, formatted_message)
+        self.logger.info(
+            f"Сообщение из чата {chat.chat_title or chat.chat_id} поставлено в очередь для пользователя {user_id}"
+        )
 
     async def _format_message(
-        self, message: Message, chat: ProjectChat, keywords: Optional[str] = None
+        self,
+        message: Message,
+        chat: ChatState,
+        keywords: Optional[str] = None,
+        matches: Optional[List[KeywordMatch]] = None,
     ) -> str:
         """Форматирует сообщение для отправки пользователю"""
 
@@ -212,40 +180,33 @@ class MessageProcessor:
 
         # Переменная для хранения части текста с ключевым словом
         keyword_text_snippet = ""
-        # Выделяем только первое найденное ключевое слово, если они есть
         matching_keywords = []
         if keywords and message_text:
-            keyword_list = [k.strip().lower() for k in keywords.split(",") if k.strip()]
-            if keyword_list:
-                message_text_lower = message_text.lower()
-                # Ищем первое вхождение любого ключевого слова
-                first_keyword = None
-                first_pos = -1
-
-                for keyword in keyword_list:
-                    pos = message_text_lower.find(keyword)
-                    if pos != -1 and (first_pos == -1 or pos < first_pos):
-                        first_pos = pos
-                        first_keyword = keyword
-
-                if first_keyword:
-                    matching_keywords.append(first_keyword)
-                    # Получаем оригинальное написание ключевого слова из текста
-                    original_keyword = message_text[
-                        first_pos : first_pos + len(first_keyword)
-                    ]
-
-                    # Определяем конец фрагмента (ключевое слово + 184 символов после него)
-                    end_pos = min(
-                        first_pos + len(first_keyword) + 184, len(message_text)
-                    )
-
-                    # Формируем фрагмент текста
-                    prefix = "..." if first_pos > 0 else ""
-                    suffix = "..." if end_pos < len(message_text) else ""
-
-                    # Создаем выделенный фрагмент текста для отображения
-                    keyword_text_snippet = f"{prefix}<pre>{original_keyword}{message_text[first_pos + len(first_keyword):end_pos]}</pre>{suffix}"
+            matcher = get_matcher(keywords)
+            # Используем вхождения, найденные при фильтрации, если они переданы
+            if matches is None:
+                matches = matcher.find_all(message_text)
+
+            matching_keywords = matcher.matched_keywords(matches)
+
+            # Выделяем фрагмент текста, начиная с первого найденного ключевого слова
+            first_match = matcher.first_match(matches)
+            if first_match:
+                first_pos, first_keyword = first_match
+                # Получаем оригинальное написание ключевого слова из текста
+                original_keyword = message_text[
+                    first_pos : first_pos + len(first_keyword)
+                ]
+
+                # Определяем конец фрагмента (ключевое слово + 184 символов после него)
+                end_pos = min(first_pos + len(first_keyword) + 184, len(message_text))
+
+                # Формируем фрагмент текста
+                prefix = "..." if first_pos > 0 else ""
+                suffix = "..." if end_pos < len(message_text) else ""
+
+                # Создаем выделенный фрагмент текста для отображения
+                keyword_text_snippet = f"{prefix}<pre>{original_keyword}{message_text[first_pos + len(first_keyword):end_pos]}</pre>{suffix}"
 
         # Если ключевые слова не найдены, но есть текст, берем первые 184 символов
         if not keyword_text_snippet and message_text:
@@ -262,10 +223,3 @@ class MessageProcessor:
             f"📰 Сообщение: {keyword_text_snippet}\n\n"
         )
         return formatted_message
-
-    def clear_cache(self):
-        """Очищает все кэши"""
-        self.project_cache.clear()
-        self.chat_cache.clear()
-        self.tariff_status_cache.clear()
-        self.logger.info("Кэш проектов, чатов и статусов тарифов очищен")
@@ -6,6 +6,8 @@ import json
 from aiogram import Bot
 
 from db.database import Database
+from db.provider import get_async_database
+from db.registry import state_registry
 from client.session_manager import RealTimeSessionManager
 from client.message_processor import MessageProcessor
 
@@ -25,6 +27,10 @@ class MonitoringSystem:
 
         # Интервал автоматической перезагрузки системы (в часах)
         self.reload_interval = 6  # каждые 6 часов
+        # Интервал перечитывания тарифов в реестр (в минутах)
+        self.tariff_refresh_interval = 10
+        # Сколько чатов одновременно подключается при массовом добавлении
+        self.bulk_join_concurrency = 5
 
     async def initialize(self) -> bool:
         """
@@ -38,8 +44,13 @@ class MonitoringSystem:
         try:
             self.logger.info("Начало инициализации системы мониторинга...")
 
+            # 0. Загружаем проекты, чаты и тарифы в реестр
+            state_registry.load(self.db)
+
             # 1. Создаем процессор сообщений
             self.message_processor = MessageProcessor(self.db, self.bot)
+            # Доставка начинается сразу, включая оставшееся после перезапуска
+            await self.message_processor.outbox.start()
             self.logger.debug("Процессор сообщений создан")
 
             # 2. Создаем менеджер сессий
@@ -86,13 +97,9 @@ class MonitoringSystem:
         try:
             while self.running:
                 try:
-                    # Очищаем кэш обработчика сообщений
-                    if self.message_processor:
-                        self.message_processor.clear_cache()
-
                     # Ждем указанный интервал, проверяя флаг выполнения
-                    for _ in range(
-                        self.reload_interval * 60
+                    for minute in range(
+                        1, self.reload_interval * 60 + 1
                     ):  # Разбиваем на минуты вместо часов
                         if not self.running:
                             self.logger.info(
@@ -101,6 +108,16 @@ class MonitoringSystem:
                             return
                         await asyncio.sleep(60)  # Ждем минуту
 
+                        # Тарифы могут изменяться вне этого процесса (payment_webhook)
+                        if minute % self.tariff_refresh_interval == 0:
+                            await get_async_database().run_sync(
+                                state_registry.load_tariffs
+                            )
+
+                    # Полностью сверяем реестр с БД перед перезагрузкой
+                    # (через асинхронный драйвер, не блокируя цикл событий)
+                    await get_async_database().run_sync(state_registry.load)
+
                     # Перезагружаем мониторинг проектов, если система еще активна
                     if self.running and self.session_manager:
                         self.logger.info("Плановая перезагрузка системы мониторинга")
@@ -178,6 +195,10 @@ class MonitoringSystem:
                         self.session_manager.session_chats.clear()
                     if hasattr(self.session_manager, "active_projects"):
                         self.session_manager.active_projects.clear()
+                    if hasattr(self.session_manager, "chat_routes"):
+                        self.session_manager.chat_routes.clear()
+                        self.session_manager.chat_peers.clear()
+                        self.session_manager.chat_sources.clear()
 
                     # Принудительно отключаем все клиенты, если они еще существуют
                     if hasattr(self.session_manager, "active_clients"):
@@ -215,11 +236,15 @@ class MonitoringSystem:
             # Очищаем процессор сообщений, если он существует
             if self.message_processor:
                 try:
-                    if hasattr(self.message_processor, "clear_cache"):
-                        self.message_processor.clear_cache()
+                    # Останавливаем пул процессов для тяжелого поиска ключевых слов
+                    self.message_processor.match_executor.shutdown()
+                    # Накопленные дайджесты записываются в outbox до его остановки
+                    await self.message_processor.digest.stop()
+                    # Неотправленные уведомления остаются в таблице outbox
+                    await self.message_processor.outbox.stop()
                 except Exception as e:
                     self.logger.error(
-                        f"Ошибка при очистке кэша процессора сообщений: {e}"
+                        f"Ошибка при остановке процессора сообщений: {e}"
                     )
 
             self.initialized = False
@@ -273,6 +298,38 @@ class MonitoringSystem:
 
         return await self.session_manager.start_monitoring_chat(chat_id, project_id)
 
+    async def add_chats_to_monitoring(self, project_id: int, chat_ids: list) -> int:
+        """
+        Добавляет в мониторинг несколько чатов одновременно
+
+        Чаты подключаются параллельно (не более bulk_join_concurrency сразу),
+        сами вступления менеджер сессий выполняет с интервалом join_interval.
+
+        Returns:
+            int: количество чатов, для которых запущен мониторинг
+        """
+        if not self.running or not self.session_manager:
+            return 0
+
+        semaphore = asyncio.Semaphore(self.bulk_join_concurrency)
+
+        async def add_chat(chat_id: int) -> bool:
+            async with semaphore:
+                # start_monitoring_chat сам вступает в чат, если нужно
+                return await self.session_manager.start_monitoring_chat(
+                    chat_id, project_id
+                )
+
+        results = await asyncio.gather(
+            *(add_chat(chat_id) for chat_id in chat_ids), return_exceptions=True
+        )
+        for chat_id, result in zip(chat_ids, results):
+            if isinstance(result, Exception):
+                self.logger.error(
+                    f"Ошибка при добавлении чата {chat_id} в мониторинг: {result}"
+                )
+        return sum(result is True for result in results)
+
     async def remove_chat_from_monitoring(self, chat_id: int) -> bool:
         """Удаляет чат из мониторинга"""
         if not self.running or not self.session_manager:
@@ -372,6 +429,13 @@ class MonitoringSystem:
             "active_sessions": 0,
             "active_projects": 0,
             "monitored_chats": 0,
+            "telegram_chats": 0,
+            "outbox_queued": 0,
+            "outbox_in_flight": 0,
+            "digests_pending": 0,
+            "ingestion_depth": 0,
+            "ingestion_dropped": 0,
+            "ingestion_queues": {},
             "error": None,
         }
 
@@ -394,6 +458,10 @@ class MonitoringSystem:
                         monitored_chats += len(project_chats)
                     status["monitored_chats"] = monitored_chats
 
+                # Количество уникальных Telegram-чатов (один на несколько проектов)
+                if hasattr(self.session_manager, "chat_sessions"):
+                    status["telegram_chats"] = len(self.session_manager.chat_sessions)
+
                 # Проверяем доступность сессий
                 session_files = glob.glob(
                     os.path.join(self.session_manager.sessions_dir, "*.session")
@@ -401,6 +469,23 @@ class MonitoringSystem:
                 if session_files:
                     status["sessions_available"] = True
 
+                # Очереди входящих сообщений сессий
+                ingestion = self.session_manager.get_ingestion_status()
+                status["ingestion_queues"] = ingestion
+                status["ingestion_depth"] = sum(q["depth"] for q in ingestion.values())
+                status["ingestion_dropped"] = sum(
+                    q["dropped"] for q in ingestion.values()
+                )
+
+            # Очередь доставки уведомлений
+            if self.message_processor:
+                outbox_status = self.message_processor.outbox.get_status()
+                status["outbox_queued"] = outbox_status["queued"]
+                status["outbox_in_flight"] = outbox_status["in_flight"]
+                status["digests_pending"] = self.message_processor.digest.get_status()[
+                    "digests"
+                ]
+
         except Exception as e:
             status["error"] = str(e)
             self.logger.error(f"Ошибка при получении статуса системы мониторинга: {e}")
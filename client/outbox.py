@@ -0,0 +1,186 @@
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import List, NamedTuple, Optional, Set
+
+from aiogram import Bot
+from aiogram.exceptions import TelegramBadRequest, TelegramForbiddenError
+
+from bot.utils.rate_limiter import delivery_limiter
+from db.activity_buffer import activity_buffer
+from db.async_database import AsyncDatabase
+
+
+class OutboxItem(NamedTuple):
+    """Уведомление из очереди доставки"""
+
+    id: int
+    user_id: int
+    text: str
+    attempts: int
+
+
+class Outbox:
+    """
+    Очередь доставки уведомлений пользователям.
+
+    MessageProcessor только записывает уведомление в таблицу outbox (put),
+    отправкой занимаются workers задач. Запись удаляется из таблицы после
+    доставки, поэтому при перезапуске неотправленные уведомления будут
+    отправлены заново. Частоту отправки ограничивает delivery_limiter,
+    остальные ошибки откладывают повтор с ростом паузы.
+    """
+
+    def __init__(
+        self,
+        bot: Bot,
+        async_db: AsyncDatabase,
+        workers: int = 10,
+        max_attempts: int = 5,
+    ):
+        self.bot = bot
+        self.async_db = async_db
+        self.logger = logging.getLogger(__name__)
+        self.workers = workers
+        self.max_attempts = max_attempts
+        # Как часто проверять таблицу на отложенные и оставшиеся после перезапуска
+        self.poll_interval = 1.0
+        # Сколько записей держать в очереди в памяти
+        self.batch_size = 200
+        self.queue: Optional[asyncio.Queue] = None
+        # id записей, которые уже в очереди или отправляются
+        self.in_flight: Set[int] = set()
+        # Доставленные записи, удаляются из таблицы пачкой
+        self.done: List[int] = []
+        self.tasks: List[asyncio.Task] = []
+
+    async def start(self) -> None:
+        """Запускает раздачу очереди и workers"""
+        if self.tasks:
+            return
+        self.queue = asyncio.Queue()
+        self.tasks.append(asyncio.create_task(self._dispatch_loop()))
+        for _ in range(self.workers):
+            self.tasks.append(asyncio.create_task(self._worker()))
+        self.logger.info(f"Очередь доставки запущена ({self.workers} workers)")
+
+    async def stop(self) -> None:
+        """Останавливает доставку, неотправленное останется в таблице"""
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks.clear()
+        await self._flush_done()
+        self.in_flight.clear()
+
+    async def put(self, user_id: int, text: str) -> None:
+        """Записывает уведомление в очередь доставки"""
+        (message_id,) = await self.async_db.add_outbox_messages([(user_id, text)])
+        if self.queue is not None:
+            self._enqueue(OutboxItem(message_id, user_id, text, 0))
+
+    def get_status(self) -> dict:
+        return {
+            "queued": self.queue.qsize() if self.queue else 0,
+            "in_flight": len(self.in_flight),
+        }
+
+    def _enqueue(self, item: OutboxItem) -> None:
+        # Запись могла уже попасть в очередь из таблицы, пока шла вставка
+        if item.id in self.in_flight:
+            return
+        self.in_flight.add(item.id)
+        self.queue.put_nowait(item)
+
+    async def _dispatch_loop(self) -> None:
+        """Удаляет доставленное и добирает из таблицы отложенные уведомления"""
+        while True:
+            try:
+                await self._flush_done()
+                if self.queue.qsize() < self.batch_size:
+                    rows = await self.async_db.get_due_outbox_messages(
+                        self.batch_size, set(self.in_flight)
+                    )
+                    for row in rows:
+                        self._enqueue(OutboxItem(*row))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"Ошибка в очереди доставки: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    async def _flush_done(self) -> None:
+        if not self.done:
+            return
+        done, self.done = self.done, []
+        try:
+            await self.async_db.delete_outbox_messages(done)
+        except Exception:
+            self.done.extend(done)
+            raise
+        self.in_flight.difference_update(done)
+
+    async def _worker(self) -> None:
+        while True:
+            item = await self.queue.get()
+            try:
+                await self._deliver(item)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Запись осталась в таблице и будет взята снова
+                self.logger.error(f"Ошибка при доставке уведомления {item.id}: {e}")
+                self.in_flight.discard(item.id)
+            finally:
+                self.queue.task_done()
+
+    async def _deliver(self, item: OutboxItem) -> None:
+        """Отправляет уведомление и отмечает результат"""
+        try:
+            try:
+                # Общий лимит бота и лимит чата, RetryAfter пережидается внутри
+                await self._send(item, parse_mode="HTML")
+            except TelegramBadRequest as e:
+                if "can't parse entities" not in str(e):
+                    raise
+                # Повтор с той же разметкой не поможет, отправляем как текст
+                self.logger.warning(
+                    f"Не удалось разобрать HTML уведомления {item.id}, отправляем без разметки"
+                )
+                await self._send(item, parse_mode=None)
+            self.logger.debug(f"Уведомление {item.id} отправлено пользователю {item.user_id}")
+            self.done.append(item.id)
+        except TelegramForbiddenError:
+            # Повторять бессмысленно, больше не отправляем этому пользователю
+            activity_buffer.mark(item.user_id, False)
+            self.logger.info(f"Пользователь {item.user_id} заблокировал бота")
+            self.done.append(item.id)
+        except Exception as e:
+            attempts = item.attempts + 1
+            if attempts >= self.max_attempts:
+                self.logger.error(
+                    f"Не удалось отправить уведомление {item.id} после {attempts} попыток: {e}"
+                )
+                self.done.append(item.id)
+                return
+            self.logger.warning(
+                f"Ошибка при отправке уведомления {item.id} (попытка {attempts}/{self.max_attempts}): {e}"
+            )
+            await self._reschedule(item, timedelta(seconds=2**attempts), attempts)
+
+    async def _send(self, item: OutboxItem, parse_mode: Optional[str]) -> None:
+        await delivery_limiter.send(
+            item.user_id,
+            lambda: self.bot.send_message(
+                item.user_id,
+                item.text,
+                parse_mode=parse_mode,
+                disable_web_page_preview=True,
+            ),
+        )
+
+    async def _reschedule(self, item: OutboxItem, delay: timedelta, attempts: int) -> None:
+        await self.async_db.reschedule_outbox_message(
+            item.id, datetime.now() + delay, attempts
+        )
+        self.in_flight.discard(item.id)
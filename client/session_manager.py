@@ -2,8 +2,11 @@ import asyncio
 import logging
 import os
 import glob
-from typing import Optional, Dict, Tuple, Set
+import time
+from functools import partial
+from typing import Optional, Dict, List, Tuple, Set, NamedTuple
 from telethon import TelegramClient, events
+from telethon.errors import FloodWaitError
 import json
 from random import shuffle
 from collections import defaultdict
@@ -11,6 +14,41 @@ from telethon.tl.functions.channels import JoinChannelRequest
 from telethon.tl.functions.messages import ImportChatInviteRequest
 
 from db.database import Database
+from db.provider import get_async_database
+from db.registry import state_registry
+from client.keyword_matcher import KeywordMatch, SubscriberIndex
+from client.ingestion import DROP_OLDEST, SHED_NON_KEYWORD, IngestionQueue
+from config.parameters_manager import ParametersManager
+
+
+class ChatRoute(NamedTuple):
+    """Маршрут доставки сообщений из Telegram-чата в чат проекта"""
+
+    project_id: int
+    chat_id: int
+    keywords: Optional[str]
+
+
+def get_ingestion_settings() -> Tuple[int, int, str]:
+    """
+    Размер очереди входящих сообщений, число ее workers и политика
+    переполнения (drop_oldest или shed_non_keyword) из конфигурации
+    """
+    try:
+        queue_size = int(ParametersManager.get_parameter("ingestion_queue_size"))
+    except (KeyError, ValueError):
+        queue_size = 1000
+    try:
+        workers = int(ParametersManager.get_parameter("ingestion_workers"))
+    except (KeyError, ValueError):
+        workers = 4
+    try:
+        overflow = str(ParametersManager.get_parameter("ingestion_overflow"))
+    except KeyError:
+        overflow = SHED_NON_KEYWORD
+    if overflow not in (DROP_OLDEST, SHED_NON_KEYWORD):
+        overflow = SHED_NON_KEYWORD
+    return queue_size, workers, overflow
 
 
 class SessionManager:
@@ -123,22 +161,53 @@ class RealTimeSessionManager:
 
     def __init__(self, db: Database, sessions_dir: str = "client/sessions/realtime"):
         self.db = db
+        # Общий для процесса асинхронный доступ к БД (db.provider), чтобы запросы не блокировали цикл событий
+        self.async_db = get_async_database()
         self.sessions_dir = sessions_dir
         self.logger = logging.getLogger(__name__)
         # Сохраняем активные клиенты в формате {session_name: client}
         self.active_clients: Dict[str, TelegramClient] = {}
-        # Отслеживаем сессии для каждого чата {chat_id: session_name}
+        # Отслеживаем сессии для каждого Telegram-чата {telegram_chat_id: session_name}
         self.chat_sessions: Dict[int, str] = {}
-        # Отслеживаем чаты для каждой сессии {session_name: set(chat_ids)}
+        # Отслеживаем Telegram-чаты для каждой сессии {session_name: set(telegram_chat_ids)}
         self.session_chats: Dict[str, Set[int]] = defaultdict(set)
+        # Уже подключенные источники {нормализованный chat_id: telegram_chat_id}
+        self.chat_sources: Dict[str, int] = {}
         # Сохраняем активные проекты в формате {project_id: set(chat_ids)}
         self.active_projects: Dict[int, Set[int]] = defaultdict(set)
+        # Таблица маршрутизации {telegram_chat_id: {chat_id: ChatRoute}}
+        self.chat_routes: Dict[int, Dict[int, ChatRoute]] = {}
+        # Telegram ID для каждого чата из БД {chat_id: telegram_chat_id}
+        self.chat_peers: Dict[int, int] = {}
+        # Общие индексы ключевых слов подписчиков {telegram_chat_id: SubscriberIndex}
+        self.chat_indexes: Dict[int, SubscriberIndex] = {}
+        # Сессии, у которых уже зарегистрирован общий обработчик сообщений
+        self.dispatching_sessions: Set[str] = set()
         # Обработчик сообщений
         self.message_processor = None
         # Флаг работы системы
         self.running = False
         # Бот для отправки уведомлений
         self.bot = None
+        # Вступления в чаты идут не чаще одного раза в join_interval секунд,
+        # чтобы массовое добавление чатов не упиралось в FloodWait
+        self.join_interval = 1.0
+        # FloodWait длиннее этого значения (в секундах) не пережидаем
+        self.max_flood_wait = 60
+        self._join_lock = asyncio.Lock()
+        self._next_join_at = 0.0
+        # Одновременные запросы не должны подключать одну сессию дважды
+        self._session_lock = asyncio.Lock()
+        # Чаты, в которых состоит сессия {session_name: (время загрузки, telegram_chat_ids)}
+        self.dialogs_ttl = 300  # секунд
+        self.session_dialogs: Dict[str, Tuple[float, Set[int]]] = {}
+        self._dialogs_locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        # Входящие сообщения каждой сессии обрабатываются через ограниченную
+        # очередь с постоянным числом workers {session_name: IngestionQueue}
+        self.ingestion_queues: Dict[str, IngestionQueue] = {}
+        self.ingestion_queue_size, self.ingestion_workers, self.ingestion_overflow = (
+            get_ingestion_settings()
+        )
 
     def get_sessions_info(self) -> list:
         """Возвращает информацию о всех доступных сессиях"""
@@ -189,35 +258,177 @@ class RealTimeSessionManager:
         self.logger.info("Менеджер сессий инициализирован")
         return True
 
+    async def _dispatch_message(self, session_name: str, event):
+        """Общий обработчик сессии: ставит сообщение отслеживаемого чата в очередь"""
+        # Сессия может состоять в чате, который отслеживает другая сессия:
+        # Telegram присылает обновление каждому аккаунту, обрабатываем только свое
+        if self.chat_sessions.get(event.chat_id) != session_name:
+            return
+
+        routes = self.chat_routes.get(event.chat_id)
+        if not routes or not self.message_processor:
+            return
+
+        queue = self.ingestion_queues.get(session_name)
+        if queue is None:
+            self.logger.warning(
+                f"Нет очереди для сессии {session_name}, сообщение пропущено"
+            )
+            return
+        # Текст проверяют workers очереди, здесь только постановка в очередь
+        await queue.put(event, any(route.keywords for route in routes.values()))
+
+    async def _process_event(self, event):
+        """Обрабатывает сообщение из очереди: проверяет ключевые слова и рассылает"""
+        # Пока сообщение ждало в очереди, маршруты чата могли измениться
+        routes = self.chat_routes.get(event.chat_id)
+        if not routes:
+            return
+
+        # Один проход по тексту определяет всех подписчиков, которых касается сообщение.
+        # Обычно прямо в цикле событий, длинные тексты - в пуле процессов
+        matched = await self.message_processor.match_executor.match_subscribers(
+            self._get_chat_index(event.chat_id), event.message.text or ""
+        )
+        if not matched:
+            return
+
+        await self._handle_new_message(
+            event,
+            # Пока текст проверялся в пуле процессов, маршрут могли удалить
+            [
+                (routes[chat_id], matches)
+                for chat_id, matches in matched.items()
+                if chat_id in routes
+            ],
+        )
+
+    def _get_chat_index(self, peer_id: int) -> SubscriberIndex:
+        """Возвращает общий индекс ключевых слов чата, перестраивая его при изменениях"""
+        index = self.chat_indexes.get(peer_id)
+        if index is None:
+            index = SubscriberIndex(
+                {
+                    chat_id: route.keywords
+                    for chat_id, route in self.chat_routes.get(peer_id, {}).items()
+                }
+            )
+            self.chat_indexes[peer_id] = index
+        return index
+
+    def _ensure_dispatcher(self, client: TelegramClient, session_name: str) -> None:
+        """Регистрирует общий обработчик сообщений для сессии, если его еще нет"""
+        if session_name in self.dispatching_sessions:
+            return
+
+        queue = IngestionQueue(
+            session_name,
+            self._process_event,
+            maxsize=self.ingestion_queue_size,
+            workers=self.ingestion_workers,
+            overflow=self.ingestion_overflow,
+        )
+        queue.start()
+        self.ingestion_queues[session_name] = queue
+
+        client.add_event_handler(
+            partial(self._dispatch_message, session_name), events.NewMessage()
+        )
+        self.dispatching_sessions.add(session_name)
+        self.logger.debug(
+            f"Общий обработчик сообщений добавлен для сессии {session_name}"
+        )
+
+    def _add_route(self, peer_id: int, route: ChatRoute) -> None:
+        """Добавляет маршрут в таблицу маршрутизации"""
+        self.chat_routes.setdefault(peer_id, {})[route.chat_id] = route
+        self.chat_peers[route.chat_id] = peer_id
+        self.chat_indexes.pop(peer_id, None)
+
+    def _remove_route(self, chat_id: int) -> Optional[int]:
+        """Удаляет маршрут чата из таблицы маршрутизации и возвращает его Telegram ID"""
+        peer_id = self.chat_peers.pop(chat_id, None)
+        if peer_id is None:
+            return None
+
+        self.chat_indexes.pop(peer_id, None)
+        routes = self.chat_routes.get(peer_id)
+        if routes is not None:
+            routes.pop(chat_id, None)
+            if not routes:
+                del self.chat_routes[peer_id]
+        return peer_id
+
+    @staticmethod
+    def _normalize_chat_source(chat_id: str) -> str:
+        """Приводит юзернейм или ссылку на чат к единому виду"""
+        source = str(chat_id).strip().lower()
+        for prefix in ("https://", "http://", "t.me/", "@"):
+            if source.startswith(prefix):
+                source = source[len(prefix) :]
+        return source.rstrip("/")
+
+    def _get_monitored_peer(self, chat_id: str) -> Optional[int]:
+        """Возвращает Telegram ID чата, если он уже отслеживается какой-либо сессией"""
+        peer_id = self.chat_sources.get(self._normalize_chat_source(chat_id))
+        if peer_id is not None and peer_id in self.chat_sessions:
+            return peer_id
+        return None
+
     async def _handle_new_message(
-        self, event, project_id: int, chat_id: int, keywords: Optional[str]
+        self,
+        event,
+        subscribers: List[Tuple[ChatRoute, List[KeywordMatch]]],
     ):
-        """Обработчик новых сообщений, асинхронно обрабатывает их"""
+        """Обработчик новых сообщений, рассылает сообщение подходящим подписчикам чата"""
         try:
-            # Проверяем, активен ли проект и чат
-            project = self.db.get_project(project_id)
-            chat = self.db.get_chat(chat_id)
-
-            if not project or not project.is_active or not chat or not chat.is_active:
-                # Отключаем мониторинг неактивных чатов
-                asyncio.create_task(self.stop_monitoring_chat(chat_id))
-                return
-
             # Проверяем, инициализирован ли обработчик сообщений
             if not self.message_processor:
                 self.logger.error("Обработчик сообщений не инициализирован!")
                 return
 
-            # Создаем задачу для асинхронной обработки сообщения
-            asyncio.create_task(
-                self._process_message(event.message, project_id, chat_id, keywords)
-            )
-            self.logger.debug("Создана задача для обработки сообщения")
+            active_subscribers = []
+            for route, matches in subscribers:
+                # Проверяем, активен ли проект и чат (по реестру, без запросов к БД)
+                project = state_registry.get_project(route.project_id)
+                chat = state_registry.get_chat(route.chat_id)
+
+                if (
+                    not project
+                    or not project.is_active
+                    or not chat
+                    or not chat.is_active
+                ):
+                    # Отключаем мониторинг неактивных чатов
+                    asyncio.create_task(self.stop_monitoring_chat(route.chat_id))
+                    continue
+
+                active_subscribers.append((route, matches))
+
+            if not active_subscribers:
+                return
+
+            await self._fan_out_message(event.message, active_subscribers)
 
         except Exception as e:
             self.logger.error(f"Ошибка при обработке нового сообщения: {str(e)}")
 
-    async def _process_message(self, message, project_id, chat_id, keywords):
+    async def _fan_out_message(
+        self, message, subscribers: List[Tuple[ChatRoute, List[KeywordMatch]]]
+    ):
+        """Обрабатывает сообщение для каждого подходящего подписчика чата"""
+        await asyncio.gather(
+            *(
+                self._process_message(
+                    message, route.project_id, route.chat_id, route.keywords, matches
+                )
+                for route, matches in subscribers
+            )
+        )
+
+    async def _process_message(
+        self, message, project_id, chat_id, keywords, matches=None
+    ):
         """Обрабатывает одно сообщение асинхронно"""
         try:
             message_id = getattr(message, "id", "unknown")
@@ -225,7 +436,7 @@ class RealTimeSessionManager:
                 f"Начало обработки сообщения #{message_id} для проекта {project_id}, чата {chat_id}"
             )
             result = await self.message_processor.process_message(
-                message, project_id, chat_id, keywords
+                message, project_id, chat_id, keywords, matches
             )
             self.logger.info(
                 f"Завершена обработка сообщения #{message_id}, результат: {result}"
@@ -239,13 +450,13 @@ class RealTimeSessionManager:
 
     async def start_monitoring_project(self, project_id: int) -> bool:
         """Запускает мониторинг сообщений для проекта"""
-        project = self.db.get_project(project_id)
+        project = await self.async_db.get_project(project_id)
         if not project or not project.is_active:
             self.logger.warning(f"Проект {project_id} не найден или неактивен")
             return False
 
         # Получаем все активные чаты проекта
-        chats = self.db.get_project_chats(project_id, active_only=True)
+        chats = await self.async_db.get_project_chats(project_id, active_only=True)
         if not chats:
             self.logger.warning(f"В проекте {project_id} нет активных чатов")
             return False
@@ -299,8 +510,9 @@ class RealTimeSessionManager:
     ) -> Tuple[Optional[TelegramClient], Optional[str]]:
         """Выбирает подходящую сессию для чата"""
         # Проверяем, есть ли уже сессия для этого чата
-        if chat_id in self.chat_sessions:
-            session_name = self.chat_sessions[chat_id]
+        peer_id = self._get_monitored_peer(chat_id)
+        if peer_id is not None:
+            session_name = self.chat_sessions[peer_id]
             if session_name in self.active_clients:
                 return self.active_clients[session_name], session_name
 
@@ -313,7 +525,12 @@ class RealTimeSessionManager:
             return self.active_clients[best_session], best_session
 
         # Если нет активных клиентов, создаем новую сессию
-        client = await self._create_new_session()
+        async with self._session_lock:
+            # Сессию мог уже подключить параллельный запрос
+            if self.active_clients:
+                session_name = next(iter(self.active_clients))
+                return self.active_clients[session_name], session_name
+            client = await self._create_new_session()
         if client:
             session_name = os.path.splitext(os.path.basename(client.session.filename))[
                 0
@@ -397,6 +614,43 @@ class RealTimeSessionManager:
         )
         return None
 
+    async def _get_dialog_ids(self, client: TelegramClient, session_name: str) -> Set[int]:
+        """Возвращает ID чатов сессии, перечитывая диалоги не чаще раза в dialogs_ttl"""
+        async with self._dialogs_locks[session_name]:
+            cached = self.session_dialogs.get(session_name)
+            if cached and time.monotonic() - cached[0] < self.dialogs_ttl:
+                return cached[1]
+
+            dialogs = await client.get_dialogs()
+            self.logger.debug(f"Сессия {session_name} имеет {len(dialogs)} диалогов")
+            chat_ids = {d.entity.id for d in dialogs}
+            self.session_dialogs[session_name] = (time.monotonic(), chat_ids)
+            return chat_ids
+
+    async def _wait_join_slot(self) -> None:
+        """Ждет очереди на вступление в чат (не чаще раза в join_interval)"""
+        async with self._join_lock:
+            delay = self._next_join_at - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._next_join_at = time.monotonic() + self.join_interval
+
+    async def _send_join_request(self, client: TelegramClient, request) -> None:
+        """Отправляет запрос на вступление, один раз пережидая FloodWait"""
+        await self._wait_join_slot()
+        try:
+            await client(request)
+        except FloodWaitError as e:
+            if e.seconds > self.max_flood_wait:
+                raise
+            self.logger.warning(f"FloodWait при вступлении в чат: ждем {e.seconds} сек.")
+            # Откладываем и остальные вступления, а не только текущее
+            self._next_join_at = max(
+                self._next_join_at, time.monotonic() + e.seconds
+            )
+            await self._wait_join_slot()
+            await client(request)
+
     async def join_chat(self, chat_id: int) -> bool:
         """
         Пытается вступить в чат
@@ -408,19 +662,40 @@ class RealTimeSessionManager:
             bool: True если удалось вступить в чат или бот уже состоит в нем,
                  False в случае ошибки
         """
-        chat = self.db.get_chat(chat_id)
+        chat = await self.async_db.get_chat(chat_id)
         if not chat:
             self.logger.warning(f"Чат {chat_id} не найден в базе данных")
             return False
+        return await self._join_chat(chat) is not None
+
+    async def _join_chat(self, chat) -> Optional[Tuple[TelegramClient, str]]:
+        """
+        Вступает в чат и возвращает (клиент, имя сессии), которая в нем состоит
+
+        Мониторинг нужно запускать именно на этой сессии: при параллельном
+        добавлении чатов повторный выбор сессии может вернуть другую,
+        не состоящую в чате.
+        """
+        chat_info = f"id:{chat.id}, title:{chat.chat_title}, chat_id:{chat.chat_id}"
+
+        # Если этот Telegram-чат уже отслеживается, повторно вступать не нужно
+        peer_id = self._get_monitored_peer(chat.chat_id)
+        if peer_id is not None:
+            session_name = self.chat_sessions[peer_id]
+            client = self.active_clients.get(session_name)
+            if client:
+                self.logger.info(
+                    f"Чат {chat_info} уже отслеживается, вступление не требуется"
+                )
+                return client, session_name
 
-        chat_info = f"id:{chat_id}, title:{chat.chat_title}, chat_id:{chat.chat_id}"
         self.logger.info(f"Попытка подключения к чату: {chat_info}")
 
         # Получаем подходящую сессию
         client, session_name = await self._get_or_select_session_for_chat(chat.chat_id)
         if not client or not session_name:
             self.logger.error(f"Не удалось получить сессию для чата {chat_info}")
-            return False
+            return None
 
         try:
             # Пытаемся получить информацию о чате
@@ -434,27 +709,23 @@ class RealTimeSessionManager:
                 self.logger.error(
                     f"Ошибка при получении данных о чате {chat_info}: {str(e)}"
                 )
-                return False
+                return None
 
             # Проверяем, является ли пользователь участником чата
             try:
-                dialog = await client.get_dialogs()
-                chat_ids = [d.entity.id for d in dialog]
-
-                # Выводим отладочную информацию о диалогах
-                self.logger.debug(f"Сессия {session_name} имеет {len(dialog)} диалогов")
+                chat_ids = await self._get_dialog_ids(client, session_name)
             except Exception as e:
                 self.logger.error(
                     f"Ошибка при получении диалогов для сессии {session_name}: {str(e)}"
                 )
-                return False
+                return None
 
             # Если сессия уже является участником чата
             if chat_entity.id in chat_ids:
                 self.logger.info(
                     f"Сессия {session_name} уже является участником чата {chat_info}"
                 )
-                return True
+                return client, session_name
 
             # Пытаемся вступить в группу/канал
             self.logger.info(
@@ -465,33 +736,36 @@ class RealTimeSessionManager:
                 if hasattr(chat_entity, "username") and chat_entity.username:
                     # Если у чата есть юзернейм, используем его для вступления
                     self.logger.info(f"Вступаем по username: @{chat_entity.username}")
-                    await client(JoinChannelRequest(channel=chat_entity))
+                    request = JoinChannelRequest(channel=chat_entity)
                 else:
                     # Если это приватный чат, пытаемся использовать инвайт-ссылку
                     if chat.invite_link:
                         invite_hash = chat.invite_link.split("/")[-1]
                         self.logger.info(f"Вступаем по инвайт-ссылке: {invite_hash}")
-                        await client(ImportChatInviteRequest(hash=invite_hash))
+                        request = ImportChatInviteRequest(hash=invite_hash)
                     else:
                         self.logger.warning(
                             f"Нет возможности вступить в чат {chat_info}: отсутствует юзернейм и инвайт-ссылка"
                         )
-                        return False
+                        return None
+
+                await self._send_join_request(client, request)
+                chat_ids.add(chat_entity.id)
 
                 self.logger.info(f"Успешно вступили в чат {chat_info}")
-                return True
+                return client, session_name
 
             except Exception as join_error:
                 self.logger.error(
                     f"Ошибка при вступлении в чат {chat_info}: {str(join_error)}"
                 )
-                return False
+                return None
 
         except Exception as e:
             self.logger.error(
                 f"Не удалось получить информацию о чате {chat_info}: {str(e)}"
             )
-            return False
+            return None
 
     async def start_monitoring_chat(self, chat_id: int, project_id: int) -> bool:
         """
@@ -505,8 +779,8 @@ class RealTimeSessionManager:
             bool: True если удалось успешно вступить в чат и добавить его в мониторинг,
                  False в случае ошибки или невозможности вступить в чат
         """
-        chat = self.db.get_chat(chat_id)
-        project = self.db.get_project(project_id)
+        chat = await self.async_db.get_chat(chat_id)
+        project = await self.async_db.get_project(project_id)
 
         # Проверка наличия и активности чата и проекта
         if not chat:
@@ -535,60 +809,58 @@ class RealTimeSessionManager:
         )
 
         # Пропускаем, если чат уже мониторится
-        if chat_id in self.chat_sessions:
+        if chat_id in self.chat_peers:
+            peer_id = self.chat_peers[chat_id]
             self.logger.info(
-                f"Чат {chat_info} уже мониторится сессией {self.chat_sessions[chat_id]}"
+                f"Чат {chat_info} уже мониторится сессией {self.chat_sessions.get(peer_id)}"
             )
+            self.active_projects[project_id].add(chat_id)
+            return True
 
-            # Добавляем чат в активные проекты, если его там нет
-            if project_id not in self.active_projects:
-                self.active_projects[project_id] = set()
-
-            if chat_id not in self.active_projects[project_id]:
-                self.active_projects[project_id].add(chat_id)
-                self.logger.info(
-                    f"Чат {chat_info} добавлен в активные для проекта {project_id}"
-                )
+        keywords_info = (
+            f"ключевые слова: {chat.keywords}" if chat.keywords else "все сообщения"
+        )
+        route = ChatRoute(project_id, chat_id, chat.keywords)
 
+        # Если этот Telegram-чат уже отслеживается для другого проекта,
+        # достаточно добавить подписчика в таблицу маршрутизации
+        peer_id = self._get_monitored_peer(chat.chat_id)
+        if peer_id is not None:
+            self._add_route(peer_id, route)
+            self.active_projects[project_id].add(chat_id)
+            self.logger.info(
+                f"Чат {chat_info} подписан на уже отслеживаемый Telegram-чат "
+                f"{peer_id} ({len(self.chat_routes[peer_id])} подписчиков), {keywords_info}"
+            )
             return True
 
-        # Вступаем в чат, если еще не состоим в нем
-        if not await self.join_chat(chat_id):
+        # Вступаем в чат, если еще не состоим в нем; мониторинг запускается
+        # на той же сессии, которая вступила
+        joined = await self._join_chat(chat)
+        if not joined:
             self.logger.error(f"Не удалось вступить в чат {chat_info}")
             return False
-
-        # Получаем подходящую сессию
-        client, session_name = await self._get_or_select_session_for_chat(chat.chat_id)
-        if not client or not session_name:
-            self.logger.error(
-                f"Не удалось получить сессию для мониторинга чата {chat_info}"
-            )
-            return False
+        client, session_name = joined
 
         try:
-            # Проверяем, есть ли у чата ключевые слова для фильтрации
-            keywords_info = (
-                f"ключевые слова: {chat.keywords}" if chat.keywords else "все сообщения"
-            )
             self.logger.info(
                 f"Настройка мониторинга для чата {chat_info}, {keywords_info}"
             )
 
-            # Создаем уникальный обработчик для этого чата
-            handler_id = client.add_event_handler(
-                lambda event: self._handle_new_message(
-                    event, project_id, chat_id, chat.keywords
-                ),
-                events.NewMessage(chats=chat.chat_id),
-            )
+            # Получаем Telegram ID чата для таблицы маршрутизации
+            peer_id = await client.get_peer_id(chat.chat_id)
 
-            # Сохраняем связь чат -> сессия и сессия -> чат
-            self.chat_sessions[chat_id] = session_name
-            self.session_chats[session_name].add(chat_id)
+            # Один обработчик на сессию, чат добавляется только в таблицу маршрутов
+            self._ensure_dispatcher(client, session_name)
+            self._add_route(peer_id, route)
+
+            # Сохраняем связь Telegram-чат -> сессия и сессия -> Telegram-чат
+            if peer_id not in self.chat_sessions:
+                self.chat_sessions[peer_id] = session_name
+                self.session_chats[session_name].add(peer_id)
+            self.chat_sources[self._normalize_chat_source(chat.chat_id)] = peer_id
 
             # Добавляем чат в активные для проекта
-            if project_id not in self.active_projects:
-                self.active_projects[project_id] = set()
             self.active_projects[project_id].add(chat_id)
 
             self.logger.info(
@@ -604,23 +876,32 @@ class RealTimeSessionManager:
 
     async def stop_monitoring_chat(self, chat_id: int) -> bool:
         """Останавливает мониторинг сообщений для конкретного чата"""
-        # Проверяем, мониторится ли чат
-        if chat_id not in self.chat_sessions:
+        # Удаляем маршрут чата, общий обработчик сессии остается на месте
+        peer_id = self._remove_route(chat_id)
+        if peer_id is None:
             return False
 
-        session_name = self.chat_sessions[chat_id]
-        client = self.active_clients.get(session_name)
+        # Удаляем чат из всех проектов
+        for project_id in list(self.active_projects.keys()):
+            self.active_projects[project_id].discard(chat_id)
 
-        if client:
-            # Удаляем все обработчики событий для этого чата
-            client.remove_event_handler(None, events.NewMessage(chats=chat_id))
+            # Если в проекте не осталось активных чатов, удаляем проект
+            if not self.active_projects[project_id]:
+                del self.active_projects[project_id]
+
+        self.logger.info(f"Остановлен мониторинг чата {chat_id}")
+
+        # Telegram-чат по-прежнему нужен другим подписчикам
+        if peer_id in self.chat_routes:
+            return True
 
-        # Удаляем запись о сессии для чата
-        del self.chat_sessions[chat_id]
+        # Подписчиков не осталось, отвязываем Telegram-чат от сессии
+        session_name = self.chat_sessions.pop(peer_id, None)
+        for source in [s for s, p in self.chat_sources.items() if p == peer_id]:
+            del self.chat_sources[source]
 
-        # Удаляем чат из списка чатов сессии
         if session_name in self.session_chats:
-            self.session_chats[session_name].discard(chat_id)
+            self.session_chats[session_name].discard(peer_id)
 
             # Если сессия больше не используется, освобождаем её
             if (
@@ -629,15 +910,6 @@ class RealTimeSessionManager:
             ):
                 await self._release_session(session_name)
 
-        # Удаляем чат из всех проектов
-        for project_id in list(self.active_projects.keys()):
-            self.active_projects[project_id].discard(chat_id)
-
-            # Если в проекте не осталось активных чатов, удаляем проект
-            if not self.active_projects[project_id]:
-                del self.active_projects[project_id]
-
-        self.logger.info(f"Остановлен мониторинг чата {chat_id}")
         return True
 
     async def _release_session(self, session_name: str) -> None:
@@ -653,13 +925,18 @@ class RealTimeSessionManager:
                 )
 
             del self.active_clients[session_name]
+            self.dispatching_sessions.discard(session_name)
+            self.session_dialogs.pop(session_name, None)
+            queue = self.ingestion_queues.pop(session_name, None)
+            if queue:
+                await queue.stop()
             self.logger.info(f"Сессия {session_name} освобождена")
 
     async def restart_all_active_projects(self):
         """Перезапускает мониторинг для всех активных проектов"""
         try:
             # Получаем все активные проекты
-            projects = self.db.get_all_active_projects()
+            projects = await self.async_db.get_all_active_projects()
 
             if not projects:
                 self.logger.info("Нет активных проектов для запуска мониторинга")
@@ -678,7 +955,9 @@ class RealTimeSessionManager:
 
             for project in projects:
                 # Получаем все активные чаты проекта
-                active_chats = self.db.get_project_chats(project.id, active_only=True)
+                active_chats = await self.async_db.get_project_chats(
+                    project.id, active_only=True
+                )
 
                 if not active_chats:
                     self.logger.info(
@@ -714,6 +993,13 @@ class RealTimeSessionManager:
         # Останавливаем обработку сообщений
         self.running = False
 
+        # Останавливаем очереди входящих сообщений
+        await asyncio.gather(
+            *(queue.stop() for queue in self.ingestion_queues.values()),
+            return_exceptions=True,
+        )
+        self.ingestion_queues.clear()
+
         # Отключаем все активные сессии
         disconnect_tasks = []
         for session_name in list(self.active_clients.keys()):
@@ -734,11 +1020,20 @@ class RealTimeSessionManager:
         # Очищаем все словари
         self.chat_sessions.clear()
         self.session_chats.clear()
+        self.chat_sources.clear()
         self.active_projects.clear()
         self.active_clients.clear()
+        self.chat_routes.clear()
+        self.chat_peers.clear()
+        self.chat_indexes.clear()
+        self.dispatching_sessions.clear()
 
         self.logger.info("Менеджер сессий успешно остановлен")
 
+    def get_ingestion_status(self) -> dict:
+        """Метрики очередей входящих сообщений {session_name: метрики}"""
+        return {name: queue.get_status() for name, queue in self.ingestion_queues.items()}
+
     async def _disconnect_client(self, client, session_name):
         """Безопасно отключает клиент Telethon"""
         try:
@@ -799,6 +1094,8 @@ class RealTimeSessionManager:
             # Удаляем из активных клиентов
             if session_name in self.active_clients:
                 del self.active_clients[session_name]
+            self.dispatching_sessions.discard(session_name)
+            self.session_dialogs.pop(session_name, None)
 
 
 class MonitoringSystem:
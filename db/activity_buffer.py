@@ -0,0 +1,95 @@
+import asyncio
+import logging
+from typing import Dict, Optional, Set
+
+
+class ActivityBuffer:
+    """
+    Буфер изменений активности пользователей (заблокировал / разблокировал бота).
+
+    Рассылки и доставка уведомлений отмечают здесь результат отправки,
+    а в БД изменения записываются пачками (Database.set_users_activity)
+    раз в flush_interval секунд или при накоплении max_pending изменений.
+    Множество заблокировавших бота пользователей держится в памяти,
+    чтобы не отправлять им уведомления из мониторинга.
+    """
+
+    def __init__(self, flush_interval: float = 5, max_pending: int = 500):
+        self.logger = logging.getLogger(__name__)
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.db = None
+        # user_id -> новый статус активности, еще не записанный в БД
+        self.pending: Dict[int, bool] = {}
+        self.blocked: Set[int] = set()
+        self.task: Optional[asyncio.Task] = None
+        # Создается в start(), внутри работающего цикла событий
+        self._flush_requested: Optional[asyncio.Event] = None
+
+    async def start(self, db) -> None:
+        """Загружает заблокировавших бота пользователей и запускает запись в БД"""
+        self.db = db
+        self.blocked = set(db.get_inactive_user_ids())
+        if not self.task:
+            self._flush_requested = asyncio.Event()
+            self.task = asyncio.create_task(self._flush_loop())
+        self.logger.info(
+            f"Буфер активности запущен, заблокировали бота: {len(self.blocked)}"
+        )
+
+    async def stop(self) -> None:
+        """Останавливает буфер, записывая накопленные изменения"""
+        if self.task:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        self.flush()
+
+    def mark(self, user_id: int, is_active: bool) -> None:
+        """Запоминает новый статус пользователя, если он изменился"""
+        if (user_id not in self.blocked) == is_active:
+            return
+        if is_active:
+            self.blocked.discard(user_id)
+        else:
+            self.blocked.add(user_id)
+        self.pending[user_id] = is_active
+        if len(self.pending) >= self.max_pending and self._flush_requested:
+            self._flush_requested.set()
+
+    def is_blocked(self, user_id: int) -> bool:
+        return user_id in self.blocked
+
+    def flush(self) -> None:
+        """Записывает накопленные изменения в БД"""
+        if not self.pending or not self.db:
+            return
+        pending, self.pending = self.pending, {}
+        try:
+            for is_active in (True, False):
+                user_ids = [uid for uid, active in pending.items() if active == is_active]
+                if user_ids:
+                    self.db.set_users_activity(user_ids, is_active)
+            self.logger.debug(f"Записано изменений активности: {len(pending)}")
+        except Exception as e:
+            # Возвращаем изменения в буфер, более новые статусы важнее
+            self.pending = {**pending, **self.pending}
+            self.logger.error(f"Ошибка при записи активности пользователей: {e}")
+
+    async def _flush_loop(self) -> None:
+        while True:
+            try:
+                await asyncio.wait_for(
+                    self._flush_requested.wait(), timeout=self.flush_interval
+                )
+            except asyncio.TimeoutError:
+                pass
+            self._flush_requested.clear()
+            self.flush()
+
+
+# Общий буфер процесса бота
+activity_buffer = ActivityBuffer()
@@ -0,0 +1,132 @@
+from typing import Any, Callable, Dict, Optional, Union
+
+from sqlalchemy.engine import URL, make_url
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session
+
+from db.database import Database
+from db.engine import configure_sqlite, engine_options, get_database_url, is_sqlite
+from db.models import Base
+
+# Асинхронные драйверы для синхронных URL
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+    "postgresql+psycopg2": "postgresql+asyncpg",
+}
+
+
+def to_async_url(url: Union[URL, str]) -> URL:
+    """Подставляет асинхронный драйвер в URL базы данных"""
+    url = make_url(url)
+    drivername = ASYNC_DRIVERS.get(url.drivername, url.drivername)
+    return url.set(drivername=drivername)
+
+
+class _SessionDatabase(Database):
+    """
+    Database, методы которой работают в уже открытой синхронной сессии.
+
+    Используется внутри AsyncSession.run_sync: тела методов Database
+    выполняются без изменений, а ввод-вывод идет через асинхронный драйвер.
+    """
+
+    def __init__(self, session: Session) -> None:
+        self._session = session
+        # Методы Database смотрят на self.engine.dialect (RETURNING, ON CONFLICT)
+        self.engine = session.get_bind()
+
+    def get_session(self) -> Session:
+        return self._session
+
+    def __del__(self):
+        pass
+
+
+class AsyncDatabase:
+    """
+    Асинхронный вариант Database с тем же набором методов.
+
+    Каждый публичный метод Database доступен как корутина:
+        user = await db.get_user(user_id)
+
+    Запросы выполняются через AsyncSession (aiosqlite / asyncpg), поэтому
+    цикл событий продолжает обрабатывать обновления, пока идет запрос.
+    """
+
+    def __init__(
+        self,
+        db_path: str = "database.db",
+        db_url: Optional[Union[URL, str]] = None,
+        role: str = "bot",
+        sqlite_tuning: Optional[bool] = None,
+    ):
+        # Та же БД, что и у Database
+        db_url = to_async_url(db_url or get_database_url(db_path))
+
+        self.engine = create_async_engine(
+            db_url, **engine_options(db_url, role, is_async=True)
+        )
+        configure_sqlite(self.engine.sync_engine, sqlite_tuning)
+        self.SessionLocal = async_sessionmaker(self.engine, autoflush=False)
+        # Схему PostgreSQL ведет Alembic, таблицы создаются только в SQLite
+        self._tables_created = not is_sqlite(db_url)
+        self._methods: Dict[str, Callable] = {}
+
+    @classmethod
+    def from_database(cls, db: Database, role: str = "bot") -> "AsyncDatabase":
+        """Создает асинхронный доступ к той же БД, что и у синхронного Database"""
+        return cls(db_url=db.engine.url, role=role)
+
+    def get_session(self) -> AsyncSession:
+        """Создает новую асинхронную сессию для работы с БД"""
+        return self.SessionLocal()
+
+    async def create_tables(self) -> None:
+        """Создает все таблицы, если их еще нет"""
+        async with self.engine.begin() as connection:
+            await connection.run_sync(Base.metadata.create_all)
+        self._tables_created = True
+
+    async def run(self, method_name: str, *args, **kwargs) -> Any:
+        """Выполняет метод Database в асинхронной сессии"""
+        return await self.run_sync(
+            lambda db: getattr(db, method_name)(*args, **kwargs)
+        )
+
+    async def run_sync(self, func: Callable[[Database], Any]) -> Any:
+        """
+        Выполняет func(db) в асинхронной сессии
+
+        Для кода, которому нужен объект Database, а не отдельный метод:
+            await async_db.run_sync(state_registry.load)
+        """
+        if not self._tables_created:
+            await self.create_tables()
+
+        def call(session: Session) -> Any:
+            return func(_SessionDatabase(session))
+
+        async with self.get_session() as session:
+            return await session.run_sync(call)
+
+    def __getattr__(self, name: str) -> Callable:
+        method = getattr(Database, name, None)
+        if name.startswith("_") or not callable(method):
+            raise AttributeError(
+                f"'{type(self).__name__}' object has no attribute '{name}'"
+            )
+
+        if name not in self._methods:
+
+            async def wrapper(*args, **kwargs):
+                return await self.run(name, *args, **kwargs)
+
+            wrapper.__name__ = name
+            wrapper.__doc__ = method.__doc__
+            self._methods[name] = wrapper
+        return self._methods[name]
+
+    async def close(self) -> None:
+        """Закрывает соединения с БД"""
+        await self.engine.dispose()
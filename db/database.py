@@ -1,37 +1,75 @@
-from typing import Optional, List
-import os
-from sqlalchemy import create_engine
+import time
+from typing import Optional, List, Set, Tuple
+from sqlalchemy import (
+    create_engine,
+    delete,
+    insert,
+    inspect,
+    literal,
+    select,
+    tuple_,
+    update,
+)
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.orm import Session
 from sqlalchemy.sql import func
 from datetime import datetime, timedelta
 
 from db.models import (
+    BroadcastJob,
+    BroadcastRecipient,
+    OutboxMessage,
     PaymentHistory,
     User,
     Base,
     ReferralLink,
     Project,
     ProjectChat,
+    TariffNotification,
     TariffPlan,
     UserTariff,
 )
+from db.registry import state_registry
+from db.engine import (
+    configure_sqlite,
+    engine_options,
+    get_database_url,
+    is_sqlite,
+)
 
 
 class Database:
-    def __init__(self, db_path: str = "database.db") -> None:
-        # Получаем абсолютный путь к файлу БД
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        db_url = f"sqlite:///{os.path.join(base_dir, db_path)}"
-
-        # Создаем движок базы данных
-        self.engine = create_engine(
-            db_url,
-            connect_args={"check_same_thread": False},  # Важно для SQLite
-        )
+    # Кэш статистики источников для листания страниц в админке.
+    # Общий для всех экземпляров (в том числе внутри AsyncDatabase),
+    # поэтому записывается в Database, а не в self
+    referral_stats_ttl = 30  # секунд
+    _referral_stats_cache: Optional[tuple[float, list[dict]]] = None
 
-        # Создаем все таблицы
-        Base.metadata.create_all(self.engine)
+    def __init__(
+        self,
+        db_path: str = "database.db",
+        db_url: str = None,
+        role: str = "bot",
+        sqlite_tuning: Optional[bool] = None,
+    ) -> None:
+        # DSN из config/parameters.yaml или SQLite-файл в каталоге db
+        db_url = db_url or get_database_url(db_path)
+
+        # Создаем движок базы данных (для PostgreSQL - с пулом под роль процесса)
+        self.engine = create_engine(db_url, **engine_options(db_url, role))
+        # WAL и остальные PRAGMA для SQLite, если профиль включен
+        configure_sqlite(self.engine, sqlite_tuning)
+
+        # Схему PostgreSQL ведет Alembic (alembic upgrade head),
+        # SQLite-файл по-прежнему создается автоматически
+        if is_sqlite(db_url):
+            Base.metadata.create_all(self.engine)
+            # create_all не добавляет индексы в уже существующие таблицы
+            for table in Base.metadata.sorted_tables:
+                for index in table.indexes:
+                    index.create(self.engine, checkfirst=True)
+            # ... и новые столбцы тоже
+            self._add_missing_columns()
 
         # Создаем фабрику сессий
         self.SessionLocal = sessionmaker(
@@ -42,6 +80,25 @@ class Database:
         """Создает новую сессию для работы с БД"""
         return self.SessionLocal()
 
+    def _add_missing_columns(self) -> None:
+        """Добавляет в существующие таблицы SQLite столбцы, появившиеся в моделях"""
+        inspector = inspect(self.engine)
+        with self.engine.begin() as connection:
+            for table in Base.metadata.sorted_tables:
+                existing = {column["name"] for column in inspector.get_columns(table.name)}
+                for column in table.columns:
+                    if column.name in existing:
+                        continue
+                    # Новые столбцы добавляются только со значением по умолчанию
+                    default = column.server_default.arg if column.server_default else None
+                    if default is not None and not isinstance(default, str):
+                        default = default.compile(dialect=self.engine.dialect)
+                    column_type = column.type.compile(dialect=self.engine.dialect)
+                    connection.exec_driver_sql(
+                        f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}'
+                        + (f" NOT NULL DEFAULT {default}" if default is not None else "")
+                    )
+
     def get_user(self, user_id: int) -> Optional[User]:
         """Получает пользователя по его user_id"""
         with self.get_session() as session:
@@ -96,7 +153,9 @@ class Database:
         with self.get_session() as session:
             user = session.query(User).filter(User.user_id == user_id).first()
             if user:
-                user.balance += amount
+                # Изменяем баланс в самом UPDATE, чтобы параллельные процессы
+                # (бот и payment_webhook) не затирали изменения друг друга
+                user.balance = User.balance + amount
                 session.commit()
                 session.refresh(user)
             return user
@@ -111,6 +170,48 @@ class Database:
                 session.refresh(user)
             return user
 
+    def get_users_page(
+        self,
+        limit: int,
+        after_id: Optional[int] = None,
+        before_id: Optional[int] = None,
+        admins_only: bool = False,
+        with_balance: bool = False,
+        exclude_user_id: Optional[int] = None,
+    ) -> list[tuple[User, int]]:
+        """
+        Получает страницу пользователей по ключу User.id вместе с числом их проектов
+
+        after_id - страница после указанного id, before_id - страница перед ним.
+        Пользователи возвращаются в порядке возрастания id.
+        """
+        projects_count = (
+            select(func.count(Project.id))
+            .where(Project.user_id == User.user_id)
+            .correlate(User)
+            .scalar_subquery()
+        )
+        with self.get_session() as session:
+            query = session.query(User, projects_count)
+            if admins_only:
+                query = query.filter(User.is_admin == True)  # noqa: E712
+            if with_balance:
+                query = query.filter(User.balance > 0)
+            if exclude_user_id is not None:
+                query = query.filter(User.user_id != exclude_user_id)
+
+            if before_id is not None:
+                query = query.filter(User.id < before_id).order_by(User.id.desc())
+            else:
+                if after_id is not None:
+                    query = query.filter(User.id > after_id)
+                query = query.order_by(User.id)
+
+            rows = [(user, count) for user, count in query.limit(limit).all()]
+            if before_id is not None:
+                rows.reverse()
+            return rows
+
     def get_admins(self) -> list[User]:
         """Получает всех администраторов"""
         with self.get_session() as session:
@@ -126,6 +227,31 @@ class Database:
                 session.refresh(user)
             return user
 
+    def set_users_activity(self, user_ids: List[int], is_active: bool) -> int:
+        """Обновляет статус активности сразу для группы пользователей"""
+        updated = 0
+        with self.get_session() as session:
+            # Пачками, чтобы не упереться в лимит параметров запроса
+            for start in range(0, len(user_ids), 500):
+                result = session.execute(
+                    update(User)
+                    .where(
+                        User.user_id.in_(user_ids[start : start + 500]),
+                        User.is_active != is_active,
+                    )
+                    .values(is_active=is_active)
+                )
+                updated += result.rowcount
+            session.commit()
+        return updated
+
+    def get_inactive_user_ids(self) -> List[int]:
+        """Получает user_id пользователей, заблокировавших бота"""
+        with self.get_session() as session:
+            return list(
+                session.scalars(select(User.user_id).where(User.is_active == False))  # noqa: E712
+            )
+
     def create_referral_link(self, code: str) -> ReferralLink:
         # sourcery skip: class-extract-method
         """Создает новую реферальную ссылку"""
@@ -134,6 +260,7 @@ class Database:
             session.add(ref_link)
             session.commit()
             session.refresh(ref_link)
+            Database._referral_stats_cache = None
             return ref_link
 
     def get_referral_clicks(self, code: str) -> int:
@@ -175,31 +302,68 @@ class Database:
                 .all()
             )
 
-    def get_all_referral_links_statistics(self) -> list[dict]:
-        """Получает статистику по всем реферальным ссылкам"""
-        return [
-            self.get_link_statistics(link.code)
-            for link in self.get_all_referral_links()
-        ]
+    def _referral_statistics_query(self, session: Session, code: Optional[str] = None):
+        """
+        Статистика источников одним запросом: пользователи и сумма платежей по метке
+
+        С code подзапросы сразу ограничиваются этой меткой (индекс по
+        referrer_code), а не агрегируют всю таблицу пользователей.
+        """
+        users = select(
+            User.referrer_code, func.count(User.id).label("users_count")
+        ).group_by(User.referrer_code)
+        payments = (
+            select(User.referrer_code, func.sum(PaymentHistory.amount).label("total"))
+            .join(PaymentHistory, PaymentHistory.user_id == User.user_id)
+            .group_by(User.referrer_code)
+        )
+        if code is not None:
+            users = users.where(User.referrer_code == code)
+            payments = payments.where(User.referrer_code == code)
+        users = users.subquery()
+        payments = payments.subquery()
+        users_count = func.coalesce(users.c.users_count, 0)
+        return (
+            session.query(
+                ReferralLink.code,
+                ReferralLink.created_at,
+                users_count.label("users_count"),
+                func.coalesce(payments.c.total, 0).label("total_payments"),
+            )
+            .outerjoin(users, users.c.referrer_code == ReferralLink.code)
+            .outerjoin(payments, payments.c.referrer_code == ReferralLink.code)
+            .order_by(users_count.desc(), ReferralLink.id)
+        )
+
+    def get_all_referral_links_statistics(self, use_cache: bool = False) -> list[dict]:
+        """
+        Получает статистику по всем реферальным ссылкам
+
+        С use_cache=True результат берется из кэша, если он моложе
+        referral_stats_ttl секунд (для листания страниц списка).
+        """
+        if use_cache and Database._referral_stats_cache:
+            cached_at, statistics = Database._referral_stats_cache
+            if time.monotonic() - cached_at < self.referral_stats_ttl:
+                return statistics
+
+        with self.get_session() as session:
+            statistics = [
+                row._asdict() for row in self._referral_statistics_query(session)
+            ]
+
+        Database._referral_stats_cache = (time.monotonic(), statistics)
+        return statistics
 
     def get_link_statistics(self, code: str) -> dict:
         """Получает статистику по конкретной реферальной ссылке"""
         with self.get_session() as session:
-            link = session.query(ReferralLink).filter(ReferralLink.code == code).first()
-            if not link:
-                return None
-
-            total_payments = sum(
-                sum(payment.amount for payment in user.payment_history)
-                for user in link.users
+            row = (
+                self._referral_statistics_query(session, code)
+                .filter(ReferralLink.code == code)
+                .first()
             )
-
-            return {
-                "code": link.code,
-                "users_count": len(link.users),
-                "total_payments": total_payments,
-                "created_at": link.created_at,
-            }
+            return row._asdict() if row else None
 
     def delete_referral_link(self, code: str) -> bool:
         """Удаляет реферальную ссылку"""
@@ -208,6 +372,7 @@ class Database:
             if link and len(link.users) == 0:
                 session.delete(link)
                 session.commit()
+                Database._referral_stats_cache = None
                 return True
             return False
 
@@ -247,6 +412,7 @@ class Database:
             session.add(project)
             session.commit()
             session.refresh(project)
+            state_registry.put_project(project)
             return project
 
     def get_project(self, project_id: int) -> Optional[Project]:
@@ -274,6 +440,7 @@ class Database:
                         setattr(project, key, value)
                 session.commit()
                 session.refresh(project)
+                state_registry.put_project(project)
                 return project
             return None
 
@@ -285,6 +452,7 @@ class Database:
                 project.is_active = not project.is_active
                 session.commit()
                 session.refresh(project)
+                state_registry.put_project(project)
                 return project
             return None
 
@@ -295,6 +463,7 @@ class Database:
             if project:
                 session.delete(project)
                 session.commit()
+                state_registry.remove_project(project_id)
                 return True
             return False
 
@@ -334,8 +503,70 @@ class Database:
             session.add(chat)
             session.commit()
             session.refresh(chat)
+            state_registry.put_chat(chat)
             return chat
 
+    def add_chats_to_project(
+        self,
+        project_id: int,
+        chats: List[dict],
+        keywords: str = None,
+        chat_type: str = "group",
+        is_active: bool = True,
+    ) -> Tuple[List[ProjectChat], List[str]]:
+        """
+        Добавляет несколько чатов в проект одной транзакцией
+
+        Args:
+            chats: Список словарей {"chat_id": ..., "title": ...}
+
+        Returns:
+            (добавленные чаты, chat_id пропущенных дубликатов)
+        """
+        with self.get_session() as session:
+            # Дубликаты ищем одним запросом, а не отдельно для каждого чата
+            requested_ids = [chat_info["chat_id"] for chat_info in chats]
+            existing_ids = set(
+                session.scalars(
+                    select(ProjectChat.chat_id).where(
+                        ProjectChat.project_id == project_id,
+                        ProjectChat.chat_id.in_(requested_ids),
+                    )
+                )
+            )
+
+            new_chats = []
+            skipped = []
+            for chat_info in chats:
+                chat_id = chat_info["chat_id"]
+                if chat_id in existing_ids:
+                    skipped.append(chat_id)
+                    continue
+                # Повторы внутри самого списка тоже пропускаем
+                existing_ids.add(chat_id)
+                new_chats.append(
+                    ProjectChat(
+                        project_id=project_id,
+                        chat_id=chat_id,
+                        chat_title=chat_info.get("title"),
+                        chat_type=chat_type,
+                        keywords=keywords,
+                        is_active=is_active,
+                    )
+                )
+
+            if not new_chats:
+                return [], skipped
+
+            session.add_all(new_chats)
+            # Объекты нужны после закрытия сессии, не сбрасываем их при коммите
+            session.expire_on_commit = False
+            session.commit()
+
+        for chat in new_chats:
+            state_registry.put_chat(chat)
+        return new_chats, skipped
+
     def get_project_chats(
         self, project_id: int, active_only: bool = False
     ) -> List[ProjectChat]:
@@ -358,6 +589,7 @@ class Database:
                         setattr(chat, key, value)
                 session.commit()
                 session.refresh(chat)
+                state_registry.put_chat(chat)
                 return chat
             return None
 
@@ -368,6 +600,7 @@ class Database:
             if chat:
                 session.delete(chat)
                 session.commit()
+                state_registry.remove_chat(chat_id)
                 return True
 
     def toggle_chat_status(self, chat_id: int) -> Optional[ProjectChat]:
@@ -378,6 +611,7 @@ class Database:
                 chat.is_active = not chat.is_active
                 session.commit()
                 session.refresh(chat)
+                state_registry.put_chat(chat)
                 return chat
             return None
 
@@ -391,6 +625,7 @@ class Database:
                 chat.is_active = is_active
                 session.commit()
                 session.refresh(chat)
+                state_registry.put_chat(chat)
                 return chat
             return None
 
@@ -401,6 +636,7 @@ class Database:
             if chat:
                 session.delete(chat)
                 session.commit()
+                state_registry.remove_chat(chat_id)
                 return True
             return False
 
@@ -426,6 +662,7 @@ class Database:
                 chat.keywords = keywords
                 session.commit()
                 session.refresh(chat)
+                state_registry.put_chat(chat)
                 return chat
             return None
 
@@ -532,6 +769,7 @@ class Database:
                 existing_tariff.is_active = True
                 session.commit()
                 session.refresh(existing_tariff)
+                state_registry.set_tariff(user_id, existing_tariff.end_date)
                 return existing_tariff
             else:
                 # Создаем новый тариф
@@ -544,6 +782,7 @@ class Database:
                 session.add(user_tariff)
                 session.commit()
                 session.refresh(user_tariff)
+                state_registry.set_tariff(user_id, user_tariff.end_date)
                 return user_tariff
 
     def get_user_tariff(self, user_id: int) -> Optional[UserTariff]:
@@ -560,6 +799,7 @@ class Database:
                 # Тариф истек, деактивируем его
                 user_tariff.is_active = False
                 session.commit()
+                state_registry.set_tariff(user_id, None)
                 return None
 
             return user_tariff
@@ -576,46 +816,40 @@ class Database:
             if user_tariff:
                 user_tariff.is_active = False
                 session.commit()
+                state_registry.set_tariff(user_id, None)
                 return True
             return False
 
     def get_user_tariff_info(self, user_id: int) -> dict:
         """Получает полную информацию о тарифе пользователя"""
+        # Количество проектов и чатов считаем подзапросами в том же запросе
+        projects_count = (
+            select(func.count(Project.id))
+            .where(Project.user_id == user_id)
+            .scalar_subquery()
+        )
+        chats_count = (
+            select(func.count(ProjectChat.id))
+            .join(Project, ProjectChat.project_id == Project.id)
+            .where(Project.user_id == user_id)
+            .scalar_subquery()
+        )
+
         with self.get_session() as session:
-            user_tariff = (
-                session.query(UserTariff)
+            row = (
+                session.query(UserTariff, TariffPlan, projects_count, chats_count)
+                .outerjoin(TariffPlan, TariffPlan.id == UserTariff.tariff_plan_id)
                 .filter(UserTariff.user_id == user_id, UserTariff.is_active == True)
                 .first()
             )
 
-            if not user_tariff:
+            if not row:
                 return {"has_tariff": False, "message": "У вас нет активного тарифа"}
 
-            tariff_plan = (
-                session.query(TariffPlan)
-                .filter(TariffPlan.id == user_tariff.tariff_plan_id)
-                .first()
-            )
-
+            user_tariff, tariff_plan, projects_count, chats_count = row
             if not tariff_plan:
                 return {"has_tariff": False, "message": "Тариф не найден"}
 
-            # Получаем количество проектов пользователя
-            projects_count = (
-                session.query(Project).filter(Project.user_id == user_id).count()
-            )
-
-            # Получаем количество чатов во всех проектах пользователя
-            chats_count = 0
-            for project in (
-                session.query(Project).filter(Project.user_id == user_id).all()
-            ):
-                chats_count += (
-                    session.query(ProjectChat)
-                    .filter(ProjectChat.project_id == project.id)
-                    .count()
-                )
-
             return {
                 "has_tariff": True,
                 "tariff_name": tariff_plan.name,
@@ -627,24 +861,279 @@ class Database:
                 "days_left": (user_tariff.end_date - datetime.now()).days,
             }
 
+    def expire_user_tariffs(
+        self, now: Optional[datetime] = None
+    ) -> List[Tuple[int, datetime]]:
+        """
+        Деактивирует все истекшие тарифы одним UPDATE
+
+        Returns:
+            (user_id, end_date) деактивированных тарифов
+        """
+        now = now or datetime.now()
+        expired = (UserTariff.is_active == True, UserTariff.end_date <= now)  # noqa: E712
+        with self.get_session() as session:
+            if self.engine.dialect.update_returning:
+                rows = session.execute(
+                    update(UserTariff)
+                    .where(*expired)
+                    .values(is_active=False)
+                    .returning(UserTariff.user_id, UserTariff.end_date)
+                ).all()
+            else:
+                # SQLite старше 3.35 не поддерживает RETURNING
+                rows = session.execute(
+                    select(UserTariff.user_id, UserTariff.end_date).where(*expired)
+                ).all()
+                if rows:
+                    session.execute(
+                        update(UserTariff)
+                        .where(UserTariff.user_id.in_([row[0] for row in rows]), *expired)
+                        .values(is_active=False)
+                    )
+            session.commit()
+
+        expired_tariffs = [(user_id, end_date) for user_id, end_date in rows]
+        for user_id, _ in expired_tariffs:
+            state_registry.set_tariff(user_id, None)
+        return expired_tariffs
+
+    def get_user_tariffs_expiring_between(
+        self, start: datetime, end: datetime, active: bool = True
+    ) -> List[UserTariff]:
+        """Получает тарифы, истекающие в промежутке [start, end]"""
+        with self.get_session() as session:
+            return list(
+                session.scalars(
+                    select(UserTariff).where(
+                        UserTariff.is_active == active,
+                        UserTariff.end_date >= start,
+                        UserTariff.end_date <= end,
+                    )
+                )
+            )
+
+    def get_sent_tariff_notifications(
+        self, keys: List[Tuple[int, str, datetime]]
+    ) -> Set[Tuple[int, str, datetime]]:
+        """Возвращает уже отправленные из (user_id, тип, дата окончания тарифа)"""
+        if not keys:
+            return set()
+        with self.get_session() as session:
+            rows = session.execute(
+                select(
+                    TariffNotification.user_id,
+                    TariffNotification.notification_type,
+                    TariffNotification.period_end,
+                ).where(
+                    tuple_(
+                        TariffNotification.user_id,
+                        TariffNotification.notification_type,
+                        TariffNotification.period_end,
+                    ).in_(keys)
+                )
+            )
+            return {tuple(row) for row in rows}
+
+    def mark_tariff_notifications_sent(
+        self, keys: List[Tuple[int, str, datetime]]
+    ) -> None:
+        """Записывает уведомления в журнал, повторы игнорируются"""
+        if not keys:
+            return
+        if self.engine.dialect.name == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        statement = insert(TariffNotification).on_conflict_do_nothing(
+            index_elements=["user_id", "notification_type", "period_end"]
+        )
+        with self.get_session() as session:
+            session.execute(
+                statement,
+                [
+                    {
+                        "user_id": user_id,
+                        "notification_type": notification_type,
+                        "period_end": period_end,
+                    }
+                    for user_id, notification_type, period_end in keys
+                ],
+            )
+            session.commit()
+
+    def delete_tariff_notifications_before(self, period_end: datetime) -> int:
+        """Удаляет из журнала уведомления о давно закончившихся сроках"""
+        with self.get_session() as session:
+            result = session.execute(
+                delete(TariffNotification).where(
+                    TariffNotification.period_end < period_end
+                )
+            )
+            session.commit()
+            return result.rowcount
+
     def get_all_active_user_tariffs(self) -> List[UserTariff]:
         """Получает все активные тарифы пользователей"""
+        # Сначала деактивируем все истекшие тарифы
+        self.expire_user_tariffs()
         with self.get_session() as session:
-            now = datetime.now()
-            # Сначала деактивируем все истекшие тарифы
-            expired_tariffs = (
-                session.query(UserTariff)
-                .filter(UserTariff.is_active == True, UserTariff.end_date <= now)
-                .all()
+            return session.query(UserTariff).filter(UserTariff.is_active == True).all()
+
+    def create_broadcast_job(
+        self,
+        admin_id: int,
+        kind: str,
+        payload: str,
+        status_chat_id: int = None,
+        status_message_id: int = None,
+    ) -> BroadcastJob:
+        """Создает рассылку и список получателей (все пользователи) одной транзакцией"""
+        with self.get_session() as session:
+            job = BroadcastJob(
+                admin_id=admin_id,
+                kind=kind,
+                payload=payload,
+                status="running",
+                status_chat_id=status_chat_id,
+                status_message_id=status_message_id,
+            )
+            session.add(job)
+            session.flush()
+
+            # Получателей копируем из users одним INSERT ... SELECT
+            result = session.execute(
+                insert(BroadcastRecipient).from_select(
+                    ["job_id", "user_id", "status"],
+                    select(
+                        literal(job.id), User.user_id, literal("pending")
+                    ).order_by(User.id),
+                )
             )
+            job.total = result.rowcount
+            session.commit()
+            session.refresh(job)
+            return job
 
-            if expired_tariffs:
-                for tariff in expired_tariffs:
-                    tariff.is_active = False
-                session.commit()
+    def get_unfinished_broadcast_jobs(self) -> List[BroadcastJob]:
+        """Получает рассылки, прерванные перезапуском"""
+        with self.get_session() as session:
+            return list(
+                session.scalars(
+                    select(BroadcastJob)
+                    .where(BroadcastJob.status == "running")
+                    .order_by(BroadcastJob.id)
+                )
+            )
 
-            # Затем получаем все активные тарифы
-            return session.query(UserTariff).filter(UserTariff.is_active == True).all()
+    def get_pending_broadcast_recipients(
+        self, job_id: int, after_id: int, limit: int
+    ) -> List[Tuple[int, int]]:
+        """Получает следующих неотправленных получателей: (id, user_id)"""
+        with self.get_session() as session:
+            rows = session.execute(
+                select(BroadcastRecipient.id, BroadcastRecipient.user_id)
+                .where(
+                    BroadcastRecipient.job_id == job_id,
+                    BroadcastRecipient.status == "pending",
+                    BroadcastRecipient.id > after_id,
+                )
+                .order_by(BroadcastRecipient.id)
+                .limit(limit)
+            )
+            return [tuple(row) for row in rows]
+
+    def set_broadcast_recipients_status(
+        self, recipient_ids: List[int], status: str
+    ) -> None:
+        """Записывает результат отправки сразу для группы получателей"""
+        if not recipient_ids:
+            return
+        with self.get_session() as session:
+            session.execute(
+                update(BroadcastRecipient)
+                .where(BroadcastRecipient.id.in_(recipient_ids))
+                .values(status=status)
+            )
+            session.commit()
+
+    def get_broadcast_progress(self, job_id: int) -> dict:
+        """Количество получателей рассылки по статусам"""
+        with self.get_session() as session:
+            rows = session.execute(
+                select(BroadcastRecipient.status, func.count(BroadcastRecipient.id))
+                .where(BroadcastRecipient.job_id == job_id)
+                .group_by(BroadcastRecipient.status)
+            )
+            return {status: count for status, count in rows}
+
+    def finish_broadcast_job(self, job_id: int) -> None:
+        """Отмечает рассылку завершенной"""
+        with self.get_session() as session:
+            session.execute(
+                update(BroadcastJob)
+                .where(BroadcastJob.id == job_id)
+                .values(status="finished", finished_at=datetime.now())
+            )
+            session.commit()
+
+    def add_outbox_messages(self, messages: List[Tuple[int, str]]) -> List[int]:
+        """Добавляет уведомления (user_id, текст) в очередь доставки, возвращает их id"""
+        with self.get_session() as session:
+            rows = [
+                OutboxMessage(user_id=user_id, text=text, next_attempt_at=datetime.now())
+                for user_id, text in messages
+            ]
+            session.add_all(rows)
+            session.flush()
+            ids = [row.id for row in rows]
+            session.commit()
+            return ids
+
+    def get_due_outbox_messages(
+        self, limit: int, exclude_ids: Optional[Set[int]] = None
+    ) -> List[Tuple[int, int, str, int]]:
+        """Получает уведомления, которые пора отправить: (id, user_id, текст, попыток)"""
+        exclude_ids = exclude_ids or set()
+        with self.get_session() as session:
+            rows = session.execute(
+                select(
+                    OutboxMessage.id,
+                    OutboxMessage.user_id,
+                    OutboxMessage.text,
+                    OutboxMessage.attempts,
+                )
+                .where(OutboxMessage.next_attempt_at <= datetime.now())
+                .order_by(OutboxMessage.next_attempt_at, OutboxMessage.id)
+                # Уже взятые в работу отсеиваем здесь, чтобы не раздувать запрос
+                .limit(limit + len(exclude_ids))
+            )
+            return [tuple(row) for row in rows if row[0] not in exclude_ids][:limit]
+
+    def delete_outbox_messages(self, message_ids: List[int]) -> None:
+        """Удаляет доставленные (или отброшенные) уведомления из очереди"""
+        if not message_ids:
+            return
+        with self.get_session() as session:
+            for start in range(0, len(message_ids), 500):
+                session.execute(
+                    delete(OutboxMessage).where(
+                        OutboxMessage.id.in_(message_ids[start : start + 500])
+                    )
+                )
+            session.commit()
+
+    def reschedule_outbox_message(
+        self, message_id: int, next_attempt_at: datetime, attempts: int
+    ) -> None:
+        """Откладывает повторную отправку уведомления"""
+        with self.get_session() as session:
+            session.execute(
+                update(OutboxMessage)
+                .where(OutboxMessage.id == message_id)
+                .values(next_attempt_at=next_attempt_at, attempts=attempts)
+            )
+            session.commit()
 
     def __del__(self):
         """Закрываем соединение при удалении объекта"""
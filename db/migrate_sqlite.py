@@ -0,0 +1,88 @@
+"""
+Перенос данных из SQLite-файла в PostgreSQL.
+
+Порядок перехода:
+    1. Указать database_url в config/parameters.yaml
+    2. Создать схему:   alembic upgrade head
+    3. Перенести данные: python -m db.migrate_sqlite [--source db/database.db]
+    4. Запустить бота и payment_webhook
+
+Таблицы копируются в порядке внешних ключей пакетами, после чего
+последовательности id в PostgreSQL выставляются на максимальные значения.
+"""
+
+import argparse
+import logging
+import os
+
+from sqlalchemy import create_engine, func, select, text
+
+from db.engine import BASE_DIR, get_database_url, is_sqlite
+from db.models import Base
+
+BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def copy_database(source_url: str, target_url: str, batch_size: int = BATCH_SIZE):
+    """Копирует все таблицы моделей из source_url в target_url"""
+    source = create_engine(source_url)
+    target = create_engine(target_url)
+
+    try:
+        with source.connect() as source_conn, target.begin() as target_conn:
+            for table in Base.metadata.sorted_tables:
+                existing = target_conn.execute(
+                    select(func.count()).select_from(table)
+                ).scalar()
+                if existing:
+                    raise RuntimeError(
+                        f"Таблица {table.name} в целевой БД не пуста ({existing} строк)"
+                    )
+
+                rows = source_conn.execute(select(table)).mappings()
+                copied = 0
+                while batch := rows.fetchmany(batch_size):
+                    target_conn.execute(table.insert(), [dict(row) for row in batch])
+                    copied += len(batch)
+                logger.info(f"{table.name}: перенесено {copied} строк")
+
+                # Сдвигаем последовательность id после вставки явных значений
+                if target.dialect.name == "postgresql" and "id" in table.c:
+                    target_conn.execute(
+                        text(
+                            f"SELECT setval(pg_get_serial_sequence('{table.name}', 'id'), "
+                            f"COALESCE((SELECT MAX(id) FROM {table.name}), 0) + 1, false)"
+                        )
+                    )
+    finally:
+        source.dispose()
+        target.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Перенос данных из SQLite в PostgreSQL")
+    parser.add_argument(
+        "--source",
+        default=os.path.join(BASE_DIR, "database.db"),
+        help="Путь к SQLite-файлу (по умолчанию db/database.db)",
+    )
+    parser.add_argument(
+        "--target",
+        default=None,
+        help="DSN целевой БД (по умолчанию database_url из конфига)",
+    )
+    args = parser.parse_args()
+
+    target_url = args.target or get_database_url()
+    if is_sqlite(target_url):
+        parser.error("Целевая БД не задана: укажите --target или database_url")
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s - %(message)s")
+    copy_database(f"sqlite:///{os.path.abspath(args.source)}", target_url)
+    logger.info("Перенос данных завершен")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,14 @@
 from datetime import datetime
 
-from sqlalchemy import DateTime, ForeignKey
+from sqlalchemy import (
+    BigInteger,
+    DateTime,
+    ForeignKey,
+    Index,
+    Text,
+    UniqueConstraint,
+    false,
+)
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.sql import func
@@ -12,7 +20,8 @@ class User(Base):
     __tablename__ = "users"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    user_id: Mapped[int] = mapped_column(unique=True)
+    # Telegram ID не помещается в 32-битный INTEGER PostgreSQL
+    user_id: Mapped[int] = mapped_column(BigInteger, unique=True)
 
     username: Mapped[str] = mapped_column(nullable=True)
     full_name: Mapped[str] = mapped_column(nullable=True)
@@ -21,7 +30,7 @@ class User(Base):
     is_admin: Mapped[bool] = mapped_column(default=False)
 
     referrer_code: Mapped[str] = mapped_column(
-        ForeignKey("referral_links.code"), nullable=True
+        ForeignKey("referral_links.code"), nullable=True, index=True
     )
     referrer: Mapped["ReferralLink"] = relationship(
         "ReferralLink", back_populates="users", uselist=False
@@ -64,7 +73,9 @@ class PaymentHistory(Base):
     __tablename__ = "payment_history"
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"))
+    user_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("users.user_id"), index=True
+    )
     amount: Mapped[int] = mapped_column()
     created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
 
@@ -85,8 +96,14 @@ class Project(Base):
     description: Mapped[str] = mapped_column(nullable=True)
     is_active: Mapped[bool] = mapped_column(default=True)
 
+    # Режим дайджеста: совпадения за digest_window секунд приходят одним сообщением
+    digest_enabled: Mapped[bool] = mapped_column(default=False, server_default=false())
+    digest_window: Mapped[int] = mapped_column(default=60, server_default="60")
+
     # Связь с пользователем
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"))
+    user_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("users.user_id"), index=True
+    )
     user: Mapped["User"] = relationship("User", back_populates="projects")
 
     # Связь с чатами
@@ -101,9 +118,13 @@ class Project(Base):
 # Таблица для чатов, привязанных к проектам
 class ProjectChat(Base):
     __tablename__ = "project_chats"
+    __table_args__ = (
+        # get_project_chats и проверка дубликатов в add_chat_to_project
+        Index("ix_project_chats_project_id_chat_id", "project_id", "chat_id"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    chat_id: Mapped[str] = mapped_column(nullable=False)
+    chat_id: Mapped[str] = mapped_column(nullable=False, index=True)
     chat_title: Mapped[str] = mapped_column(nullable=True)
     chat_type: Mapped[str] = mapped_column(nullable=False)  # группа, канал и т.д.
     is_active: Mapped[bool] = mapped_column(default=True)
@@ -146,9 +167,15 @@ class TariffPlan(Base):
 
 class UserTariff(Base):
     __tablename__ = "user_tariffs"
+    __table_args__ = (
+        # Истекшие и скоро истекающие тарифы (expire_user_tariffs, TariffChecker)
+        Index("ix_user_tariffs_is_active_end_date", "is_active", "end_date"),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
-    user_id: Mapped[int] = mapped_column(ForeignKey("users.user_id"), unique=True)
+    user_id: Mapped[int] = mapped_column(
+        BigInteger, ForeignKey("users.user_id"), unique=True
+    )
     tariff_plan_id: Mapped[int] = mapped_column(ForeignKey("tariff_plans.id"))
     start_date: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
     end_date: Mapped[datetime] = mapped_column(DateTime, nullable=False)
@@ -162,3 +189,91 @@ class UserTariff(Base):
 
     def __repr__(self):
         return f"<UserTariff(id={self.id}, user_id={self.user_id}, tariff_plan_id={self.tariff_plan_id})>"
+
+
+class TariffNotification(Base):
+    """Отправленное уведомление о сроке тарифа (журнал TariffChecker)"""
+
+    __tablename__ = "tariff_notifications"
+    __table_args__ = (
+        # Одно уведомление каждого типа на срок тарифа
+        UniqueConstraint(
+            "user_id",
+            "notification_type",
+            "period_end",
+            name="uq_tariff_notifications_user_type_period",
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, ForeignKey("users.user_id"))
+    # day, hour, expired, post_expired
+    notification_type: Mapped[str] = mapped_column(nullable=False)
+    # Дата окончания тарифа, к которой относится уведомление
+    period_end: Mapped[datetime] = mapped_column(DateTime, nullable=False, index=True)
+    sent_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<TariffNotification(user_id={self.user_id}, type={self.notification_type}, period_end={self.period_end})>"
+
+
+class BroadcastJob(Base):
+    """Рассылка администратора, продолжается после перезапуска бота"""
+
+    __tablename__ = "broadcast_jobs"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    admin_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # copy - копия сообщения, media_group - альбом
+    kind: Mapped[str] = mapped_column(nullable=False)
+    # JSON: {"from_chat_id", "message_id"} для copy, список медиа для media_group
+    payload: Mapped[str] = mapped_column(Text, nullable=False)
+    # running, finished
+    status: Mapped[str] = mapped_column(default="running", index=True)
+    total: Mapped[int] = mapped_column(default=0)
+    # Сообщение администратору, в котором обновляется прогресс
+    status_chat_id: Mapped[int] = mapped_column(BigInteger, nullable=True)
+    status_message_id: Mapped[int] = mapped_column(nullable=True)
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+    finished_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    def __repr__(self):
+        return f"<BroadcastJob(id={self.id}, kind={self.kind}, status={self.status})>"
+
+
+class BroadcastRecipient(Base):
+    """Получатель рассылки и результат отправки ему"""
+
+    __tablename__ = "broadcast_recipients"
+    __table_args__ = (
+        # Выборка неотправленных получателей и подсчет прогресса рассылки
+        Index("ix_broadcast_recipients_job_id_status", "job_id", "status"),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    job_id: Mapped[int] = mapped_column(ForeignKey("broadcast_jobs.id"))
+    user_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    # pending, sent, blocked, failed
+    status: Mapped[str] = mapped_column(default="pending")
+
+    def __repr__(self):
+        return f"<BroadcastRecipient(job_id={self.job_id}, user_id={self.user_id}, status={self.status})>"
+
+
+class OutboxMessage(Base):
+    """Уведомление пользователю, ожидающее отправки (очередь доставки)"""
+
+    __tablename__ = "outbox"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    user_id: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    text: Mapped[str] = mapped_column(Text, nullable=False)
+    attempts: Mapped[int] = mapped_column(default=0)
+    # Выборка сообщений, которые пора отправить
+    next_attempt_at: Mapped[datetime] = mapped_column(
+        DateTime, default=datetime.now, index=True
+    )
+    created_at: Mapped[datetime] = mapped_column(DateTime, server_default=func.now())
+
+    def __repr__(self):
+        return f"<OutboxMessage(id={self.id}, user_id={self.user_id}, attempts={self.attempts})>"
@@ -0,0 +1,63 @@
+import threading
+from typing import Callable, Optional
+
+from db.async_database import AsyncDatabase
+from db.database import Database
+
+_lock = threading.Lock()
+_database: Optional[Database] = None
+_async_database: Optional[AsyncDatabase] = None
+# Роль процесса для размера пула соединений (см. db.engine.POOL_SETTINGS)
+_role = "bot"
+
+
+def configure_database(role: str) -> None:
+    """Задает роль процесса до первого обращения к БД"""
+    global _role
+    with _lock:
+        if _database is not None and role != _role:
+            raise RuntimeError(
+                f"База данных уже создана для роли {_role}, нельзя сменить на {role}"
+            )
+        _role = role
+
+
+def get_database() -> Database:
+    """Возвращает общий для процесса экземпляр Database, создавая его при первом вызове"""
+    global _database
+    if _database is None:
+        with _lock:
+            if _database is None:
+                _database = Database(role=_role)
+    return _database
+
+
+def get_async_database() -> AsyncDatabase:
+    """Возвращает общий для процесса экземпляр AsyncDatabase для той же БД"""
+    global _async_database
+    if _async_database is None:
+        database = get_database()
+        with _lock:
+            if _async_database is None:
+                _async_database = AsyncDatabase.from_database(database, role=_role)
+    return _async_database
+
+
+class LazyDatabase:
+    """
+    Ссылка на общий экземпляр БД, создаваемый при первом обращении.
+
+    Позволяет модулям держать db на уровне модуля, не создавая движок
+    при импорте:
+        db = LazyDatabase(get_database)
+    """
+
+    def __init__(self, factory: Callable):
+        self._factory = factory
+
+    def __getattr__(self, name: str):
+        return getattr(self._factory(), name)
+
+
+# Общие ссылки для модулей бота
+database = LazyDatabase(get_database)
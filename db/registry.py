@@ -0,0 +1,171 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+
+from db.models import Project, ProjectChat, UserTariff
+
+
+@dataclass(frozen=True)
+class ProjectState:
+    """Снимок проекта, нужный при обработке входящих сообщений"""
+
+    id: int
+    user_id: int
+    name: str
+    is_active: bool
+    digest_enabled: bool = False
+    digest_window: int = 60
+
+
+@dataclass(frozen=True)
+class ChatState:
+    """Снимок чата проекта, нужный при обработке входящих сообщений"""
+
+    id: int
+    project_id: int
+    chat_id: str
+    chat_title: Optional[str]
+    keywords: Optional[str]
+    is_active: bool
+
+
+class StateRegistry:
+    """
+    Реестр активных проектов, чатов и сроков тарифов в памяти процесса.
+
+    Загружается один раз при запуске мониторинга и дальше обновляется
+    методами Database после каждой записи, поэтому обработка входящих
+    сообщений не обращается к БД. Тарифы могут меняться и в другом процессе
+    (payment_webhook), поэтому их периодически перечитывает load_tariffs.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__name__)
+        self.projects: Dict[int, ProjectState] = {}
+        self.chats: Dict[int, ChatState] = {}
+        # user_id -> дата окончания активного тарифа
+        self.tariff_ends: Dict[int, datetime] = {}
+        # Пока реестр не загружен, изменения в нем не отслеживаются
+        self.loaded = False
+        # Подписчики на изменение тарифов (например, планировщик TariffChecker),
+        # вызываются при каждом set_tariff независимо от loaded
+        self.tariff_listeners: List[Callable[[int, Optional[datetime]], None]] = []
+
+    def load(self, db) -> None:
+        """Загружает проекты, чаты и тарифы из БД"""
+        with db.get_session() as session:
+            projects = session.query(Project).all()
+            chats = session.query(ProjectChat).all()
+            self.projects = {
+                project.id: self._project_state(project) for project in projects
+            }
+            self.chats = {chat.id: self._chat_state(chat) for chat in chats}
+
+        self.loaded = True
+        self.load_tariffs(db)
+        self.logger.info(
+            f"Реестр загружен: {len(self.projects)} проектов, {len(self.chats)} чатов, "
+            f"{len(self.tariff_ends)} тарифов"
+        )
+
+    def load_tariffs(self, db) -> None:
+        """Перечитывает сроки активных тарифов из БД"""
+        if not self.loaded:
+            return
+
+        with db.get_session() as session:
+            tariffs = (
+                session.query(UserTariff.user_id, UserTariff.end_date)
+                .filter(UserTariff.is_active == True)  # noqa: E712
+                .all()
+            )
+        self.tariff_ends = {user_id: end_date for user_id, end_date in tariffs}
+
+    @staticmethod
+    def _project_state(project: Project) -> ProjectState:
+        return ProjectState(
+            id=project.id,
+            user_id=project.user_id,
+            name=project.name,
+            is_active=project.is_active,
+            digest_enabled=project.digest_enabled,
+            digest_window=project.digest_window,
+        )
+
+    @staticmethod
+    def _chat_state(chat: ProjectChat) -> ChatState:
+        return ChatState(
+            id=chat.id,
+            project_id=chat.project_id,
+            chat_id=chat.chat_id,
+            chat_title=chat.chat_title,
+            keywords=chat.keywords,
+            is_active=chat.is_active,
+        )
+
+    # ---------- ОБНОВЛЕНИЕ ИЗ DATABASE ----------
+
+    def put_project(self, project: Project) -> None:
+        if self.loaded:
+            self.projects[project.id] = self._project_state(project)
+
+    def remove_project(self, project_id: int) -> None:
+        if not self.loaded:
+            return
+        self.projects.pop(project_id, None)
+        # Чаты проекта удаляются вместе с ним (cascade)
+        for chat_id in [
+            chat.id for chat in self.chats.values() if chat.project_id == project_id
+        ]:
+            del self.chats[chat_id]
+
+    def put_chat(self, chat: ProjectChat) -> None:
+        if self.loaded:
+            self.chats[chat.id] = self._chat_state(chat)
+
+    def remove_chat(self, chat_id: int) -> None:
+        if self.loaded:
+            self.chats.pop(chat_id, None)
+
+    def add_tariff_listener(
+        self, listener: Callable[[int, Optional[datetime]], None]
+    ) -> None:
+        if listener not in self.tariff_listeners:
+            self.tariff_listeners.append(listener)
+
+    def remove_tariff_listener(
+        self, listener: Callable[[int, Optional[datetime]], None]
+    ) -> None:
+        if listener in self.tariff_listeners:
+            self.tariff_listeners.remove(listener)
+
+    def set_tariff(self, user_id: int, end_date: Optional[datetime]) -> None:
+        """Запоминает срок активного тарифа (None - тариф неактивен)"""
+        for listener in self.tariff_listeners:
+            try:
+                listener(user_id, end_date)
+            except Exception as e:
+                self.logger.error(f"Ошибка в подписчике на изменение тарифа: {e}")
+        if not self.loaded:
+            return
+        if end_date is None:
+            self.tariff_ends.pop(user_id, None)
+        else:
+            self.tariff_ends[user_id] = end_date
+
+    # ---------- ЧТЕНИЕ ----------
+
+    def get_project(self, project_id: int) -> Optional[ProjectState]:
+        return self.projects.get(project_id)
+
+    def get_chat(self, chat_id: int) -> Optional[ChatState]:
+        return self.chats.get(chat_id)
+
+    def is_tariff_active(self, user_id: int) -> bool:
+        """Проверяет, действует ли тариф пользователя на текущий момент"""
+        end_date = self.tariff_ends.get(user_id)
+        return end_date is not None and end_date > datetime.now()
+
+
+state_registry = StateRegistry()
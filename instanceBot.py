@@ -4,6 +4,7 @@ from aiogram import Bot, Dispatcher
 from aiogram.client.default import DefaultBotProperties
 from bot.utils.funcs import notify_admins
 from bot.utils.tariff_checker import TariffChecker
+from bot.utils.broadcaster import Broadcaster
 from bot.start import router as start_router
 from bot.projects import router as projects_router
 from bot.project_chats import router as project_chats_router
@@ -13,9 +14,10 @@ from bot.balance import router as balance_router
 from bot.tariffs import router as tariffs_router
 from bot.check_channels import router as check_channels_router
 from config.parameters_manager import ParametersManager
-from db.database import Database
+from db.provider import get_database
+from bot.utils.middlewares import ActivityMiddleware, DatabaseMiddleware
+from db.activity_buffer import activity_buffer
 from client.monitoring_setup import MonitoringSystem
-from datetime import datetime
 
 
 class InstanceTelegramBot:
@@ -25,9 +27,11 @@ class InstanceTelegramBot:
             token=self.token, default=DefaultBotProperties(parse_mode="HTML")
         )
         self.dp = Dispatcher()
-        self.db = Database()
+        # Общий для всего процесса экземпляр БД
+        self.db = get_database()
         self.monitoring_system = None
         self.tariff_checker = None
+        self.broadcaster = None
         self._setup_logging()
         self._include_routers()
 
@@ -41,6 +45,11 @@ class InstanceTelegramBot:
 
     def _include_routers(self):
         """Подключает все роутеры к диспетчеру"""
+        # Передаем общий экземпляр БД в обработчики (аргументы db и async_db)
+        self.dp.update.outer_middleware(DatabaseMiddleware())
+        # Снимаем отметку о блокировке бота с написавших пользователей
+        self.dp.update.outer_middleware(ActivityMiddleware())
+
         self.dp.include_router(start_router)
         self.dp.include_router(projects_router)
         self.dp.include_router(project_chats_router)
@@ -116,31 +125,8 @@ class InstanceTelegramBot:
             # Небольшая задержка, чтобы бот успел инициализироваться полностью
             await asyncio.sleep(10)
 
-            # Получаем все активные тарифы
-            active_tariffs = self.db.get_all_active_user_tariffs()
-            self.logger.info(f"Найдено {len(active_tariffs)} активных тарифов")
-
-            # Проверяем и деактивируем истекшие тарифы
-            now = datetime.now()
-            deactivated_count = 0
-
-            for tariff in active_tariffs:
-                if tariff.end_date <= now:
-                    self.db.deactivate_user_tariff(tariff.user_id)
-                    deactivated_count += 1
-
-                    # Отправляем уведомление о деактивации
-                    try:
-                        await self.bot.send_message(
-                            tariff.user_id,
-                            f"❌ <b>Тариф истёк!</b>\n\n"
-                            f"Ваш тариф истёк. Теперь вы не будете получать полные уведомления о ключевых словах. "
-                            f"Чтобы возобновить работу, пожалуйста, продлите свой тариф.",
-                        )
-                    except Exception as e:
-                        self.logger.error(
-                            f"Ошибка при отправке уведомления пользователю {tariff.user_id}: {e}"
-                        )
+            # Деактивируем истекшие тарифы одним запросом и уведомляем владельцев
+            deactivated_count = await self.tariff_checker.process_expired_tariffs()
 
             self.logger.info(
                 f"Первичная проверка тарифов завершена. Деактивировано {deactivated_count} тарифов"
@@ -148,6 +134,19 @@ class InstanceTelegramBot:
         except Exception as e:
             self.logger.error(f"Ошибка при выполнении первичной проверки тарифов: {e}")
 
+    async def _setup_broadcaster(self):
+        """Настраивает рассылки и продолжает прерванные перезапуском"""
+        try:
+            self.broadcaster = Broadcaster(self.bot, self.db)
+            # Делаем рассылки доступными через объект бота
+            self.bot.broadcaster = self.broadcaster
+
+            resumed = await self.broadcaster.resume_unfinished()
+            if resumed:
+                self.logger.info(f"Продолжено прерванных рассылок: {resumed}")
+        except Exception as e:
+            self.logger.error(f"Ошибка при инициализации рассылок: {e}")
+
     async def start(self):
         """Запускает бота"""
         try:
@@ -156,6 +155,9 @@ class InstanceTelegramBot:
             ParametersManager._load_config()
             self.logger.info("Параметры загружены")
 
+            # Буфер активности пользователей (кто заблокировал бота)
+            await activity_buffer.start(self.db)
+
             # Запускаем систему мониторинга
             await self._setup_monitoring()
 
@@ -165,6 +167,9 @@ class InstanceTelegramBot:
             )
             await self._setup_tariff_checker(message_processor)
 
+            # Запускаем рассылки
+            await self._setup_broadcaster()
+
             # Запускаем бота
             await notify_admins(self.bot, "Бот запущен")
 
@@ -190,6 +195,13 @@ class InstanceTelegramBot:
                 await self.tariff_checker.stop()
                 self.logger.info("Система проверки тарифов остановлена")
 
+            if self.broadcaster:
+                # Незавершенные рассылки продолжатся при следующем запуске
+                await self.broadcaster.stop()
+
+            # Записываем накопленные изменения активности пользователей
+            await activity_buffer.stop()
+
             self.logger.info("Система мониторинга остановлена")
 
             # Отправляем уведомление о выключении
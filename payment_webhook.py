@@ -2,12 +2,13 @@ import asyncio
 from flask import Flask, request, jsonify
 from bot.payment_systems import PaymentSystems
 from config.parameters_manager import ParametersManager
-from db.database import Database
+from db.provider import configure_database, get_database
 import logging
 import json
 
 app = Flask(__name__)
-db = Database()
+configure_database(role="webhook")
+db = get_database()
 
 # Настройка логирования
 logging.basicConfig(